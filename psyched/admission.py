@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import Dict
+
+_pressure_window = 'avg10'
+
+
+def _read_pressure(path: str) -> float:
+    """Read the share of time some tasks were stalled over the last 10 seconds from a PSI file.
+
+    :return: percentage, None if the kernel doesn't report pressure
+    """
+    try:
+        with open(path) as f:
+            for line in f:
+                fields = line.split()
+                if fields and fields[0] == 'some':
+                    values = dict(field.split('=') for field in fields[1:])
+                    return float(values[_pressure_window])
+    except (OSError, KeyError, ValueError):
+        pass
+    return None
+
+
+def _read_load(path: str) -> float:
+    """Read the 1 minute load average from a loadavg file.
+
+    :return: load average, None if not available
+    """
+    try:
+        with open(path) as f:
+            return float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _read_available_memory(path: str) -> float:
+    """Read the fraction of the memory available without swapping from a meminfo file.
+
+    :return: fraction between 0 and 1, None if not available
+    """
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('MemTotal', 'MemAvailable'):
+                    values[key] = int(value.split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    if values.get('MemTotal') and 'MemAvailable' in values:
+        return values['MemAvailable'] / values['MemTotal']
+    return None
+
+
+class AdmissionController(object):
+    """Throttle the start of local tasks when the host is loaded.
+
+    Pass a controller to ``DAG.run`` and, on top of ``max_parallel_workers``,\
+        the number of local tasks allowed to run is adapted to the load of\
+        the host, read from ``/proc/pressure/cpu``, ``/proc/pressure/memory``\
+        (PSI, the share of the last 10 seconds some tasks were stalled),\
+        ``/proc/loadavg`` and ``/proc/meminfo``. While any reading is above its\
+        target the limit is halved, down to min_workers, and once every reading\
+        is back under its target it grows by one, up to ``max_parallel_workers``.\
+        Running tasks are never stopped: new starts are held until the limit\
+        is above the number of running tasks again.
+
+    Readings are taken at most once per interval, which also leaves time for\
+        the previous adjustment to show in the averages. A missing file (no\
+        PSI in the kernel, not Linux...) means no target on that reading.\
+        Tasks placed on Docker hosts or remote workers aren't throttled.
+    """
+
+    def __init__(self, max_cpu_pressure: float = 50.0, max_memory_pressure: float = 10.0,
+                 max_load: float = None, min_available_memory: float = 0.1, min_workers: int = 1,
+                 interval: float = 5.0, proc: str = '/proc'):
+        """Class constructor.
+
+        :param max_cpu_pressure: target for the CPU PSI ``some avg10``, in percent, defaults to 50.0
+        :type max_cpu_pressure: float, optional
+        :param max_memory_pressure: target for the memory PSI ``some avg10``, in percent, defaults to 10.0
+        :type max_memory_pressure: float, optional
+        :param max_load: target for the 1 minute load average per CPU, defaults to None (no target)
+        :type max_load: float, optional
+        :param min_available_memory: minimum fraction of the memory available, defaults to 0.1
+        :type min_available_memory: float, optional
+        :param min_workers: the limit is never lowered below this, defaults to 1
+        :type min_workers: int, optional
+        :param interval: minimum seconds between two adjustments, defaults to 5.0
+        :type interval: float, optional
+        :param proc: where procfs is mounted, defaults to '/proc'
+        :type proc: str, optional
+        """
+        self.max_cpu_pressure = max_cpu_pressure
+        self.max_memory_pressure = max_memory_pressure
+        self.max_load = max_load
+        self.min_available_memory = min_available_memory
+        self.min_workers = min_workers
+        self.interval = interval
+        self.proc = proc
+        self.cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+        self.limit = None
+        self.readings = {}
+        self.last_update = None
+        return
+
+    def read(self) -> Dict[str, float]:
+        """Read the current load of the host.
+
+        :return: dictionary with ``cpu_pressure`` and ``memory_pressure`` (percent),\
+            ``load`` (per CPU) and ``available_memory`` (fraction) keys, None\
+            for the readings not available
+        :rtype: Dict[str, float]
+        """
+        load = _read_load(os.path.join(self.proc, 'loadavg'))
+        return {
+            'cpu_pressure': _read_pressure(os.path.join(self.proc, 'pressure', 'cpu')),
+            'memory_pressure': _read_pressure(os.path.join(self.proc, 'pressure', 'memory')),
+            'load': None if load is None else load / self.cpus,
+            'available_memory': _read_available_memory(os.path.join(self.proc, 'meminfo')),
+        }
+
+    def is_overloaded(self, readings: Dict[str, float]) -> bool:
+        """Check if any reading is past its target.
+
+        :param readings: readings, as returned by read
+        :type readings: Dict[str, float]
+        :return: whether new starts should be throttled
+        :rtype: bool
+        """
+        def above(value, target):
+            return value is not None and target is not None and value > target
+
+        return above(readings['cpu_pressure'], self.max_cpu_pressure) or \
+            above(readings['memory_pressure'], self.max_memory_pressure) or \
+            above(readings['load'], self.max_load) or \
+            (readings['available_memory'] is not None and self.min_available_memory is not None and
+             readings['available_memory'] < self.min_available_memory)
+
+    def get_limit(self, running: int, max_parallel_tasks: int, now: float = None) -> int:
+        """Get the number of local tasks allowed to run, adjusting it once per interval.
+
+        :param running: local tasks running
+        :type running: int
+        :param max_parallel_tasks: upper bound of the limit, the DAG ``max_parallel_workers``
+        :type max_parallel_tasks: int
+        :param now: current time, defaults to time.time()
+        :type now: float, optional
+        :return: maximum number of local tasks to run
+        :rtype: int
+        """
+        now = time.time() if now is None else now
+        if self.limit is None:
+            self.limit = max_parallel_tasks
+        elif self.last_update is not None and now - self.last_update < self.interval:
+            return min(self.limit, max_parallel_tasks)
+        self.last_update = now
+        self.readings = self.read()
+        if self.is_overloaded(self.readings):
+            # Starting from what actually runs, a limit above it wouldn't throttle anything
+            self.limit = max(self.min_workers, min(self.limit, running) // 2)
+        elif self.limit < max_parallel_tasks:
+            self.limit += 1
+        self.limit = min(self.limit, max_parallel_tasks)
+        return self.limit
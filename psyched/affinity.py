@@ -0,0 +1,128 @@
+import glob
+import os
+import re
+from typing import Dict, List
+
+
+def _parse_cpulist(text: str) -> List[int]:
+    """Parse a kernel CPU list, such as ``0-3,8-11``."""
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus += range(int(first), int(last or first) + 1)
+    return cpus
+
+
+def _read_nodes(sys: str) -> Dict[int, List[int]]:
+    """Read the CPUs of every NUMA node, empty if the topology isn't exposed."""
+    nodes = {}
+    for path in glob.glob(os.path.join(sys, 'devices', 'system', 'node', 'node*', 'cpulist')):
+        match = re.search(r'node(\d+)$', os.path.dirname(path))
+        if match is None:
+            continue
+        with open(path) as f:
+            nodes[int(match.group(1))] = _parse_cpulist(f.read())
+    return nodes
+
+
+class CpuAllocator(object):
+    """Hands out dedicated CPUs to running tasks, packed by NUMA node.
+
+    Each task gets its own CPUs (see ``Task.set_cpus``) for as long as it\
+        runs. They are taken from a single NUMA node when one has enough free\
+        CPUs, the fullest such node first, so that the other nodes stay free\
+        for larger tasks; otherwise from as few nodes as possible. Memory is\
+        allocated on the node of the CPU touching it first, so a task pinned\
+        to a single node gets local memory as well.
+
+    The CPUs are those this process may run on, grouped by the NUMA\
+        topology found in sysfs; without it they form a single node.
+    """
+
+    def __init__(self, cpus: List[int] = None, sys: str = '/sys'):
+        """Class constructor.
+
+        :param cpus: CPUs to hand out, defaults to None (those this process may run on)
+        :type cpus: List[int], optional
+        :param sys: sysfs mount point, defaults to '/sys'
+        :type sys: str, optional
+        """
+        available = set(os.sched_getaffinity(0) if cpus is None else cpus)
+        self.nodes = {}
+        for node, node_cpus in sorted(_read_nodes(sys).items()):
+            node_cpus = [c for c in node_cpus if c in available]
+            if node_cpus:
+                self.nodes[node] = node_cpus
+                available.difference_update(node_cpus)
+        if available:
+            # Not part of any node, or no topology at all
+            self.nodes[max(self.nodes, default=-1) + 1] = sorted(available)
+        self.free = {node: list(node_cpus) for node, node_cpus in self.nodes.items()}
+        return
+
+    def get_cpu_count(self) -> int:
+        """Get the number of CPUs handed out.
+
+        :return: number of CPUs
+        :rtype: int
+        """
+        return sum(len(cpus) for cpus in self.nodes.values())
+
+    def get_free_count(self) -> int:
+        """Get the number of CPUs not taken by a task.
+
+        :return: number of free CPUs
+        :rtype: int
+        """
+        return sum(len(cpus) for cpus in self.free.values())
+
+    def get_nodes(self, cpus: List[int]) -> List[int]:
+        """Get the NUMA nodes some CPUs belong to.
+
+        :param cpus: CPUs to look up
+        :type cpus: List[int]
+        :return: node numbers
+        :rtype: List[int]
+        """
+        return [node for node, node_cpus in self.nodes.items() if any(c in node_cpus for c in cpus)]
+
+    def acquire(self, count: int) -> List[int]:
+        """Take CPUs for a task.
+
+        Requests for more CPUs than there are get all of them.
+
+        :param count: number of CPUs
+        :type count: int
+        :return: CPUs taken, None if not enough are free
+        :rtype: List[int]
+        """
+        count = min(count, self.get_cpu_count())
+        if count > self.get_free_count():
+            return None
+        fitting = [node for node, cpus in self.free.items() if len(cpus) >= count]
+        if fitting:
+            nodes = [min(fitting, key=lambda n: len(self.free[n]))]
+        else:
+            nodes = sorted(self.free, key=lambda n: len(self.free[n]), reverse=True)
+        taken = []
+        for node in nodes:
+            n = min(count - len(taken), len(self.free[node]))
+            taken += self.free[node][:n]
+            del self.free[node][:n]
+            if len(taken) == count:
+                break
+        return taken
+
+    def release(self, cpus: List[int]):
+        """Give back the CPUs of a task that stopped running.
+
+        :param cpus: CPUs returned by acquire
+        :type cpus: List[int]
+        """
+        for node, node_cpus in self.nodes.items():
+            freed = [c for c in cpus if c in node_cpus]
+            if freed:
+                self.free[node] = sorted(self.free[node] + freed)
+        return
@@ -0,0 +1,113 @@
+from typing import Any, Callable, Dict, Iterable, List
+
+from .dag import DAG
+from .task import Task, _status_failed, _status_running, _status_succeeded, _status_waiting
+
+
+class Backfill(DAG):
+    """One DAG template run for many parameter values, in a single scheduler.
+
+    template builds the DAG of one run, e.g. the processing of a single\
+        date, from its parameter value. Every run is added to this DAG with\
+        its task names prefixed by ``<param>/``, so all of them share\
+        max_parallel_workers and the registered hosts and workers, and a run\
+        waiting on its last tasks no longer leaves the others idle.
+
+    Runs are prioritized by parameter value, oldest (smallest) first: when\
+        tasks of several runs are ready, those of the oldest run start first.\
+        max_parallel_per_run caps the tasks of a single run running at once,\
+        so that a wide run can't hold every slot. The hosts, workers and\
+        max_parallel_workers of the template DAGs are ignored.
+    """
+
+    def __init__(self, template: Callable[[Any], DAG], params: Iterable, max_parallel_workers: int = 1,
+                 max_parallel_per_run: int = None, poll_interval: float = 1.0, newest_first: bool = False):
+        """Class constructor, builds every run.
+
+        :param template: function building the DAG of a run from its parameter value
+        :type template: Callable[[Any], DAG]
+        :param params: parameter values, one run each; they must be sortable and unique
+        :type params: Iterable
+        :param max_parallel_workers: maximum number of tasks to run in parallel, across runs, defaults to 1
+        :type max_parallel_workers: int, optional
+        :param max_parallel_per_run: maximum number of tasks of a run to run in parallel,\
+            defaults to None (only bound by max_parallel_workers)
+        :type max_parallel_per_run: int, optional
+        :param poll_interval: seconds between two scheduler ticks, defaults to 1.0
+        :type poll_interval: float, optional
+        :param newest_first: prioritize the newest (largest) parameter values instead, defaults to False
+        :type newest_first: bool, optional
+        :raises ValueError: duplicate parameter values
+        """
+        super(Backfill, self).__init__(max_parallel_workers, poll_interval)
+        self.max_parallel_per_run = max_parallel_per_run
+        self.runs = {}
+        for param in sorted(params, reverse=newest_first):
+            self._add_run(param, template(param))
+        return
+
+    def _add_run(self, param, dag: DAG):
+        """Add the tasks of a run, prefixing their names.
+
+        :param param: parameter value of the run
+        :type param: Any
+        :param dag: DAG built by the template
+        :type dag: DAG
+        :raises ValueError: duplicate parameter value
+        """
+        if param in self.runs:
+            raise ValueError(f"Duplicate backfill parameter '{param}'")
+        tasks = list(dag.tasks.values())
+        for t in tasks:
+            t.name = f'{param}/{t.get_name()}'
+            self.add_task(t)
+        self.runs[param] = tasks
+        if self.max_parallel_per_run is not None:
+            self.set_group(tasks, param, self.max_parallel_per_run)
+        return
+
+    def get_params(self) -> List[Any]:
+        """Get the parameter values, by priority.
+
+        :return: parameter values
+        :rtype: List[Any]
+        """
+        return list(self.runs)
+
+    def get_run(self, param) -> List[Task]:
+        """Get the tasks of a run.
+
+        :param param: parameter value of the run
+        :type param: Any
+        :raises KeyError: unknown parameter value
+        :return: tasks built by the template, renamed
+        :rtype: List[Task]
+        """
+        return self.runs[param]
+
+    def get_run_status(self, param) -> str:
+        """Get the status of a run.
+
+        :param param: parameter value of the run
+        :type param: Any
+        :raises KeyError: unknown parameter value
+        :return: failed if any task failed, succeeded if every task succeeded,\
+            running if any task started and waiting otherwise
+        :rtype: str
+        """
+        statuses = {t.status for t in self.runs[param]}
+        if _status_failed in statuses:
+            return _status_failed
+        if statuses <= {_status_succeeded}:
+            return _status_succeeded
+        if statuses & {_status_running, _status_succeeded}:
+            return _status_running
+        return _status_waiting
+
+    def get_statuses(self) -> Dict[Any, str]:
+        """Get the status of every run, see get_run_status.
+
+        :return: run status by parameter value, by priority
+        :rtype: Dict[Any, str]
+        """
+        return {param: self.get_run_status(param) for param in self.runs}
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+from typing import List
+
+from .failure import FailurePolicy
+from .spec import load_dag, load_spec
+from .store import TaskStore
+from .task import _status_failed, _status_succeeded
+
+
+def run(args: argparse.Namespace) -> int:
+    """Run a DAG spec file and print the outcome of every task.
+
+    :return: 0 if every task succeeded, 1 otherwise
+    :rtype: int
+    """
+    if args.store is not None:
+        return run_store(args)
+    dag = load_dag(args.spec, max_parallel_workers=args.workers)
+    dag.poll_interval = args.poll_interval
+    dag.run(
+        fuse=args.fuse,
+        incremental=args.incremental,
+        timeout=args.timeout,
+        failure_policy=FailurePolicy.fail_fast() if args.fail_fast else None
+        )
+    failed = 0
+    for t in dag.tasks.values():
+        print(t)
+        failed += t.status != _status_succeeded
+    return 1 if failed else 0
+
+
+def run_store(args: argparse.Namespace) -> int:
+    """Run a DAG spec file out of core, printing the failed tasks and the number of tasks by status.
+
+    The spec is only loaded into the store if it is empty, so running again resumes an interrupted run.
+
+    :return: 0 if every task succeeded, 1 otherwise
+    :rtype: int
+    """
+    with TaskStore(args.store) as store:
+        spec = None
+        if not store.get_counts():
+            spec = load_spec(args.spec)
+            store.add_spec(spec)
+        workers = args.workers
+        if workers is None:
+            workers = 1 if spec is None else spec.get('max_parallel_workers', 1)
+        store.run(max_parallel_workers=workers, poll_interval=args.poll_interval)
+        failed = store.get_failed()
+        for name in failed:
+            print(f"Task<{name}> ({_status_failed})")
+        print(', '.join(f'{status}: {n}' for status, n in sorted(store.get_counts().items())))
+    return 1 if failed else 0
+
+
+def main(argv: List[str] = None) -> int:
+    """Entry point of the ``psyched`` command.
+
+    :param argv: command line arguments, defaults to sys.argv
+    :type argv: List[str], optional
+    :return: exit status
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(prog='psyched', description="Run psyched DAGs.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    parser_run = subparsers.add_parser('run', help="run a DAG spec file (.json, .yaml or .bin)")
+    parser_run.add_argument('spec', help="path of the DAG spec file")
+    parser_run.add_argument('--workers', type=int, default=None,
+                            help="maximum number of tasks to run in parallel, defaults to the spec one")
+    parser_run.add_argument('--fuse', action='store_true', help="fuse linear chains of tasks")
+    parser_run.add_argument('--incremental', action='store_true', help="skip tasks whose outputs are up to date")
+    parser_run.add_argument('--timeout', type=float, default=None, help="seconds after which the run is cancelled")
+    parser_run.add_argument('--fail-fast', action='store_true', help="cancel the run on the first failure")
+    parser_run.add_argument('--poll-interval', type=float, default=1.0, help="seconds between scheduler ticks")
+    parser_run.add_argument('--store', default=None,
+                            help="SQLite database to run the DAG out of core from, resumed if it exists "
+                                 "(--fuse, --incremental, --timeout and --fail-fast don't apply)")
+    parser_run.set_defaults(handler=run)
+    args = parser.parse_args(argv)
+    return args.handler(args)
@@ -1,20 +1,86 @@
+import os
+import select
 import time
 
-from .task import DockerTask, PythonTask, ShellTask, Task
+from collections import Counter, deque
+from typing import Dict, List, Union
+
+from .admission import AdmissionController
+from .affinity import CpuAllocator
+from .failure import FailurePolicy
+from .host import DockerHost
+from .inotify import IN_ATTRIB, IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_MOVED_FROM, IN_MOVED_TO, Inotify
+from .launcher import Launcher
+from .metrics import MetricsRegistry
+from .simulation import SimulationReport, simulate
+from .speculation import SpeculationPolicy
+from .task import (DockerTask, FusedTask, MappedTask, PythonTask, SensorTask, ShellTask, Task, _status_failed,
+                   _status_running, _status_scheduled, _status_succeeded, _status_waiting)
+from .task.python_task import _executor_process, _reserve_threads
+from .utils import get_mtimes
+from .worker import RemoteWorker
+
+_watch_mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_ATTRIB
+
+Host = Union[DockerHost, RemoteWorker]
 
 
 class DAG (object):
-    """DAG class to manage task dependencies."""
+    """DAG class to manage task dependencies.
 
-    def __init__(self, max_parallel_workers: int = 1):
+    At most max_parallel_workers local tasks run at once, every task of a\
+        streaming pipeline included. The only exception is a pipeline longer\
+        than the limit: it starts once no other local task runs.
+    """
+
+    def __init__(self, max_parallel_workers: int = 1, poll_interval: float = 1.0):
         """Class constructor.
 
         :param max_parallel_workers: maximum number of tasks to run in parallel, defaults to 1
         :type max_parallel_workers: int, optional
+        :param poll_interval: seconds between two scheduler ticks, defaults to 1.0
+        :type poll_interval: float, optional
         """
         self.tasks = dict()
         self.max_parallel_tasks = max_parallel_workers
+        self.admitted_tasks = max_parallel_workers
+        self.affinity = None
+        self.poll_interval = poll_interval
         self.running = 0
+        self.docker_hosts = []
+        self.workers = []
+        self.duplicates = {}
+        self.merged = {}
+        self.groups = {}
+        self.group_limits = {}
+        self.cancelled = False
+        self.watching = False
+        return
+
+    def add_docker_host(self, host: DockerHost):
+        """Register a Docker host to place DockerTasks on.
+
+        Once at least one host is registered, DockerTasks are no longer bound by\
+            max_parallel_workers: each one is started on the host with the most\
+            free capacity, and waits while every host is full.
+
+        :param host: Docker host to add
+        :type host: DockerHost
+        """
+        self.docker_hosts.append(host)
+        return
+
+    def add_worker(self, worker: RemoteWorker):
+        """Register a remote worker agent to dispatch ShellTasks and PythonTasks to.
+
+        Once at least one worker is registered, ShellTasks and PythonTasks are\
+            no longer bound by max_parallel_workers: each one is sent to the\
+            worker with the most free slots, and waits while every worker is full.
+
+        :param worker: worker to add
+        :type worker: RemoteWorker
+        """
+        self.workers.append(worker)
         return
 
     def add_task(self, task: Task):
@@ -26,6 +92,25 @@ class DAG (object):
         self.tasks[task.get_name()] = task
         return
 
+    def set_group(self, tasks: List[Task], group, limit: int):
+        """Cap the number of tasks of a group running at once.
+
+        The cap applies on top of max_parallel_workers and of the host\
+            capacities. Instances of a MappedTask belong to its group, and\
+            SensorTasks are never held back by it.
+
+        :param tasks: tasks of the group
+        :type tasks: List[Task]
+        :param group: hashable group key
+        :type group: Any
+        :param limit: maximum number of tasks of the group running at once
+        :type limit: int
+        """
+        for t in tasks:
+            self.groups[t] = group
+        self.group_limits[group] = limit
+        return
+
     def new_task(self, name: str, task_type: str, **kwargs) -> Task:
         """Create a new Task and add it to this DAG.
 
@@ -50,26 +135,763 @@ class DAG (object):
         elif task_type == 'shell':
             command = kwargs['command']
             t = ShellTask(name, command)
+        elif task_type == 'mapped':
+            t = MappedTask(name, kwargs['factory'], kwargs['items_from'])
+        elif task_type == 'sensor':
+            t = SensorTask(name, **kwargs)
         else:
             raise ValueError(f"Unknown task type '{task_type}'")
         self.add_task(t)
         return t
 
-    def run(self):
+    def dedup(self) -> Dict[Task, Task]:
+        """Merge the waiting tasks doing the exact same work, so that it runs once.
+
+        Tasks are identical when they have the same fingerprint (see\
+            ``Task.get_fingerprint``), timeout, retry policy, declared inputs\
+            and outputs, and upstream tasks, compared once merged themselves,\
+            so identical chains are merged as a whole. The first of them in\
+            topological order runs; the others are detached from the DAG, their\
+            downstream tasks depending on it instead. They stay in the DAG and\
+            take its status, times, resources and logs, so they can still be\
+            looked up by name.
+
+        :return: every merged task, mapped to the task run in its place
+        :rtype: Dict[Task, Task]
+        """
+        kept = {}
+        merged = {}
+        for t in self.get_topological_order():
+            if t.status != _status_waiting or t.merged_into is not None or t.mapped_from is not None:
+                continue
+            fingerprint = t.get_fingerprint()
+            if fingerprint is None:
+                continue
+            key = (fingerprint, frozenset(t.upstream), t.timeout, t.retry, tuple(t.inputs), tuple(t.outputs))
+            first = kept.setdefault(key, t)
+            if first is not t:
+                self._merge(t, first)
+                merged[t] = first
+        self._sync_merged()
+        return merged
+
+    def _merge(self, task: Task, kept: Task):
+        """Detach a task from the DAG, moving its downstream tasks to an identical one.
+
+        :param task: task not to run
+        :type task: Task
+        :param kept: identical task run in its place
+        :type kept: Task
+        """
+        for t in task.upstream:
+            t.downstream.remove(task)
+        for t in task.downstream:
+            t.upstream.remove(task)
+            t.set_upstream(kept)
+        task.upstream = []
+        task.downstream = []
+        task.merged_into = kept
+        self.merged[task] = kept
+        return
+
+    def _sync_merged(self):
+        """Give the merged tasks the status of the tasks run in their place."""
+        for t, kept in self.merged.items():
+            t.status = kept.status
+            t.scheduled_time = kept.scheduled_time
+            t.start_time = kept.start_time
+            t.end_time = kept.end_time
+            t.skipped = kept.skipped
+            t.timed_out = kept.timed_out
+            t.resources = kept.resources
+        return
+
+    def run(self, fuse: bool = False, incremental: bool = False, speculation: SpeculationPolicy = None,
+            timeout: float = None, failure_policy: FailurePolicy = None, metrics: MetricsRegistry = None,
+            profile_dir: str = None, launcher: Launcher = None, admission: AdmissionController = None,
+            dedup: bool = False, affinity: CpuAllocator = None):
         """Run the tasks in the DAG following dependencies.
 
-        Blocks until every task has either succeeded or failed.
+        Blocks until every task has either succeeded or failed. Tasks running\
+            for longer than their own timeout (see ``Task.set_timeout``) are\
+            killed and fail, freeing their slot for other tasks.
+
+        :param fuse: run linear chains of PythonTasks, ShellTasks or same-image\
+            DockerTasks as single units (see FusedTask), defaults to False
+        :type fuse: bool, optional
+        :param incremental: skip tasks whose declared outputs are newer than\
+            their declared inputs, provided every upstream task was skipped too,\
+            like make does, defaults to False
+        :type incremental: bool, optional
+        :param speculation: policy to launch duplicates of straggling idempotent\
+            ShellTasks and DockerTasks; those of the last run are kept in\
+            ``duplicates`` by original task, apart from ``tasks``, defaults to None (no speculation)
+        :type speculation: SpeculationPolicy, optional
+        :param timeout: seconds after which the whole run is cancelled (see cancel), defaults to None (no limit)
+        :type timeout: float, optional
+        :param failure_policy: policy cancelling the run once failures doom it,\
+            defaults to None (the rest of the DAG keeps running)
+        :type failure_policy: FailurePolicy, optional
+        :param metrics: registry updated on every scheduler tick, defaults to None
+        :type metrics: MetricsRegistry, optional
+        :param profile_dir: profile every PythonTask not profiled already, writing\
+            the reports to this directory (see ``PythonTask.set_profile``), defaults to None
+        :type profile_dir: str, optional
+        :param launcher: helper process to start the local ShellTasks commands through,\
+            for those without their own launcher (see Launcher), defaults to None
+        :type launcher: Launcher, optional
+        :param admission: controller lowering the number of local tasks run in parallel\
+            while the host is loaded, defaults to None (always max_parallel_workers)
+        :type admission: AdmissionController, optional
+        :param dedup: run identical ShellTasks and DockerTasks once (see dedup), defaults to False
+        :type dedup: bool, optional
+        :param affinity: allocator pinning each local ShellTask, DockerTask and\
+            PythonTask with the ``process`` executor to dedicated CPUs while it\
+            runs; tasks wait for their CPUs (see ``Task.set_cpus``) to be free,\
+            defaults to None (not pinned)
+        :type affinity: CpuAllocator, optional
         """
+        self.cancelled = False
+        self.duplicates = {}
+        self.admitted_tasks = self.max_parallel_tasks
+        self.affinity = affinity
+        deadline = None if timeout is None else time.time() + timeout
+        if incremental:
+            self._skip_up_to_date()
+        if dedup:
+            self.dedup()
+        if profile_dir is not None:
+            self._profile(self.tasks.values(), profile_dir)
+        if launcher is not None:
+            self._use_launcher(self.tasks.values(), launcher)
+        _reserve_threads(self.max_parallel_tasks)
+        units = self._get_units(fuse)
+        siblings = {}
+        if speculation is not None:
+            for t in self.tasks.values():
+                siblings.setdefault(t.get_sibling_key(), []).append(t)
         for k in self.tasks:
-            self.tasks[k].try_to_schedule()
-        pending = len(self.tasks)
+            if self.tasks[k].status == _status_waiting and self.tasks[k].merged_into is None:
+                self.tasks[k].try_to_schedule()
+        pending = len(units)
         while pending > 0:
             pending = 0
-            time.sleep(1)
+            time.sleep(self.poll_interval)
+            tick_start = time.time()
 
-            for k in self.tasks:
-                d_run = self.tasks[k].update_status(runnable=self.running < self.max_parallel_tasks)
-                self.running += d_run
-                if self.tasks[k].is_pending():
+            if self.cancelled or (deadline is not None and time.time() > deadline):
+                self._cancel_units(units)
+                break
+            now = time.time()
+            for task in units:
+                if task.has_timed_out(now):
+                    task.timed_out = True
+                    self._kill_task(task)
+            if admission is not None:
+                self.admitted_tasks = admission.get_limit(self.running, self.max_parallel_tasks, now)
+            expanded = []
+            group_running = self._count_group_running(units)
+            for task in units:
+                hosts = self._get_hosts(task)
+                group = self._get_group(task)
+                has_room = group is None or group_running[group] < self.group_limits[group]
+                was_scheduled = task.status == _status_scheduled
+                if isinstance(task, MappedTask):
+                    expanded += self._update_mapped_task(task)
+                elif hosts:
+                    self._update_placed_task(task, hosts, has_room)
+                elif isinstance(task, SensorTask):
+                    # Waiting doesn't take a worker slot
+                    task.update_status(runnable=True)
+                else:
+                    runnable = has_room and self._has_free_slots(task)
+                    if runnable and task.status == _status_scheduled and self._can_pin(task):
+                        task.cpuset = self.affinity.acquire(task.cpu_request)
+                        runnable = task.cpuset is not None
+                    d_run = task.update_status(runnable=runnable)
+                    self.running += d_run
+                    if task.cpuset is not None and task.status != _status_running:
+                        self._unpin(task)
+                if group is not None and was_scheduled and task.status == _status_running:
+                    group_running[group] += 1
+                if task.is_pending():
                     pending += 1
+            units += expanded
+            if profile_dir is not None:
+                self._profile(expanded, profile_dir)
+            if launcher is not None:
+                self._use_launcher(expanded, launcher)
+            if speculation is not None:
+                for t in expanded:
+                    siblings.setdefault(t.get_sibling_key(), []).append(t)
+                self._speculate(speculation, units, siblings)
+            if failure_policy is not None and failure_policy.should_stop(self.tasks.values()):
+                self.cancelled = True
+                self._cancel_units(units)
+                break
+            self._sync_merged()
+            if metrics is not None:
+                metrics.observe(self.tasks.values(), self.running, time.time() - tick_start)
+        self._sync_merged()
+        if metrics is not None:
+            metrics.observe(self.tasks.values(), self.running)
+        if speculation is not None:
+            for t in self.tasks.values():
+                speculation.record(t)
+        return
+
+    def simulate(self, durations: Dict[str, float] = None, default_duration: float = 1.0,
+                 max_parallel_workers: int = None, capacities: Dict[Host, int] = None) -> SimulationReport:
+        """Predict how the DAG would run with a virtual clock, without running anything.
+
+        See ``psyched.simulation.simulate`` for the parameters.
+
+        :return: makespan, utilization and critical path of the run
+        :rtype: SimulationReport
+        """
+        return simulate(self, durations, default_duration, max_parallel_workers, capacities)
+
+    def _profile(self, tasks: List[Task], profile_dir: str):
+        """Profile the PythonTasks that aren't profiled yet.
+
+        :param tasks: tasks to profile
+        :type tasks: List[Task]
+        :param profile_dir: directory to write the reports to
+        :type profile_dir: str
+        """
+        for t in tasks:
+            if isinstance(t, PythonTask) and t.profiler is None:
+                t.set_profile(profile_dir)
+        return
+
+    def _use_launcher(self, tasks: List[Task], launcher: Launcher):
+        """Start the ShellTasks without a launcher through the given one.
+
+        :param tasks: tasks to update
+        :type tasks: List[Task]
+        :param launcher: launcher to use
+        :type launcher: Launcher
+        """
+        for t in tasks:
+            if isinstance(t, ShellTask) and t.launcher is None:
+                t.set_launcher(launcher)
+        return
+
+    def cancel(self):
+        """Stop a run: running tasks are killed and every unfinished task fails.
+
+        Meant to be called from another thread (or a signal handler) while\
+            run blocks, which returns within a second. ``cancelled`` stays set\
+            after the run, also when a FailurePolicy stopped it. Also stops watch.
+        """
+        self.cancelled = True
+        self.watching = False
+        return
+
+    def get_affected(self, tasks: List[Task]) -> List[Task]:
+        """Get the tasks to run again when the given ones have to.
+
+        Those are the tasks and everything downstream from them, plus what\
+            their runs need from upstream: the PythonTasks whose results they\
+            receive, as results are released once consumed, and the producers\
+            of the pipelines they are part of. The MappedTask they were\
+            expanded from stands for mapped instances, and the task run in\
+            their place for merged tasks (see dedup).
+
+        :param tasks: tasks to run again
+        :type tasks: List[Task]
+        :return: affected tasks, in topological order
+        :rtype: List[Task]
+        """
+        affected = set()
+        stack = [t.mapped_from or t.merged_into or t for t in tasks]
+        while stack:
+            t = stack.pop()
+            if t in affected:
+                continue
+            affected.add(t)
+            stack += t.downstream
+            if isinstance(t, PythonTask):
+                stack += t.result_kwargs.values()
+            if isinstance(t, ShellTask) and t.stream_upstream is not None:
+                stack.append(t.stream_upstream)
+        return [t for t in self.get_topological_order() if t in affected]
+
+    def reset(self, tasks: List[Task]) -> List[Task]:
+        """Reset tasks and the tasks affected by them (see get_affected), so that the next run runs them again.
+
+        Tasks downstream from a failed task that isn't reset fail right away.
+
+        :param tasks: tasks to run again
+        :type tasks: List[Task]
+        :return: reset tasks, in topological order
+        :rtype: List[Task]
+        """
+        affected = self.get_affected(tasks)
+        for t in affected:
+            if isinstance(t, MappedTask):
+                for instance in t.instances:
+                    del self.tasks[instance.get_name()]
+            self.duplicates.pop(t, None)
+            t.reset()
+        for t in affected:
+            if t.status == _status_waiting and any(u.status == _status_failed for u in t.upstream):
+                t.fail()
+        self._sync_merged()
+        return affected
+
+    def _get_watched_inputs(self) -> Dict[str, List[Task]]:
+        """Get the tasks reading each declared input, by absolute path, leaving out the outputs of other tasks."""
+        outputs = {os.path.abspath(p) for t in self.tasks.values() for p in t.get_outputs()}
+        inputs = {}
+        for t in self.tasks.values():
+            for p in t.get_inputs():
+                path = os.path.abspath(p)
+                if path not in outputs:
+                    inputs.setdefault(path, []).append(t)
+        return inputs
+
+    def _watch_dirs(self, inotify: Inotify, paths: List[str]):
+        """Watch the directories holding the paths, or their deepest existing ancestor."""
+        for path in paths:
+            d = os.path.dirname(path)
+            while not os.path.isdir(d):
+                d = os.path.dirname(d)
+            try:
+                inotify.add_watch(d, _watch_mask)
+            except OSError:
+                pass
+        return
+
+    def _wait_for_changes(self, inotify: Inotify, mtimes: Dict[str, float], debounce: float) -> List[str]:
+        """Block until watched inputs changed since mtimes were taken, or watching stops.
+
+        Once a change is seen, waits for debounce seconds without events (or\
+            changes when polling) before reporting, so that a burst of writes\
+            causes a single run.
+
+        :return: changed paths, empty if watching stopped first
+        """
+        while self.watching:
+            current = get_mtimes(mtimes)
+            if current != mtimes:
+                while True:
+                    if inotify is not None:
+                        quiet = not select.select([inotify], [], [], debounce)[0]
+                        inotify.read()
+                    else:
+                        time.sleep(debounce)
+                        quiet = True
+                    settled = get_mtimes(mtimes)
+                    if quiet and settled == current:
+                        break
+                    current = settled
+                return [p for p in mtimes if current[p] != mtimes[p]]
+            if inotify is None:
+                time.sleep(self.poll_interval)
+            elif select.select([inotify], [], [], self.poll_interval)[0]:
+                inotify.read()
+                # New directories may have been created on the way to the inputs
+                self._watch_dirs(inotify, list(mtimes))
+        return []
+
+    def watch(self, debounce: float = 0.5, use_inotify: bool = True, **kwargs):
+        """Run the DAG, then run the affected tasks again every time a declared input changes.
+
+        Blocks until cancel is called. The inputs declared with\
+            ``Task.set_inputs`` are watched, except the ones declared as the\
+            output of some task, which change because of the runs themselves.\
+            After a change the tasks reading the changed inputs are reset,\
+            along with everything affected by them (see reset), and the DAG is\
+            run again: tasks that aren't affected keep their outcome and aren't\
+            run again.
+
+        The directories holding the inputs are watched with inotify, where\
+            available; otherwise the inputs are stat'ed every poll_interval\
+            seconds. Changes made while a run is in progress are picked up once\
+            it is over.
+
+        kwargs are passed to run on every run.
+
+        :param debounce: seconds without changes to wait for before running,\
+            so that bursts of changes (an editor saving many files, a\
+            checkout...) cause a single run, defaults to 0.5
+        :type debounce: float, optional
+        :param use_inotify: whether to use inotify when available, defaults to True
+        :type use_inotify: bool, optional
+        """
+        self.watching = True
+        inputs = self._get_watched_inputs()
+        inotify = None
+        if use_inotify:
+            try:
+                inotify = Inotify()
+            except OSError:
+                pass
+        try:
+            if inotify is not None:
+                self._watch_dirs(inotify, list(inputs))
+            mtimes = get_mtimes(inputs)
+            self.run(**kwargs)
+            while self.watching:
+                # mtimes were taken before the run, so changes made during it are picked up
+                changed = self._wait_for_changes(inotify, mtimes, debounce)
+                if not changed:
+                    break
+                mtimes = get_mtimes(inputs)
+                self.reset([t for p in changed for t in inputs[p]])
+                self.run(**kwargs)
+        finally:
+            self.watching = False
+            if inotify is not None:
+                inotify.close()
+        return
+
+    def _cancel_units(self, units: List[Task]):
+        """Kill the running units and duplicates, and fail every unfinished task.
+
+        :param units: units being run
+        :type units: List[Task]
+        """
+        for task in units + list(self.duplicates.values()):
+            if task.status == _status_running:
+                self._kill_task(task)
+        for task in units + list(self.tasks.values()):
+            if task.is_pending():
+                task.fail()
+        return
+
+    def _kill_task(self, task: Task):
+        """Kill a running task, fail it and free its slot.
+
+        Killing a MappedTask kills its running instances and fails the other unfinished ones.
+
+        :param task: running task
+        :type task: Task
+        """
+        if isinstance(task, MappedTask):
+            for t in task.instances:
+                if t.status == _status_running:
+                    self._kill_task(t)
+                elif t.is_pending():
+                    t.fail()
+        else:
+            task.kill()
+            self._release_slot(task)
+        task.fail()
+        return
+
+    def _speculate(self, speculation: SpeculationPolicy, units: List[Task], siblings: dict):
+        """Settle the races between tasks and their duplicates, and launch new duplicates.
+
+        :param speculation: policy deciding which tasks to duplicate
+        :type speculation: SpeculationPolicy
+        :param units: units being run
+        :type units: List[Task]
+        :param siblings: tasks by sibling key
+        :type siblings: dict
+        """
+        for original, duplicate in self.duplicates.items():
+            if duplicate.status != _status_running:
+                continue
+            if original.status != _status_running:
+                # The original finished first, whatever its outcome
+                duplicate.kill()
+                duplicate.fail()
+                self._release_slot(duplicate)
+            elif duplicate.try_to_finish():
+                self._release_slot(duplicate)
+                if duplicate.status == _status_succeeded:
+                    original.kill()
+                    self._release_slot(original)
+                    original.succeed()
+        now = time.time()
+        for task in units:
+            if task.status != _status_running or task in self.duplicates:
+                continue
+            if isinstance(task, ShellTask):
+                if task.is_streaming() or task.host is not None:
+                    continue
+            elif not isinstance(task, DockerTask):
+                continue
+            if not speculation.should_speculate(task, siblings[task.get_sibling_key()], now):
+                continue
+            duplicate = task.duplicate(f'{task.get_name()}~speculative')
+            if not self._acquire_slot(duplicate):
+                continue
+            duplicate.try_to_schedule()
+            try:
+                duplicate.update_status(runnable=True)
+            except Exception:
+                self._release_slot(duplicate)
+                raise
+            self.duplicates[task] = duplicate
+        return
+
+    def _acquire_slot(self, task: Task) -> bool:
+        """Reserve a worker slot, or a slot on a host, for a task about to be run.
+
+        :param task: task to run
+        :type task: Task
+        :return: whether a slot was free
+        :rtype: bool
+        """
+        hosts = self._get_hosts(task)
+        if hosts:
+            host = self._pick_host(hosts)
+            if host is None:
+                return False
+            host.acquire()
+            task.host = host
+            return True
+        if self.running >= self.admitted_tasks:
+            return False
+        self.running += 1
+        return True
+
+    def _has_free_slots(self, task: Task) -> bool:
+        """Check if enough local slots are free to start a task.
+
+        A pipeline takes a slot per task in it. One longer than the limit\
+            waits until no other task runs instead, and then exceeds it.
+
+        :param task: task to start
+        :type task: Task
+        :return: whether the task can start
+        :rtype: bool
+        """
+        slots = 1
+        if isinstance(task, ShellTask) and task.is_streaming():
+            slots = min(len(task.get_pipeline()), self.admitted_tasks)
+        return self.running < self.admitted_tasks and self.running + slots <= self.admitted_tasks
+
+    def _release_slot(self, task: Task):
+        """Free the slot taken by a task that stopped running.
+
+        :param task: task that ran
+        :type task: Task
+        """
+        if task.host is not None:
+            task.host.release()
+        elif not isinstance(task, SensorTask):
+            self.running -= 1
+        if task.cpuset is not None:
+            self._unpin(task)
+        return
+
+    def _can_pin(self, task: Task) -> bool:
+        """Check if a task about to run locally gets dedicated CPUs.
+
+        :param task: task to run
+        :type task: Task
+        :return: whether the run has a CpuAllocator and the task can be pinned
+        :rtype: bool
+        """
+        if self.affinity is None:
+            return False
+        if isinstance(task, ShellTask):
+            return not task.is_streaming()
+        if isinstance(task, PythonTask):
+            return task.executor == _executor_process
+        return isinstance(task, DockerTask)
+
+    def _unpin(self, task: Task):
+        """Give back the CPUs of a task that stopped running.
+
+        :param task: pinned task
+        :type task: Task
+        """
+        self.affinity.release(task.cpuset)
+        task.cpuset = None
+        return
+
+    def _update_mapped_task(self, task: MappedTask) -> List[Task]:
+        """Update a MappedTask status, expanding it once scheduled.
+
+        Expanding doesn't take a worker slot; the instances are added to the DAG.
+
+        :param task: task to update
+        :type task: MappedTask
+        :return: newly created instances
+        :rtype: List[Task]
+        """
+        if task.status == _status_scheduled:
+            instances = task.expand()
+            for t in instances:
+                self.add_task(t)
+            return instances
+        if task.status == _status_running:
+            task.try_to_finish()
+        return []
+
+    def get_topological_order(self) -> List[Task]:
+        """Get the tasks sorted so that every task comes after its upstream tasks.
+
+        :return: tasks in the DAG
+        :rtype: List[Task]
+        """
+        tasks = list(self.tasks.values())
+        missing = {t: len(t.upstream) for t in tasks}
+        ready = deque(t for t in tasks if missing[t] == 0)
+        order = []
+        while ready:
+            t = ready.popleft()
+            order.append(t)
+            for d in t.downstream:
+                missing[d] -= 1
+                if missing[d] == 0:
+                    ready.append(d)
+        return order
+
+    def _skip_up_to_date(self):
+        """Skip the tasks whose outputs are up to date and whose upstream tasks were all skipped.
+
+        Every declared file is stat'ed once. A streaming pipeline is only\
+            skipped as a whole, once its last task is reached, and\
+            MappedTasks are never skipped.
+        """
+        order = self.get_topological_order()
+        mtimes = get_mtimes(p for t in order for p in t.get_inputs() + t.get_outputs())
+        for t in order:
+            if isinstance(t, MappedTask) or t.status != _status_waiting:
+                continue
+            members = [t]
+            if isinstance(t, ShellTask) and t.is_streaming():
+                if t.stream_downstream is not None:
+                    # Every upstream task of the pipeline comes before its last task
+                    continue
+                head = t
+                while head.stream_upstream is not None:
+                    head = head.stream_upstream
+                members = head.get_pipeline()
+            if not all(m.is_up_to_date(mtimes) for m in members):
+                continue
+            if all(u.skipped for m in members for u in m.upstream if u not in members):
+                for m in members:
+                    m.skip()
+        return
+
+    def _get_units(self, fuse: bool) -> List[Task]:
+        """Get the units of work to run, fusing linear chains of tasks if asked to.
+
+        Tasks running on remote workers are never fused, and merged tasks\
+            (see dedup) aren't run.
+
+        :param fuse: whether to fuse chains
+        :type fuse: bool
+        :return: tasks and FusedTasks covering every task in the DAG
+        :rtype: List[Task]
+        """
+        if not fuse:
+            return [t for t in self.tasks.values() if t.is_pending() and t.merged_into is None]
+
+        def can_fuse(a: Task, b: Task) -> bool:
+            if not a.is_pending() or not b.is_pending():
+                return False
+            if self.workers and isinstance(a, (ShellTask, PythonTask)):
+                return False
+            return FusedTask.can_fuse(a, b)
+
+        units = []
+        for task in self.tasks.values():
+            if not task.is_pending() or task.merged_into is not None:
+                continue
+            if len(task.upstream) == 1 and can_fuse(task.upstream[0], task):
+                continue
+            chain = [task]
+            while len(chain[-1].downstream) == 1 and can_fuse(chain[-1], chain[-1].downstream[0]):
+                chain.append(chain[-1].downstream[0])
+            units.append(FusedTask(chain) if len(chain) > 1 else task)
+        return units
+
+    def _get_hosts(self, task: Task) -> List[Host]:
+        """Get the registered hosts a task can be placed on.
+
+        Streaming ShellTasks always run locally, as their pipes can't cross machines.
+
+        :param task: task to place
+        :type task: Task
+        :return: candidate hosts, empty if the task runs locally
+        :rtype: List[Union[DockerHost, RemoteWorker]]
+        """
+        if isinstance(task, FusedTask):
+            task = task.members[0]
+            if not isinstance(task, DockerTask):
+                return []
+        if isinstance(task, DockerTask):
+            return self.docker_hosts
+        if isinstance(task, ShellTask) and task.is_streaming():
+            return []
+        if isinstance(task, (ShellTask, PythonTask)):
+            return self.workers
+        return []
+
+    def _pick_host(self, hosts: List[Host]) -> Host:
+        """Get the host with the most free capacity.
+
+        :param hosts: candidate hosts
+        :type hosts: List[Union[DockerHost, RemoteWorker]]
+        :return: chosen host, or None if every host is full
+        :rtype: Union[DockerHost, RemoteWorker]
+        """
+        best = max(hosts, key=lambda h: h.free_slots())
+        if best.free_slots() <= 0:
+            return None
+        return best
+
+    def _get_group(self, task: Task):
+        """Get the group a unit belongs to, see set_group.
+
+        :param task: unit to look up
+        :type task: Task
+        :return: group key, None if the unit has no group or doesn't take a slot
+        :rtype: Any
+        """
+        if isinstance(task, (MappedTask, SensorTask)):
+            return None
+        if isinstance(task, FusedTask):
+            task = task.members[0]
+        if task.mapped_from is not None:
+            task = task.mapped_from
+        return self.groups.get(task)
+
+    def _count_group_running(self, units: List[Task]) -> Counter:
+        """Count the running units of each group.
+
+        :param units: units being run
+        :type units: List[Task]
+        :return: number of running units by group
+        :rtype: Counter
+        """
+        if not self.group_limits:
+            return Counter()
+        return Counter(self._get_group(t) for t in units if t.status == _status_running)
+
+    def _update_placed_task(self, task: Task, hosts: List[Host], runnable: bool = True):
+        """Update a task status placing it on one of the given hosts.
+
+        :param task: task to update
+        :type task: Task
+        :param hosts: candidate hosts
+        :type hosts: List[Union[DockerHost, RemoteWorker]]
+        :param runnable: whether the task may start, defaults to True
+        :type runnable: bool, optional
+        """
+        if task.status == _status_scheduled:
+            if not runnable or task.is_backing_off(time.time()):
+                return
+            host = self._pick_host(hosts)
+            if host is None:
+                return
+            host.acquire()
+            task.host = host
+            try:
+                task.update_status(runnable=True)
+            except Exception:
+                # Not started, e.g. the host can't be reached
+                host.release()
+                task.host = None
+                raise
+        elif task.update_status() == -1:
+            task.host.release()
         return
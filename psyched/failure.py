@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import Iterable, List
+
+from .task import Task, _status_failed
+
+
+class FailurePolicy(object):
+    """Policy deciding when failures doom a run, so that the rest of it is cancelled.
+
+    Only tasks that ran and failed count, not the tasks downstream from them\
+        failing without running. The default policy never stops a run, like\
+        running without a policy. ``FailurePolicy.fail_fast()`` stops on the\
+        first failure; a failure budget stops once max_failures tasks failed,\
+        or once max_mapped_failure_ratio of the instances of a MappedTask did.
+    """
+
+    def __init__(self, max_failures: int = None, max_mapped_failure_ratio: float = None):
+        """Class constructor.
+
+        :param max_failures: number of failed tasks stopping the run, defaults to None (no limit)
+        :type max_failures: int, optional
+        :param max_mapped_failure_ratio: fraction (between 0 and 1) of failed instances of\
+            a MappedTask stopping the run, defaults to None (no limit)
+        :type max_mapped_failure_ratio: float, optional
+        """
+        self.max_failures = max_failures
+        self.max_mapped_failure_ratio = max_mapped_failure_ratio
+        return
+
+    @staticmethod
+    def fail_fast() -> FailurePolicy:
+        """Get a policy stopping the run on the first failure.
+
+        :return: policy with a budget of one failure
+        :rtype: FailurePolicy
+        """
+        return FailurePolicy(max_failures=1)
+
+    def get_failures(self, tasks: Iterable[Task]) -> List[Task]:
+        """Get the tasks that ran and failed.
+
+        :param tasks: tasks to look at
+        :type tasks: Iterable[Task]
+        :return: failed tasks that were started
+        :rtype: List[Task]
+        """
+        return [t for t in tasks if t.status == _status_failed and t.start_time is not None]
+
+    def should_stop(self, tasks: Iterable[Task]) -> bool:
+        """Check if the failures so far exhaust the budget.
+
+        :param tasks: tasks in the run
+        :type tasks: Iterable[Task]
+        :return: whether the run should be cancelled
+        :rtype: bool
+        """
+        failures = self.get_failures(tasks)
+        if self.max_failures is not None and len(failures) >= self.max_failures:
+            return True
+        if self.max_mapped_failure_ratio is None:
+            return False
+        groups = {}
+        for t in failures:
+            if t.mapped_from is not None:
+                groups[t.mapped_from] = groups.get(t.mapped_from, 0) + 1
+        for mapped, count in groups.items():
+            if count >= self.max_mapped_failure_ratio * len(mapped.instances):
+                return True
+        return False
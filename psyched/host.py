@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import docker
+
+
+class DockerHost(object):
+    """Class representing a Docker daemon containers can be placed on."""
+
+    def __init__(self, base_url: str = None, capacity: int = 1,
+                 client: docker.DockerClient = None):
+        """Class constructor.
+
+        :param base_url: URL of the Docker daemon (e.g. ``tcp://build-1:2375``),\
+            defaults to None, meaning the daemon configured in the environment
+        :type base_url: str, optional
+        :param capacity: maximum number of containers to run simultaneously on this host, defaults to 1
+        :type capacity: int, optional
+        :param client: already connected client to use instead of connecting to base_url, defaults to None
+        :type client: docker.DockerClient, optional
+        """
+        if client is None:
+            if base_url is None:
+                client = docker.from_env()
+            else:
+                client = docker.DockerClient(base_url=base_url)
+        self.client = client
+        self.base_url = base_url
+        self.capacity = capacity
+        self.running = 0
+        self.pulled = set()
+        return
+
+    def free_slots(self) -> int:
+        """Get the number of containers that can still be placed on this host.
+
+        :return: capacity minus the number of running containers
+        :rtype: int
+        """
+        return self.capacity - self.running
+
+    def acquire(self):
+        """Reserve a slot on this host for a new container."""
+        assert self.running < self.capacity
+        self.running += 1
+        return
+
+    def release(self):
+        """Free a slot previously reserved with acquire."""
+        assert self.running > 0
+        self.running -= 1
+        return
+
+    def ensure_image(self, name: str, tag: str):
+        """Pull an image on this host unless it is already available.
+
+        :param name: image name
+        :type name: str
+        :param tag: image tag
+        :type tag: str
+        """
+        reference = f'{name}:{tag}'
+        if reference in self.pulled:
+            return
+        try:
+            self.client.images.get(reference)
+        except docker.errors.ImageNotFound:
+            self.client.images.pull(name, tag=tag)
+        self.pulled.add(reference)
+        return
+
+    def __str__(self) -> str:
+        return f'DockerHost<{self.base_url or "env"}> ({self.running}/{self.capacity})'
@@ -1,7 +1,11 @@
+from __future__ import annotations
+
 import os
 
 import docker
 
+from .host import DockerHost
+
 
 class Image(object):
     """Class representing a Docker Image."""
@@ -14,7 +18,7 @@ class Image(object):
         :param tag: image tag
         :type tag: str
         """
-        self.client = docker.from_env()
+        self.client = None
         self.name = name
         self.tag = tag
         self.volumes = {}
@@ -35,20 +39,37 @@ class Image(object):
         self.volumes[host_path] = {'bind': containter_path, 'mode': mode}
         return
 
-    def run_command(self, command: str) -> docker.models.containers.Container:
+    def run_command(self, command: str, host: DockerHost = None,
+                    cpuset_cpus: str = None) -> docker.models.containers.Container:
         """Run command in a detached container.
 
+        If a host is given the image is pulled there first (if needed) and the\
+            container is created on that daemon. Otherwise the daemon configured\
+            in the environment is used.
+
         :param command: command to run
         :type command: str
+        :param host: Docker host to run the container on, defaults to None
+        :type host: DockerHost, optional
+        :param cpuset_cpus: CPUs the container may run on, such as ``0-3``, defaults to None (any)
+        :type cpuset_cpus: str, optional
         :return: running container
         :rtype: docker.models.containers.Container
         """
-        container = self.client.containers.run(
+        if host is not None:
+            host.ensure_image(self.name, self.tag)
+            client = host.client
+        else:
+            if self.client is None:
+                self.client = docker.from_env()
+            client = self.client
+        container = client.containers.run(
             f'{self.name}:{self.tag}',
             command,
             detach=True,
             volumes=self.volumes,
-            stderr=True
+            stderr=True,
+            cpuset_cpus=cpuset_cpus
         )
         return container
 
@@ -56,4 +77,5 @@ class Image(object):
         return f'Image<{self.name}:{self.tag}>'
 
     def __del__(self):
-        self.client.close()
+        if self.client is not None:
+            self.client.close()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import struct
+from typing import List, Tuple
+
+# Flags from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+_event = struct.Struct('iIII')
+_read_size = 64 * 1024
+_libc = None
+
+
+def _get_libc() -> ctypes.CDLL:
+    """Load the C library, raising OSError if it has no inotify."""
+    global _libc
+    if _libc is None:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc = libc
+    return _libc
+
+
+class Inotify(object):
+    """Minimal non-blocking inotify instance, bound with ctypes.
+
+    Creating one raises OSError where inotify isn't available (not Linux,\
+        no C library found, or the per-user instance limit reached), so that\
+        callers can fall back to polling.
+    """
+
+    def __init__(self):
+        """Class constructor, creates the inotify instance."""
+        libc = _get_libc()
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.watches = {}
+        return
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """Watch a file or directory, or update the events watched on it.
+
+        :param path: path to watch
+        :type path: str
+        :param mask: events to report, ``IN_*`` flags
+        :type mask: int
+        :raises OSError: the path can't be watched, e.g. it doesn't exist
+        :return: watch descriptor
+        :rtype: int
+        """
+        wd = _get_libc().inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        self.watches[wd] = path
+        return wd
+
+    def read(self) -> List[Tuple[str, int, str]]:
+        """Get the pending events, without blocking.
+
+        :return: watched path, ``IN_*`` mask and file name (empty for the\
+            watched path itself) of each event
+        :rtype: List[Tuple[str, int, str]]
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, _read_size)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _event.unpack_from(data, offset)
+                offset += _event.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append((self.watches.get(wd), mask, name))
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+
+    def fileno(self) -> int:
+        """Get the inotify file descriptor, readable when events are pending.
+
+        :return: file descriptor
+        :rtype: int
+        """
+        return self.fd
+
+    def close(self):
+        """Close the inotify instance, removing every watch."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        return
+
+    def __enter__(self) -> Inotify:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import itertools
+import os
+import pickle
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import threading
+from typing import BinaryIO, List, Union
+
+from .utils import get_rusage, pinned
+
+_max_message = 1 << 20
+
+
+def _send(sock: socket.socket, message: dict, fds: List[int] = None):
+    socket.send_fds(sock, [pickle.dumps(message)], fds or [])
+    return
+
+
+def _spawn(sock: socket.socket, request: dict, fds: List[int], children: dict):
+    """Launch the command of a request, with its stdout, stderr and stdin taken from fds."""
+    for fd in fds:
+        # Keep the pipes of a command away from the commands launched after it
+        os.set_inheritable(fd, False)
+    stdout = fds[0]
+    stderr = fds[1] if request['stderr'] else stdout
+    actions = [(os.POSIX_SPAWN_DUP2, stdout, 1), (os.POSIX_SPAWN_DUP2, stderr, 2)]
+    if request['stdin']:
+        actions.append((os.POSIX_SPAWN_DUP2, fds[-1], 0))
+    command = request['command']
+    try:
+        with pinned(request.get('cpus')):
+            pid = os.posix_spawnp(command[0], command, os.environ, file_actions=actions, setsid=True)
+    except OSError as e:
+        os.write(stdout, f'psyched launcher: {e}\n'.encode('utf-8'))
+        _send(sock, {'id': request['id'], 'pid': None, 'exit': 127, 'resources': {}})
+    else:
+        children[pid] = request['id']
+        _send(sock, {'id': request['id'], 'pid': pid})
+    finally:
+        for fd in fds:
+            os.close(fd)
+    return
+
+
+def _reap(sock: socket.socket, children: dict):
+    """Report the exit status and resource usage of every finished command."""
+    while children:
+        try:
+            pid, status, rusage = os.wait4(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        _send(sock, {'id': children.pop(pid), 'exit': os.waitstatus_to_exitcode(status),
+                     'resources': get_rusage(rusage)})
+    return
+
+
+def _helper_main(fd: int):
+    """Serve launch requests from a Launcher until it goes away."""
+    sock = socket.socket(fileno=fd)
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    selector = selectors.DefaultSelector()
+    selector.register(sock, selectors.EVENT_READ)
+    selector.register(wakeup_r, selectors.EVENT_READ)
+    children = {}
+    while True:
+        for key, _ in selector.select():
+            if key.fileobj is sock:
+                data, fds, _, _ = socket.recv_fds(sock, _max_message, 3)
+                if not data:
+                    return
+                _spawn(sock, pickle.loads(data), fds, children)
+            else:
+                os.read(wakeup_r, 4096)
+                _reap(sock, children)
+
+
+class LaunchedProcess(object):
+    """Handle to a command started by a Launcher.
+
+    Mimics the parts of ``subprocess.Popen`` used by tasks.
+    """
+
+    def __init__(self, stdout: BinaryIO, stderr: BinaryIO = None):
+        """Class constructor.
+
+        :param stdout: read end of the command stdout
+        :type stdout: BinaryIO
+        :param stderr: read end of the command stderr if piped separately, defaults to None
+        :type stderr: BinaryIO, optional
+        """
+        self._pid = None
+        self.returncode = None
+        self.resources = {}
+        self.stdout = stdout
+        self.stderr = stderr
+        self.started = threading.Event()
+        self.exited = threading.Event()
+        return
+
+    @property
+    def pid(self) -> int:
+        """Process id of the command, waiting for the helper to report it if needed.
+
+        :return: process id, None if the command couldn't be started
+        :rtype: int
+        """
+        self.started.wait()
+        return self._pid
+
+    def poll(self) -> int:
+        """Check if the command exited.
+
+        :return: exit status, or None if still running
+        :rtype: int
+        """
+        return self.returncode
+
+    def wait(self) -> int:
+        """Block until the command exited.
+
+        :return: exit status
+        :rtype: int
+        """
+        self.exited.wait()
+        return self.returncode
+
+
+class Launcher(object):
+    """Small prespawned helper process launching commands for ShellTasks.
+
+    Forking a process with a large address space is slow, and subprocess\
+        can only avoid it with vfork on some platforms and Python versions,\
+        and when none of the options that need a fork are used. The\
+        helper is a fresh, small interpreter that receives commands over a\
+        Unix socket along with the pipes to use as their stdin, stdout and\
+        stderr, starts them with posix_spawn in their own session, and sends\
+        back their pid, exit status and resource usage. Commands get the\
+        environment and working directory the helper was started with.
+    """
+
+    def __init__(self):
+        """Class constructor, starts the helper process."""
+        self.sock, helper_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.helper = subprocess.Popen(
+            [sys.executable, '-m', 'psyched.launcher', str(helper_sock.fileno())],
+            pass_fds=[helper_sock.fileno()]
+            )
+        helper_sock.close()
+        self.lock = threading.Lock()
+        self.ids = itertools.count()
+        self.processes = {}
+        self.thread = threading.Thread(target=self._collect, daemon=True)
+        self.thread.start()
+        return
+
+    def _collect(self):
+        """Dispatch the messages of the helper to the processes they are about."""
+        while True:
+            try:
+                data = self.sock.recv(_max_message)
+            except OSError:
+                data = b''
+            if not data:
+                break
+            message = pickle.loads(data)
+            with self.lock:
+                process = self.processes[message['id']]
+                if 'exit' in message:
+                    del self.processes[message['id']]
+            if 'pid' in message:
+                process._pid = message['pid']
+                process.started.set()
+            if 'exit' in message:
+                process.resources = message['resources']
+                process.returncode = message['exit']
+                process.exited.set()
+        # The helper is gone, nobody will report on the commands left
+        with self.lock:
+            processes, self.processes = self.processes, {}
+        for process in processes.values():
+            process.returncode = -1
+            process.started.set()
+            process.exited.set()
+        return
+
+    def spawn(self, command: Union[str, List[str]], stdin: BinaryIO = None,
+              stderr_pipe: bool = False, cpus: List[int] = None) -> LaunchedProcess:
+        """Launch a command through the helper.
+
+        Doesn't wait for the command to be started, so many commands can be launched in a row.
+
+        :param command: command to run
+        :type command: Union[str, List[str]]
+        :param stdin: file to read stdin from, defaults to None (the helper stdin)
+        :type stdin: BinaryIO, optional
+        :param stderr_pipe: whether to pipe stderr separately instead of with stdout, defaults to False
+        :type stderr_pipe: bool, optional
+        :param cpus: CPUs to restrict the command to from its start, defaults to None (any)
+        :type cpus: List[int], optional
+        :return: handle to the command
+        :rtype: LaunchedProcess
+        """
+        if isinstance(command, str):
+            command = [command]
+        stdout_r, stdout_w = os.pipe()
+        fds = [stdout_w]
+        stderr = None
+        if stderr_pipe:
+            stderr_r, stderr_w = os.pipe()
+            fds.append(stderr_w)
+            stderr = os.fdopen(stderr_r, 'rb')
+        if stdin is not None:
+            fds.append(stdin.fileno())
+        process = LaunchedProcess(os.fdopen(stdout_r, 'rb'), stderr)
+        with self.lock:
+            request_id = next(self.ids)
+            self.processes[request_id] = process
+            _send(self.sock, {'id': request_id, 'command': list(command), 'stdin': stdin is not None,
+                              'stderr': stderr_pipe, 'cpus': cpus}, fds)
+        os.close(stdout_w)
+        if stderr_pipe:
+            os.close(stderr_w)
+        return process
+
+    def close(self):
+        """Stop the helper. Commands still running are left alone."""
+        self.sock.shutdown(socket.SHUT_RDWR)
+        self.helper.wait()
+        self.thread.join()
+        self.sock.close()
+        return
+
+    def __enter__(self) -> Launcher:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+if __name__ == '__main__':
+    _helper_main(int(sys.argv[1]))
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import http.server
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from .task import Task, _status_failed, _status_running, _status_scheduled, _status_succeeded, _status_waiting
+
+_default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+_statuses = [_status_waiting, _status_scheduled, _status_running, _status_succeeded, _status_failed]
+
+
+class _Histogram(object):
+    """Cumulative histogram with one series per label value."""
+
+    def __init__(self, buckets: Tuple[float, ...] = _default_buckets):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value: float, label: str = None):
+        counts, total, count = self.series.get(label, ([0] * len(self.buckets), 0.0, 0))
+        counts = [c + (value <= b) for c, b in zip(counts, self.buckets)]
+        self.series[label] = (counts, total + value, count + 1)
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            label: {'buckets': dict(zip(self.buckets, counts)), 'sum': total, 'count': count}
+            for label, (counts, total, count) in self.series.items()
+        }
+
+    def render(self, name: str, label_name: str = None) -> List[str]:
+        lines = [f'# TYPE {name} histogram']
+        for label, (counts, total, count) in sorted(self.series.items(), key=lambda item: str(item[0])):
+            prefix = '' if label is None else f'{label_name}="{label}",'
+            for b, c in zip(self.buckets, counts):
+                lines.append(f'{name}_bucket{{{prefix}le="{b}"}} {c}')
+            lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = '' if label is None else f'{{{prefix[:-1]}}}'
+            lines.append(f'{name}_sum{suffix} {total}')
+            lines.append(f'{name}_count{suffix} {count}')
+        return lines
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Serve the metrics of a MetricsRegistry in Prometheus text format."""
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsRegistry(object):
+    """Metrics about a running DAG.
+
+    Pass a registry to ``DAG.run`` and it is updated on every scheduler tick\
+        with the number of tasks by status, the scheduling latency (from\
+        scheduled to running) and duration of tasks by type, the number of\
+        finished tasks and retried attempts by type, and the time spent on\
+        each tick. Read them with snapshot, or in Prometheus text format with\
+        render or on the ``/metrics`` endpoint started by serve.
+    """
+
+    def __init__(self):
+        """Class constructor."""
+        self.lock = threading.Lock()
+        self.statuses = {status: 0 for status in _statuses}
+        self.running_slots = 0
+        self.finished = {}
+        self.retries = {}
+        self.latency = _Histogram()
+        self.duration = _Histogram()
+        self.tick = _Histogram()
+        self.seen_starts = {}
+        self.seen_attempts = {}
+        self.seen_finished = set()
+        self.server = None
+        return
+
+    def observe(self, tasks: Iterable[Task], running_slots: int = 0, tick: float = None):
+        """Update the metrics from the current state of the tasks.
+
+        Each start, retry and finish of a task is only counted once, however\
+            many times it is observed.
+
+        :param tasks: tasks in the DAG
+        :type tasks: Iterable[Task]
+        :param running_slots: local slots taken, defaults to 0
+        :type running_slots: int, optional
+        :param tick: seconds the scheduler tick took, defaults to None
+        :type tick: float, optional
+        """
+        with self.lock:
+            self.statuses = {status: 0 for status in _statuses}
+            self.running_slots = running_slots
+            if tick is not None:
+                self.tick.observe(tick)
+            for t in tasks:
+                kind = type(t).__name__
+                self.statuses[t.status] += 1
+                if len(t.attempts) > self.seen_attempts.get(t, 0):
+                    self.retries[kind] = self.retries.get(kind, 0) + len(t.attempts) - self.seen_attempts.get(t, 0)
+                    self.seen_attempts[t] = len(t.attempts)
+                if t.start_time is not None and t.scheduled_time is not None and \
+                        self.seen_starts.get(t) != t.start_time:
+                    self.seen_starts[t] = t.start_time
+                    self.latency.observe(max(0.0, t.start_time - t.scheduled_time), kind)
+                if not t.is_pending() and t not in self.seen_finished:
+                    self.seen_finished.add(t)
+                    self.finished[(kind, t.status)] = self.finished.get((kind, t.status), 0) + 1
+                    if t.get_duration() is not None:
+                        self.duration.observe(t.get_duration(), kind)
+        return
+
+    def snapshot(self) -> dict:
+        """Get the current value of every metric.
+
+        :return: dictionary with ``tasks`` (count by status), ``running_slots``,\
+            ``finished`` (count by task type and status), ``retries`` (count by\
+            task type), ``scheduling_latency`` and ``duration`` (histograms by\
+            task type) and ``tick`` (histogram) keys
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                'tasks': dict(self.statuses),
+                'running_slots': self.running_slots,
+                'finished': dict(self.finished),
+                'retries': dict(self.retries),
+                'scheduling_latency': self.latency.snapshot(),
+                'duration': self.duration.snapshot(),
+                'tick': self.tick.snapshot().get(None, {'buckets': {}, 'sum': 0.0, 'count': 0}),
+            }
+
+    def render(self) -> str:
+        """Get the metrics in Prometheus text format.
+
+        :return: exposition text
+        :rtype: str
+        """
+        with self.lock:
+            lines = ['# TYPE psyched_tasks gauge']
+            lines += [f'psyched_tasks{{status="{status}"}} {n}' for status, n in self.statuses.items()]
+            lines.append('# TYPE psyched_running_slots gauge')
+            lines.append(f'psyched_running_slots {self.running_slots}')
+            lines.append('# TYPE psyched_tasks_finished_total counter')
+            lines += [
+                f'psyched_tasks_finished_total{{type="{kind}",status="{status}"}} {n}'
+                for (kind, status), n in sorted(self.finished.items())
+            ]
+            lines.append('# TYPE psyched_task_retries_total counter')
+            lines += [f'psyched_task_retries_total{{type="{kind}"}} {n}' for kind, n in sorted(self.retries.items())]
+            lines += self.latency.render('psyched_scheduling_latency_seconds', 'type')
+            lines += self.duration.render('psyched_task_duration_seconds', 'type')
+            lines += self.tick.render('psyched_scheduler_tick_seconds')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, address: Tuple[str, int] = ('127.0.0.1', 0)) -> Tuple[str, int]:
+        """Serve the metrics on ``/metrics`` over HTTP, from a background thread.
+
+        :param address: host and port to listen on, defaults to a free port on localhost
+        :type address: Tuple[str, int], optional
+        :return: host and port listened on
+        :rtype: Tuple[str, int]
+        """
+        self.server = http.server.ThreadingHTTPServer(address, _MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.registry = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[:2]
+
+    def shutdown(self):
+        """Stop serving the metrics."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        return
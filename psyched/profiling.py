@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import cProfile
+import marshal
+import os
+import pstats
+import threading
+import tracemalloc
+from typing import Any, Callable
+
+from .utils import call_target
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_started = False
+
+
+def _start_tracemalloc():
+    """Start tracing allocations, unless a profiled call already did."""
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_started = True
+        _tracemalloc_users += 1
+    return
+
+
+def _stop_tracemalloc():
+    """Stop tracing allocations once no profiled call needs it anymore, unless someone else started it."""
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_started:
+            tracemalloc.stop()
+            _tracemalloc_started = False
+    return
+
+
+class Profiler(object):
+    """cProfile, and optionally tracemalloc, wrapped around a call.
+
+    cProfile only sees the thread making the call. tracemalloc traces the\
+        whole process, so with concurrent profiled threads the allocation\
+        report may include allocations from the other ones.
+    """
+
+    def __init__(self, memory: bool = True, top: int = 10):
+        """Class constructor.
+
+        :param memory: whether to trace allocations with tracemalloc, defaults to True
+        :type memory: bool, optional
+        :param top: number of source lines in the allocation report, defaults to 10
+        :type top: int, optional
+        """
+        self.memory = memory
+        self.top = top
+        self.stats = {}
+        self.allocations = ''
+        return
+
+    def call(self, target: Callable, kwargs: dict) -> Any:
+        """Call a target under the profilers.
+
+        Coroutine functions are run to completion in a new event loop.
+
+        :param target: callable to profile
+        :type target: Callable
+        :param kwargs: keyword arguments for the target
+        :type kwargs: dict
+        :return: target return value
+        :rtype: Any
+        """
+        profile = cProfile.Profile()
+        if self.memory:
+            _start_tracemalloc()
+            start = tracemalloc.take_snapshot()
+        profile.enable()
+        try:
+            return call_target(target, kwargs)
+        finally:
+            profile.disable()
+            profile.create_stats()
+            self.stats = profile.stats
+            if self.memory:
+                diff = tracemalloc.take_snapshot().compare_to(start, 'lineno')
+                _, peak = tracemalloc.get_traced_memory()
+                _stop_tracemalloc()
+                lines = [f'peak traced memory: {peak} bytes']
+                lines += [str(stat) for stat in diff[:self.top] if stat.size_diff > 0]
+                self.allocations = '\n'.join(lines) + '\n'
+
+    def create_stats(self):
+        """Nothing to do, stats are created by call. Lets pstats.Stats load a Profiler."""
+        return
+
+    def get_stats(self) -> pstats.Stats:
+        """Get the cProfile statistics of the call.
+
+        :return: statistics, ready to be sorted and printed
+        :rtype: pstats.Stats
+        """
+        return pstats.Stats(self)
+
+    def dump(self, prefix: str):
+        """Write the reports: ``prefix.pstats`` and, if tracing allocations, ``prefix.allocations.txt``.
+
+        :param prefix: path of the reports, without extension
+        :type prefix: str
+        """
+        os.makedirs(os.path.dirname(prefix) or '.', exist_ok=True)
+        with open(f'{prefix}.pstats', 'wb') as f:
+            marshal.dump(self.stats, f)
+        if self.memory:
+            with open(f'{prefix}.allocations.txt', 'w') as f:
+                f.write(self.allocations)
+        return
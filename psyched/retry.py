@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import random
+from typing import List
+
+
+class RetryPolicy(object):
+    """Policy deciding whether and when a failed task is run again.
+
+    The n-th retry waits ``delay * backoff ** (n - 1)`` seconds, capped at\
+        max_delay, plus a random jitter of up to jitter times that, so that\
+        tasks failing together don't retry together. A task waiting for its\
+        retry doesn't take a slot.
+    """
+
+    def __init__(self, max_attempts: int = 3, delay: float = 1.0, backoff: float = 2.0, max_delay: float = 60.0,
+                 jitter: float = 0.5, retry_on: List[int] = None):
+        """Class constructor.
+
+        :param max_attempts: maximum number of times the task is run, retries included, defaults to 3
+        :type max_attempts: int, optional
+        :param delay: seconds to wait before the first retry, defaults to 1.0
+        :type delay: float, optional
+        :param backoff: factor the delay is multiplied by after each retry, defaults to 2.0
+        :type backoff: float, optional
+        :param max_delay: maximum seconds to wait before a retry, jitter excluded, defaults to 60.0
+        :type max_delay: float, optional
+        :param jitter: maximum random extra delay, as a fraction of the delay, defaults to 0.5
+        :type jitter: float, optional
+        :param retry_on: exit codes worth a retry, defaults to None (any failure)
+        :type retry_on: List[int], optional
+        """
+        self.max_attempts = max_attempts
+        self.delay = delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_on = retry_on
+        return
+
+    def should_retry(self, attempt: int, exit_code: int) -> bool:
+        """Check if a failed attempt deserves a retry.
+
+        :param attempt: number of the failed attempt, starting at 1
+        :type attempt: int
+        :param exit_code: exit code of the failed attempt
+        :type exit_code: int
+        :return: whether to run the task again
+        :rtype: bool
+        """
+        if attempt >= self.max_attempts:
+            return False
+        return self.retry_on is None or exit_code in self.retry_on
+
+    def get_delay(self, attempt: int) -> float:
+        """Get how long to wait before retrying.
+
+        :param attempt: number of the failed attempt, starting at 1
+        :type attempt: int
+        :return: seconds to wait
+        :rtype: float
+        """
+        delay = min(self.max_delay, self.delay * self.backoff ** (attempt - 1))
+        return delay + random.uniform(0, self.jitter * delay)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import io
+import pickle
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, List, Tuple
+
+_default_threshold = 1 << 20
+
+
+class _SharedPickler(pickle.Pickler):
+    """Pickler moving large buffers out of the pickle stream.
+
+    Objects supporting pickle protocol 5 buffers (like NumPy arrays) go through\
+        buffer_callback. Large bytes and bytearrays, which don't, are replaced\
+        by persistent ids instead.
+    """
+
+    def __init__(self, file: io.BytesIO, threshold: int, **kwargs):
+        super(_SharedPickler, self).__init__(file, protocol=5, buffer_callback=self.buffer_callback, **kwargs)
+        self.threshold = threshold
+        self.buffers = []
+
+    def buffer_callback(self, buffer: pickle.PickleBuffer) -> bool:
+        raw = buffer.raw()
+        if raw.nbytes < self.threshold:
+            return True
+        self.buffers.append((raw, None))
+        return False
+
+    def persistent_id(self, obj: Any):
+        if type(obj) in (bytes, bytearray) and len(obj) >= self.threshold:
+            self.buffers.append((memoryview(obj), type(obj).__name__))
+            return len(self.buffers) - 1
+        return None
+
+
+class _SharedUnpickler(pickle.Unpickler):
+    """Unpickler for streams written by _SharedPickler."""
+
+    def __init__(self, file: io.BytesIO, views: List[memoryview], kinds: List[str]):
+        super(_SharedUnpickler, self).__init__(
+            file, buffers=[v for v, kind in zip(views, kinds) if kind is None])
+        self.views = views
+        self.kinds = kinds
+
+    def persistent_load(self, pid: int) -> Any:
+        if self.kinds[pid] == 'bytearray':
+            return bytearray(self.views[pid])
+        return bytes(self.views[pid])
+
+
+def dump_shared(obj: Any, threshold: int = _default_threshold) -> Tuple[bytes, List[Tuple[str, int, str]]]:
+    """Pickle an object moving its large buffers to shared memory.
+
+    Every buffer of at least threshold bytes (NumPy arrays, bytes,\
+        bytearrays...) is copied to its own shared memory segment instead of\
+        the pickle stream. The segments are left for the SharedResult loading\
+        them, or unlink_shared if they are never loaded, to unlink.
+
+    :param obj: object to pickle
+    :type obj: Any
+    :param threshold: minimum size in bytes of the buffers to move to shared memory, defaults to 1 MiB
+    :type threshold: int, optional
+    :return: pickle stream and list of (segment name, size, kind) for the out-of-band buffers
+    :rtype: Tuple[bytes, List[Tuple[str, int, str]]]
+    """
+    f = io.BytesIO()
+    pickler = _SharedPickler(f, threshold)
+    pickler.dump(obj)
+    segments = []
+    for raw, kind in pickler.buffers:
+        raw = raw.cast('B')
+        shm = shared_memory.SharedMemory(create=True, size=max(raw.nbytes, 1))
+        shm.buf[:raw.nbytes] = raw
+        # Ownership goes to whoever loads the result, don't let this process' tracker unlink it
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        segments.append((shm.name, raw.nbytes, kind))
+        shm.close()
+    return f.getvalue(), segments
+
+
+def unlink_shared(segments: List[Tuple[str, int, str]]):
+    """Free the shared memory segments written by dump_shared without loading them.
+
+    :param segments: list of (segment name, size, kind) returned by dump_shared
+    :type segments: List[Tuple[str, int, str]]
+    """
+    for name, _, _ in segments:
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            continue
+        shm.unlink()
+        shm.close()
+    return
+
+
+class SharedResult(object):
+    """Object unpickled from shared memory segments written by dump_shared."""
+
+    def __init__(self, data: bytes, segments: List[Tuple[str, int, str]]):
+        """Class constructor.
+
+        NumPy arrays (and any object supporting pickle protocol 5 buffers) in\
+            the result are views over the shared memory, not copies. Large bytes\
+            and bytearrays are copied out of it once.
+
+        :param data: pickle stream
+        :type data: bytes
+        :param segments: list of (segment name, size, kind) of the out-of-band buffers
+        :type segments: List[Tuple[str, int, str]]
+        """
+        self.segments = [shared_memory.SharedMemory(name=name) for name, _, _ in segments]
+        views = [shm.buf[:size] for shm, (_, size, _) in zip(self.segments, segments)]
+        kinds = [kind for _, _, kind in segments]
+        self.value = _SharedUnpickler(io.BytesIO(data), views, kinds).load()
+        return
+
+    def release(self):
+        """Drop the result and free its shared memory segments."""
+        self.value = None
+        for shm in self.segments:
+            shm.unlink()
+            try:
+                shm.close()
+            except BufferError:
+                # Still referenced somewhere, unmapped once the last view is collected
+                pass
+        self.segments = []
+        return
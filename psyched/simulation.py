@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+from typing import Any, Dict, List
+
+from .task import DockerTask, MappedTask, PythonTask, SensorTask, ShellTask, Task
+
+_local = 'local'
+
+
+class SimulationReport(object):
+    """Outcome of a simulated run, see simulate."""
+
+    def __init__(self, makespan: float, utilization: Dict[Any, float], start_times: Dict[str, float],
+                 end_times: Dict[str, float], critical_path: List[Task], critical_path_length: float):
+        """Class constructor.
+
+        :param makespan: simulated seconds from the start of the run to the end of its last task
+        :type makespan: float
+        :param utilization: busy fraction of the capacity of each pool of slots, the local\
+            slots being ``'local'`` and the other pools the registered hosts and workers
+        :type utilization: Dict[Any, float]
+        :param start_times: simulated start time of each task, by name
+        :type start_times: Dict[str, float]
+        :param end_times: simulated end time of each task, by name
+        :type end_times: Dict[str, float]
+        :param critical_path: longest chain of dependent tasks, which no capacity can shorten
+        :type critical_path: List[Task]
+        :param critical_path_length: seconds the critical path takes, a lower bound of the makespan
+        :type critical_path_length: float
+        """
+        self.makespan = makespan
+        self.utilization = utilization
+        self.start_times = start_times
+        self.end_times = end_times
+        self.critical_path = critical_path
+        self.critical_path_length = critical_path_length
+        return
+
+    def __str__(self) -> str:
+        utilization = ', '.join(f'{pool}: {u:.0%}' for pool, u in self.utilization.items())
+        path = ' >> '.join(t.get_name() for t in self.critical_path)
+        return (f'makespan {self.makespan:.1f}s, utilization {utilization}, '
+                f'critical path {path} ({self.critical_path_length:.1f}s)')
+
+
+def _get_group(t: Task) -> List[Task]:
+    """Get the tasks started together with t: its pipeline if it streams, or else t alone."""
+    if isinstance(t, ShellTask) and t.is_streaming():
+        return t.get_pipeline()
+    return [t]
+
+
+def _run(order: List[Task], durations: Dict[Task, float], capacity: Dict[Any, float], pools: Dict[Task, list]):
+    """Simulate a run as a sequence of events on a virtual clock.
+
+    Like DAG.run, scheduled units are started in DAG order whenever a slot is free.
+
+    :return: start and end time, busy slot-seconds by pool and the task that made each unit ready
+    """
+    index = {t: i for i, t in enumerate(order)}
+    owner = {}
+    missing = {}
+    for t in order:
+        if isinstance(t, ShellTask) and t.stream_upstream is not None:
+            continue
+        for m in _get_group(t):
+            owner[m] = t
+        missing[t] = sum(1 for m in _get_group(t) for d in m.upstream if d is not getattr(m, 'stream_upstream', None))
+    ready = [(index[t], t) for t in missing if missing[t] == 0]
+    heapq.heapify(ready)
+    free = dict(capacity)
+    busy = {pool: 0.0 for pool in capacity}
+    start, end, cause = {}, {}, {}
+    events = []
+    sequence = itertools.count()
+    now = 0.0
+    while True:
+        blocked = []
+        while ready:
+            i, head = heapq.heappop(ready)
+            group = _get_group(head)
+            if isinstance(head, (MappedTask, SensorTask)):
+                # Sensors wait without a slot, mapped tasks instances are only known at run time
+                pool = None
+            elif pools[head]:
+                pool = max(pools[head], key=lambda p: free[p])
+            else:
+                pool = _local
+            # Like DAG.run, a pipeline waits for a slot per member, or for every slot if it is longer
+            if pool is not None and free[pool] < max(min(len(group), capacity[pool]), 1):
+                blocked.append((i, head))
+                continue
+            for m in group:
+                start[m] = now
+                end[m] = now + (0.0 if isinstance(m, MappedTask) else durations[m])
+                upstream = getattr(m, 'stream_upstream', None)
+                if upstream is not None and end[upstream] > end[m]:
+                    # A consumer can't finish before its producer
+                    end[m] = end[upstream]
+                    cause[m] = upstream
+                if pool is not None:
+                    free[pool] -= 1
+                heapq.heappush(events, (end[m], next(sequence), m, pool))
+        for item in blocked:
+            heapq.heappush(ready, item)
+        if not events:
+            break
+        now = events[0][0]
+        while events and events[0][0] == now:
+            _, _, t, pool = heapq.heappop(events)
+            if pool is not None:
+                free[pool] += 1
+                busy[pool] += end[t] - start[t]
+            for d in t.downstream:
+                if d is getattr(t, 'stream_downstream', None):
+                    continue
+                head = owner[d]
+                missing[head] -= 1
+                if missing[head] == 0:
+                    for m in _get_group(head):
+                        cause.setdefault(m, t)
+                    heapq.heappush(ready, (index[head], head))
+    return start, end, busy, cause
+
+
+def simulate(dag, durations: Dict[str, float] = None, default_duration: float = 1.0,
+             max_parallel_workers: int = None, capacities: Dict[Any, int] = None) -> SimulationReport:
+    """Predict how a DAG would run, without running anything.
+
+    Tasks take their duration from durations, or else from their last run,\
+        or else default_duration. A virtual clock jumps from one task end to\
+        the next, so the simulation is instant. Tasks are placed like DAG.run\
+        does: DockerTasks on the registered Docker hosts, ShellTasks and\
+        PythonTasks on the registered workers, everything else on the local\
+        slots. SensorTasks take no slot, and MappedTasks take no time, as\
+        their instances are unknown until run time. The task statuses are left untouched.
+
+    :param dag: DAG to simulate
+    :type dag: DAG
+    :param durations: expected seconds each task takes, by name (the history of\
+        a SpeculationPolicy fits), defaults to None
+    :type durations: Dict[str, float], optional
+    :param default_duration: seconds taken by tasks with no known duration, defaults to 1.0
+    :type default_duration: float, optional
+    :param max_parallel_workers: local slots, defaults to the DAG ones
+    :type max_parallel_workers: int, optional
+    :param capacities: slots of some of the registered hosts and workers, defaults to their capacity
+    :type capacities: Dict[Any, int], optional
+    :return: makespan, utilization and critical path of the run
+    :rtype: SimulationReport
+    """
+    durations = durations or {}
+    capacities = capacities or {}
+    order = list(dag.tasks.values())
+    expected = {}
+    for t in order:
+        if t.get_name() in durations:
+            expected[t] = durations[t.get_name()]
+        elif t.get_duration() is not None:
+            expected[t] = t.get_duration()
+        else:
+            expected[t] = default_duration
+    capacity = {_local: max_parallel_workers or dag.max_parallel_tasks}
+    for host in dag.docker_hosts + dag.workers:
+        capacity[host] = capacities.get(host, host.capacity)
+    pools = {}
+    for t in order:
+        if isinstance(t, DockerTask):
+            pools[t] = dag.docker_hosts
+        elif isinstance(t, ShellTask) and t.is_streaming():
+            pools[t] = []
+        elif isinstance(t, (ShellTask, PythonTask)):
+            pools[t] = dag.workers
+        else:
+            pools[t] = []
+
+    start, end, busy, _ = _run(order, expected, capacity, pools)
+    makespan = max(end.values(), default=0.0)
+    utilization = {pool: busy[pool] / (capacity[pool] * makespan) if makespan else 0.0 for pool in capacity}
+
+    # With unlimited slots every unit starts as soon as it is ready: the last task to end closes the critical path
+    unlimited = {pool: float('inf') for pool in capacity}
+    _, free_end, _, cause = _run(order, expected, unlimited, pools)
+    path = []
+    if free_end:
+        t = max(free_end, key=lambda t: free_end[t])
+        path.append(t)
+        while t in cause:
+            t = cause[t]
+            path.append(t)
+        path.reverse()
+    return SimulationReport(
+        makespan,
+        utilization,
+        {t.get_name(): s for t, s in start.items()},
+        {t.get_name(): e for t, e in end.items()},
+        path,
+        max(free_end.values(), default=0.0)
+        )
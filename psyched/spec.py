@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import importlib
+import json
+import marshal
+import os
+from typing import Any, Callable, Dict
+
+from .dag import DAG
+from .image import Image
+from .retry import RetryPolicy
+from .task import DockerTask, PythonTask, SensorTask, ShellTask, Task
+
+_binary_extensions = ['.bin', '.marshal']
+_yaml_extensions = ['.yaml', '.yml']
+
+
+def load_spec(path: str) -> dict:
+    """Read a DAG spec file.
+
+    The format follows the extension: ``.json``, ``.yaml``/``.yml`` (requires\
+        PyYAML, ``pip install psyched[yaml]``) or ``.bin``/``.marshal`` for the compact binary format, which\
+        is the spec dictionary serialized with marshal. Binary specs load the\
+        fastest but, like pickles, must only be read from trusted sources.
+
+    :param path: path of the spec file
+    :type path: str
+    :raises ValueError: unknown extension
+    :return: spec dictionary
+    :rtype: dict
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in _binary_extensions:
+        with open(path, 'rb') as f:
+            return marshal.load(f)
+    if extension in _yaml_extensions:
+        import yaml
+        with open(path) as f:
+            return yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+    if extension == '.json':
+        with open(path) as f:
+            return json.load(f)
+    raise ValueError(f"Unknown spec format '{extension}'")
+
+
+def dump_spec(spec: dict, path: str):
+    """Write a DAG spec file, in the format given by the extension (see load_spec).
+
+    :param spec: spec dictionary
+    :type spec: dict
+    :param path: path of the spec file
+    :type path: str
+    :raises ValueError: unknown extension
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in _binary_extensions:
+        with open(path, 'wb') as f:
+            marshal.dump(spec, f)
+    elif extension in _yaml_extensions:
+        import yaml
+        with open(path, 'w') as f:
+            yaml.dump(spec, f, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper))
+    elif extension == '.json':
+        with open(path, 'w') as f:
+            json.dump(spec, f)
+    else:
+        raise ValueError(f"Unknown spec format '{extension}'")
+    return
+
+
+def _resolve(reference: str) -> Callable:
+    """Import the object referenced by a ``package.module:attribute`` string."""
+    module, _, attribute = reference.partition(':')
+    if not attribute:
+        raise ValueError(f"Python target '{reference}' is not of the form 'module:attribute'")
+    target = importlib.import_module(module)
+    for name in attribute.split('.'):
+        target = getattr(target, name)
+    return target
+
+
+def _new_task(entry: Dict[str, Any], images: Dict[str, Image]) -> Task:
+    """Create the task described by a spec entry, without its dependencies."""
+    name = entry['name']
+    task_type = entry['type']
+    if task_type == 'shell':
+        t = ShellTask(name, entry['command'])
+    elif task_type == 'docker':
+        reference = entry['image']
+        if reference not in images:
+            image_name, _, tag = reference.partition(':')
+            images[reference] = Image(image_name, tag or 'latest')
+        t = DockerTask(name, images[reference], entry['command'])
+    elif task_type == 'python':
+        t = PythonTask(name, _resolve(entry['target']), **entry.get('kwargs', {}))
+        if 'executor' in entry:
+            t.set_executor(entry['executor'])
+    elif task_type == 'sensor':
+        t = SensorTask(name, entry['paths'], entry.get('poll_interval', 5.0))
+    else:
+        raise ValueError(f"Unknown task type '{task_type}'")
+    if 'timeout' in entry:
+        t.set_timeout(entry['timeout'])
+    if 'retry' in entry:
+        t.set_retry(RetryPolicy(**entry['retry']))
+    if entry.get('idempotent'):
+        t.set_idempotent()
+    t.set_inputs(entry.get('inputs', []))
+    t.set_outputs(entry.get('outputs', []))
+    return t
+
+
+def build_dag(spec: dict, max_parallel_workers: int = None) -> DAG:
+    """Create a DAG from a spec dictionary in a single pass.
+
+    A spec holds a ``tasks`` list and optionally ``max_parallel_workers``\
+        and an ``edges`` list of ``[upstream, downstream]`` task name pairs.\
+        Each task is a dictionary with ``name`` and ``type`` (``shell``,\
+        ``docker``, ``python`` or ``sensor``) keys, the constructor arguments of\
+        its type (``command``; ``image`` as ``name:tag``; ``target`` as\
+        ``module:function`` and ``kwargs``; ``paths`` and\
+        ``poll_interval``), and optionally ``upstream`` (list\
+        of task names), ``stream_to`` (task name), ``executor``, ``timeout``,\
+        ``retry`` (RetryPolicy arguments), ``idempotent``, ``inputs`` and\
+        ``outputs``. DockerTasks with the same image share an Image.
+
+    Edges are deduplicated once and linked directly instead of going\
+        through ``>>`` one at a time, which matters for DAGs with hundreds of\
+        thousands of tasks.
+
+    :param spec: spec dictionary
+    :type spec: dict
+    :param max_parallel_workers: maximum number of tasks to run in parallel,\
+        defaults to the spec one, or 1
+    :type max_parallel_workers: int, optional
+    :raises ValueError: duplicate task names, or edges referencing unknown tasks
+    :return: the new DAG
+    :rtype: DAG
+    """
+    if max_parallel_workers is None:
+        max_parallel_workers = spec.get('max_parallel_workers', 1)
+    dag = DAG(max_parallel_workers=max_parallel_workers)
+    images = {}
+    edges = []
+    streams = []
+    for entry in spec['tasks']:
+        t = _new_task(entry, images)
+        if t.name in dag.tasks:
+            raise ValueError(f"Duplicate task name '{t.name}'")
+        dag.tasks[t.name] = t
+        edges += [(u, t.name) for u in entry.get('upstream', [])]
+        if 'stream_to' in entry:
+            streams.append((t.name, entry['stream_to']))
+    edges += [tuple(e) for e in spec.get('edges', [])]
+    try:
+        for up, down in dict.fromkeys(edges):
+            u, d = dag.tasks[up], dag.tasks[down]
+            u.downstream.append(d)
+            d.upstream.append(u)
+        for up, down in streams:
+            dag.tasks[up].stream_to(dag.tasks[down])
+    except KeyError as e:
+        raise ValueError(f"Unknown task {e} in dependencies") from None
+    return dag
+
+
+def load_dag(path: str, max_parallel_workers: int = None) -> DAG:
+    """Create a DAG from a spec file, see load_spec and build_dag.
+
+    :param path: path of the spec file
+    :type path: str
+    :param max_parallel_workers: maximum number of tasks to run in parallel,\
+        defaults to the spec one, or 1
+    :type max_parallel_workers: int, optional
+    :return: the new DAG
+    :rtype: DAG
+    """
+    return build_dag(load_spec(path), max_parallel_workers)
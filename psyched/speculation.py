@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import statistics
+from typing import Dict, List
+
+from .task import Task, _status_succeeded
+
+
+class SpeculationPolicy(object):
+    """Policy deciding when to launch a duplicate of a straggling task.
+
+    Only idempotent tasks (see ``Task.set_idempotent``) are speculated on.\
+        The expected duration of a task is its duration in previous runs if\
+        known, or else the median duration of its finished siblings (tasks of\
+        the same type with the same upstream tasks, or instances of the same\
+        MappedTask). A task running for longer than multiplier times its\
+        expected duration gets a duplicate; whichever finishes first wins and\
+        the other one is killed.
+    """
+
+    def __init__(self, multiplier: float = 2.0, min_runtime: float = 10.0, history: Dict[str, float] = None):
+        """Class constructor.
+
+        :param multiplier: how many times longer than expected a task must run to be speculated on, defaults to 2.0
+        :type multiplier: float, optional
+        :param min_runtime: minimum seconds a task must run to be speculated on, defaults to 10.0
+        :type min_runtime: float, optional
+        :param history: duration in seconds of each task name in previous runs.\
+            Updated with every successful task, defaults to None
+        :type history: Dict[str, float], optional
+        """
+        self.multiplier = multiplier
+        self.min_runtime = min_runtime
+        self.history = history if history is not None else {}
+        return
+
+    def get_expected_duration(self, task: Task, siblings: List[Task]) -> float:
+        """Get how long a task is expected to run.
+
+        :param task: running task
+        :type task: Task
+        :param siblings: tasks comparable to task
+        :type siblings: List[Task]
+        :return: expected duration in seconds, None if unknown
+        :rtype: float
+        """
+        if task.get_name() in self.history:
+            return self.history[task.get_name()]
+        durations = [
+            t.get_duration() for t in siblings
+            if t is not task and t.status == _status_succeeded and t.get_duration() is not None
+        ]
+        if not durations:
+            return None
+        return statistics.median(durations)
+
+    def should_speculate(self, task: Task, siblings: List[Task], now: float) -> bool:
+        """Check if a running task is a straggler deserving a duplicate.
+
+        :param task: running task
+        :type task: Task
+        :param siblings: tasks comparable to task
+        :type siblings: List[Task]
+        :param now: current time
+        :type now: float
+        :return: whether to launch a duplicate of task
+        :rtype: bool
+        """
+        if not task.idempotent:
+            return False
+        expected = self.get_expected_duration(task, siblings)
+        if expected is None:
+            return False
+        return now - task.start_time > max(self.min_runtime, self.multiplier * expected)
+
+    def record(self, task: Task):
+        """Remember the duration of a successful task for future runs.
+
+        :param task: finished task
+        :type task: Task
+        """
+        if task.status == _status_succeeded and task.get_duration() is not None:
+            self.history[task.get_name()] = task.get_duration()
+        return
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import json
+import marshal
+import sqlite3
+import time
+from typing import Dict, List, Tuple
+
+from .admission import AdmissionController
+from .launcher import Launcher
+from .spec import _new_task
+from .task import (SensorTask, ShellTask, Task, _status_failed, _status_running, _status_scheduled, _status_succeeded,
+                   _status_waiting)
+
+_schema = [
+    '''CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        entry BLOB NOT NULL,
+        status TEXT NOT NULL,
+        missing INTEGER NOT NULL DEFAULT 0,
+        start_time REAL,
+        end_time REAL,
+        logs TEXT,
+        resources TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS edges (
+        up INTEGER NOT NULL,
+        down INTEGER NOT NULL,
+        PRIMARY KEY (up, down)
+    ) WITHOUT ROWID''',
+    'CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status)',
+    'CREATE INDEX IF NOT EXISTS edges_down ON edges (down)',
+]
+
+# Every task downstream from a failed one, which fails too
+_fail_downstream = f'''
+    WITH RECURSIVE downstream(id) AS (
+        SELECT down FROM edges WHERE up = ?
+        UNION SELECT edges.down FROM edges JOIN downstream ON edges.up = downstream.id
+    )
+    UPDATE tasks SET status = '{_status_failed}'
+    WHERE id IN downstream AND status IN ('{_status_waiting}', '{_status_scheduled}')
+'''
+
+
+class TaskStore(object):
+    """Out-of-core task state, for DAGs too large to hold in memory.
+
+    Tasks are described by DAG spec entries (see ``psyched.spec.build_dag``)\
+        and kept in an SQLite database along with their dependencies, status,\
+        logs and resource usage. run only creates Task objects for the tasks\
+        it is about to start, and drops them once they finished and their\
+        outcome is saved, so memory use depends on max_parallel_workers\
+        rather than on the size of the DAG.
+
+    The database survives the process: running an interrupted store again\
+        starts over the tasks that were running and carries on from there.\
+        ``stream_to`` isn't supported, as pipelines need every member in memory.
+    """
+
+    def __init__(self, path: str):
+        """Class constructor, opens (or creates) the database.
+
+        :param path: path of the SQLite database, ``:memory:`` for a temporary one
+        :type path: str
+        """
+        self.db = sqlite3.connect(path)
+        # The store is only written by the process running it: durability is traded for insert speed
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        with self.db:
+            for statement in _schema:
+                self.db.execute(statement)
+        return
+
+    def add_spec(self, spec: dict):
+        """Add the tasks and dependencies of a DAG spec.
+
+        Dependencies may reference tasks added earlier. Every entry is turned\
+            into a task once and dropped, so that a bad entry is reported here\
+            like ``build_dag`` does, not when run reaches it.
+
+        :param spec: spec dictionary (see ``psyched.spec.build_dag``)
+        :type spec: dict
+        :raises ValueError: duplicate task names, edges referencing unknown tasks, streaming tasks\
+            or unknown task types
+        :raises KeyError: entries missing a required key
+        :raises ImportError: python targets that can't be imported
+        """
+        edges = []
+        images = {}
+
+        def rows():
+            for entry in spec['tasks']:
+                if 'stream_to' in entry:
+                    raise ValueError(f"Task '{entry['name']}' streams, which a TaskStore can't run")
+                _new_task(entry, images)
+                edges.extend((u, entry['name']) for u in entry.get('upstream', []))
+                yield entry['name'], marshal.dumps(entry), _status_waiting
+
+        try:
+            with self.db:
+                self.db.executemany('INSERT INTO tasks (name, entry, status) VALUES (?, ?, ?)', rows())
+                edges += [tuple(e) for e in spec.get('edges', [])]
+                self._add_edges(edges)
+                self.db.execute(
+                    f'''UPDATE tasks SET missing = (
+                        SELECT count(*) FROM edges JOIN tasks u ON u.id = edges.up
+                        WHERE edges.down = tasks.id AND u.status != '{_status_succeeded}'
+                    ) WHERE status IN ('{_status_waiting}', '{_status_scheduled}')''')
+                self.db.execute(
+                    f'''UPDATE tasks SET status = CASE WHEN missing = 0 THEN '{_status_scheduled}'
+                        ELSE '{_status_waiting}' END
+                    WHERE status IN ('{_status_waiting}', '{_status_scheduled}')''')
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Duplicate task name ({e})") from None
+        return
+
+    def _add_edges(self, edges: List[Tuple[str, str]]):
+        """Link tasks by name, in bulk.
+
+        :raises ValueError: edges referencing unknown tasks
+        """
+        self.db.execute('CREATE TEMP TABLE new_edges (up TEXT, down TEXT)')
+        try:
+            self.db.executemany('INSERT INTO new_edges VALUES (?, ?)', edges)
+            unknown = self.db.execute(
+                'SELECT name FROM (SELECT up AS name FROM new_edges UNION SELECT down FROM new_edges) '
+                'WHERE name NOT IN (SELECT name FROM tasks) LIMIT 1').fetchone()
+            if unknown is not None:
+                raise ValueError(f"Unknown task '{unknown[0]}' in dependencies")
+            self.db.execute(
+                'INSERT OR IGNORE INTO edges SELECT u.id, d.id FROM new_edges '
+                'JOIN tasks u ON u.name = new_edges.up JOIN tasks d ON d.name = new_edges.down')
+        finally:
+            self.db.execute('DROP TABLE new_edges')
+        return
+
+    def get_counts(self) -> Dict[str, int]:
+        """Get the number of tasks by status.
+
+        :return: count of each status with at least one task
+        :rtype: Dict[str, int]
+        """
+        return dict(self.db.execute('SELECT status, count(*) FROM tasks GROUP BY status'))
+
+    def _get_field(self, name: str, field: str):
+        row = self.db.execute(f'SELECT {field} FROM tasks WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return row[0]
+
+    def get_status(self, name: str) -> str:
+        """Get the status of a task.
+
+        :param name: task name
+        :type name: str
+        :raises KeyError: unknown task
+        :return: task status
+        :rtype: str
+        """
+        return self._get_field(name, 'status')
+
+    def get_logs(self, name: str) -> str:
+        """Get the logs of a finished task.
+
+        :param name: task name
+        :type name: str
+        :raises KeyError: unknown task
+        :return: task logs, None if it didn't finish
+        :rtype: str
+        """
+        return self._get_field(name, 'logs')
+
+    def get_duration(self, name: str) -> float:
+        """Get how long a finished task ran.
+
+        :param name: task name
+        :type name: str
+        :raises KeyError: unknown task
+        :return: seconds, None if it didn't run
+        :rtype: float
+        """
+        row = self.db.execute('SELECT start_time, end_time FROM tasks WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        start_time, end_time = row
+        return None if start_time is None or end_time is None else end_time - start_time
+
+    def get_resources(self, name: str) -> dict:
+        """Get the resources used by a finished task (see ``Task.get_resources``).
+
+        :param name: task name
+        :type name: str
+        :raises KeyError: unknown task
+        :return: resource usage, empty if not recorded
+        :rtype: dict
+        """
+        resources = self._get_field(name, 'resources')
+        return {} if resources is None else json.loads(resources)
+
+    def get_failed(self) -> List[str]:
+        """Get the names of the failed tasks.
+
+        :return: task names
+        :rtype: List[str]
+        """
+        return [name for name, in self.db.execute(
+            'SELECT name FROM tasks WHERE status = ? ORDER BY id', (_status_failed,))]
+
+    def _materialize(self, limit: int, images: dict, launcher: Launcher) -> Dict[int, Task]:
+        """Create the Task objects of up to limit scheduled tasks, marking them running in the store."""
+        tasks = {}
+        for task_id, entry in self.db.execute(
+                'SELECT id, entry FROM tasks WHERE status = ? ORDER BY id LIMIT ?', (_status_scheduled, limit)):
+            t = _new_task(marshal.loads(entry), images)
+            if launcher is not None and isinstance(t, ShellTask):
+                t.set_launcher(launcher)
+            t.try_to_schedule()
+            tasks[task_id] = t
+        self.db.executemany(
+            'UPDATE tasks SET status = ? WHERE id = ?', [(_status_running, task_id) for task_id in tasks])
+        return tasks
+
+    def _save(self, task_id: int, t: Task):
+        """Save the outcome of a finished task and update the tasks depending on it."""
+        self.db.execute(
+            'UPDATE tasks SET status = ?, start_time = ?, end_time = ?, logs = ?, resources = ? WHERE id = ?',
+            (t.status, t.start_time, t.end_time, t.get_logs(), json.dumps(t.get_resources()), task_id))
+        if t.status == _status_succeeded:
+            self.db.execute('UPDATE tasks SET missing = missing - 1 WHERE id IN (SELECT down FROM edges WHERE up = ?)',
+                            (task_id,))
+            self.db.execute(
+                'UPDATE tasks SET status = ? WHERE status = ? AND missing = 0 AND id IN '
+                '(SELECT down FROM edges WHERE up = ?)',
+                (_status_scheduled, _status_waiting, task_id))
+        else:
+            self.db.execute(_fail_downstream, (task_id,))
+        return
+
+    def run(self, max_parallel_workers: int = 1, poll_interval: float = 1.0, launcher: Launcher = None,
+            admission: AdmissionController = None):
+        """Run the tasks in the store following dependencies, like ``DAG.run``.
+
+        Blocks until every task has either succeeded or failed. Task\
+            timeouts and retry policies are honoured. Tasks are started in the\
+            order they were added.
+
+        :param max_parallel_workers: maximum number of tasks to run in parallel, defaults to 1
+        :type max_parallel_workers: int, optional
+        :param poll_interval: seconds between two scheduler ticks, defaults to 1.0
+        :type poll_interval: float, optional
+        :param launcher: helper process to start the ShellTasks commands through, defaults to None
+        :type launcher: Launcher, optional
+        :param admission: controller lowering the number of tasks run in parallel while\
+            the host is loaded, defaults to None
+        :type admission: AdmissionController, optional
+        """
+        with self.db:
+            # Left running by an interrupted run
+            self.db.execute('UPDATE tasks SET status = ? WHERE status = ?', (_status_scheduled, _status_running))
+        images = {}
+        frontier = {}
+        running = 0
+        while True:
+            now = time.time()
+            limit = max_parallel_workers
+            if admission is not None:
+                limit = admission.get_limit(running, max_parallel_workers, now)
+            idle = sum(1 for t in frontier.values() if t.status == _status_scheduled and not t.is_backing_off(now))
+            with self.db:
+                if running + idle < limit:
+                    frontier.update(self._materialize(limit - running - idle, images, launcher))
+                if not frontier:
+                    break
+                for task_id, t in list(frontier.items()):
+                    if t.has_timed_out(now):
+                        t.timed_out = True
+                        t.kill()
+                        running -= not isinstance(t, SensorTask)
+                        t.fail()
+                    elif isinstance(t, SensorTask):
+                        t.update_status(runnable=True)
+                    else:
+                        running += t.update_status(runnable=running < limit)
+                    if not t.is_pending():
+                        self._save(task_id, t)
+                        del frontier[task_id]
+            time.sleep(poll_interval)
+        return
+
+    def close(self):
+        """Close the database."""
+        self.db.close()
+        return
+
+    def __enter__(self) -> TaskStore:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
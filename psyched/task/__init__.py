@@ -1,5 +1,8 @@
 from .docker_task import DockerTask  # noqa
-from .python_task import PythonTask  # noqa
+from .fused_task import FusedTask  # noqa
+from .mapped_task import MappedTask  # noqa
+from .python_task import PythonTask, set_thread_pool_size  # noqa
+from .sensor_task import SensorTask  # noqa
 from .shell_task import ShellTask  # noqa
 from .task import (Task, _status_failed, _status_running, _status_scheduled,  # noqa
                    _status_succeeded, _status_waiting)  # noqa
@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+import threading
+from io import StringIO
+
+import docker
+
 from ..image import Image
 from .task import Task, _status_running, _status_scheduled, _status_waiting
 
@@ -19,15 +24,49 @@ class DockerTask(Task):
         self.image = image
         self.container = None
         self.command = command
+        self.outfile = StringIO("")
         super(DockerTask, self).__init__(name)
 
+    def reset(self):
+        """Forget the outcome of the last run, see ``Task.reset``."""
+        self.container = None
+        self.outfile = StringIO("")
+        super(DockerTask, self).reset()
+        return
+
     def run(self):
-        """Run the command in a new docker container from the given image."""
+        """Run the command in a new docker container from the given image.
+
+        The container is created on ``self.host`` if the DAG placed the task on\
+            one, and restricted to ``self.cpuset`` if the DAG pinned the task.
+        """
         assert self.status == _status_scheduled
-        self.container = self.image.run_command(self.command)
+        cpuset_cpus = None if self.cpuset is None else ','.join(str(c) for c in self.cpuset)
+        self.container = self.image.run_command(self.command, host=self.host, cpuset_cpus=cpuset_cpus)
+        self.resources = {}
+        threading.Thread(target=self._sample_stats, args=(self.container,), daemon=True).start()
         self.status = _status_running
         return
 
+    def _sample_stats(self, container):
+        """Keep the peak memory and the CPU time of a container up to date until it exits."""
+        try:
+            for stats in container.stats(decode=True):
+                if container is not self.container:
+                    # A retry started a new container
+                    break
+                memory = stats.get('memory_stats', {})
+                usage = max(memory.get('usage', 0), memory.get('max_usage', 0))
+                cpu = stats.get('cpu_stats', {}).get('cpu_usage', {}).get('total_usage', 0)
+                resources = dict(self.resources)
+                resources['max_memory'] = max(usage, resources.get('max_memory', 0))
+                resources['cpu_time'] = max(cpu / 1e9, resources.get('cpu_time', 0))
+                self.resources = resources
+        except (docker.errors.APIError, OSError):
+            # The container is gone, keep the last samples
+            pass
+        return
+
     def try_to_finish(self) -> bool:
         """Check if the container exited and update the status accordingly.
 
@@ -41,11 +80,34 @@ class DockerTask(Task):
             if result['StatusCode'] == 0:
                 self.succeed()
             else:
-                self.fail()
+                self.fail_attempt(result['StatusCode'])
             return True
         else:
             return False
 
+    def kill(self):
+        """Kill the container without updating the task status."""
+        self.container.kill()
+        return
+
+    def duplicate(self, name: str) -> DockerTask:
+        """Create a new task running the same command on the same image.
+
+        :param name: name of the new task
+        :type name: str
+        :return: new task, without dependencies
+        :rtype: DockerTask
+        """
+        return DockerTask(name, self.image, self.command)
+
+    def get_fingerprint(self) -> tuple:
+        """Get a key shared by the tasks running the same command on the same image, see ``Task.get_fingerprint``.
+
+        :return: task type, image and command
+        :rtype: tuple
+        """
+        return (DockerTask, self.image, self.command if isinstance(self.command, str) else tuple(self.command))
+
     def wait(self):
         """Block until the task is finished."""
         self.container.wait()
@@ -54,9 +116,15 @@ class DockerTask(Task):
     def get_logs(self) -> str:
         """Get task logs.
 
-        :return: contents of the container logs
+        :return: contents of the container logs, preceded by the logs of the retried attempts,\
+            those of the task run in its place if merged
         :rtype: str
         """
+        if self.merged_into is not None:
+            return self.merged_into.get_logs()
+        logs = self.get_attempts_logs()
         if self.status in [_status_scheduled, _status_waiting]:
-            return ""
-        return self.container.logs().decode("utf-8")
+            return logs
+        if self.container is None:
+            return logs + self.outfile.getvalue()
+        return logs + self.container.logs().decode("utf-8")
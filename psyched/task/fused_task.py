@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import codecs
+import concurrent.futures
+import contextvars
+import ctypes
+import os
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from io import StringIO
+from typing import List
+
+from ..utils import SysRedirect, call_target
+from .docker_task import DockerTask
+from .python_task import PythonTask, _executor_thread, _get_thread_pool, _kill_grace_period, _kill_lock
+from .shell_task import ShellTask
+from .task import Task, _status_failed, _status_running, _status_scheduled, _status_succeeded
+
+_marker = '\x1epsyched-fused:'
+
+
+class _MemberOutput(object):
+    """Stdout redirection writing to the logs of the member being run."""
+
+    def __init__(self):
+        self.outfile = StringIO("")
+
+    def write(self, message: str):
+        self.outfile.write(message)
+
+    def close(self):
+        pass
+
+
+class FusedTask(Task):
+    """Task running a linear chain of tasks as a single unit.
+
+    Created by ``DAG.run(fuse=True)``. PythonTask chains run in one call on\
+        the thread pool shared by PythonTasks, ShellTask chains in one shell\
+        and DockerTask chains in one container, without going back to the\
+        scheduler between members. Members still get their own status, logs\
+        and timing, and a failing member stops the chain and fails the rest of\
+        it like a regular failure would. Tasks with a timeout or a retry\
+        policy, and profiled tasks, are never fused.
+
+    A DockerTask chain runs as a single ``sh -c`` script, which the image\
+        ENTRYPOINT receives as arguments like any command. Only fuse DockerTasks\
+        (see ``DAG.run``) on images that have ``/bin/sh`` and either no\
+        entrypoint or one that runs its arguments as a command.
+    """
+
+    def __init__(self, members: List[Task]):
+        """Class constructor.
+
+        :param members: tasks to run, each one the only downstream of the previous one
+        :type members: List[Task]
+        """
+        self.members = members
+        self.thread = None
+        self.future = None
+        self.thread_ident = None
+        self.killed = False
+        self.kill_pending = False
+        self.process = None
+        self.container = None
+        self.events = []
+        self.applied = 0
+        self.current = 0
+        self.buffer = ""
+        super(FusedTask, self).__init__('+'.join(t.get_name() for t in members))
+
+    @staticmethod
+    def can_fuse(a: Task, b: Task) -> bool:
+        """Check if b can run right after a in the same unit.
+
+        :param a: upstream task
+        :type a: Task
+        :param b: downstream task
+        :type b: Task
+        :return: whether a and b are linearly chained tasks of the same kind,\
+            DockerTasks on the same image (see the restrictions on images above)
+        :rtype: bool
+        """
+        if a.get_downstream() != [b] or b.get_upstream() != [a] or type(a) is not type(b):
+            return False
+        if a.timeout is not None or b.timeout is not None or a.retry is not None or b.retry is not None:
+            return False
+        if isinstance(a, PythonTask):
+            return a.executor == _executor_thread and b.executor == _executor_thread and \
+                a.profiler is None and b.profiler is None
+        if isinstance(a, ShellTask):
+            return not a.is_streaming() and not b.is_streaming()
+        if isinstance(a, DockerTask):
+            return a.image is b.image
+        return False
+
+    def update_status(self, runnable: bool = False) -> int:
+        """Update query status.
+
+        Follows the first member: the unit is scheduled when it is, and is\
+            done if it failed before running.
+
+        :param runnable: indicates whether the unit should be run if possible, defaults to False
+        :type runnable: bool, optional
+        :return: 1 if started running unit, -1 if finished running unit, 0 if no changes made
+        :rtype: int
+        """
+        head = self.members[0]
+        if self.status not in [_status_running, _status_succeeded, _status_failed]:
+            if head.status == _status_scheduled:
+                self.status = _status_scheduled
+            elif head.status == _status_failed:
+                self.status = _status_failed
+        return super(FusedTask, self).update_status(runnable=runnable)
+
+    def try_to_schedule(self) -> bool:
+        """Units are scheduled through their first member, see update_status.
+
+        :return: False
+        :rtype: bool
+        """
+        return False
+
+    def _script(self, commands: List[List[str]]) -> str:
+        """Build a shell script running the commands in order, delimiting each one with markers."""
+        lines = []
+        for i, command in enumerate(commands):
+            lines.append(
+                f"printf '\\036psyched-fused:start:{i}\\n'; {shlex.join(command)}; rc=$?; "
+                f"printf '\\036psyched-fused:end:{i}:%d\\n' \"$rc\"; [ \"$rc\" -eq 0 ] || exit \"$rc\""
+            )
+        return 'exec 2>&1\n' + '\n'.join(lines) + '\n'
+
+    def run(self):
+        """Start running the members."""
+        assert self.status == _status_scheduled
+        head = self.members[0]
+        if isinstance(head, PythonTask):
+            SysRedirect.install()
+            # In a context of its own, so that the redirection doesn't outlive the call
+            self.future = _get_thread_pool().submit(contextvars.copy_context().run, self._run_python)
+            self.status = _status_running
+            return
+        if isinstance(head, ShellTask):
+            commands = [[t.command] if isinstance(t.command, str) else t.command for t in self.members]
+            self.process = subprocess.Popen(
+                ['sh', '-c', self._script(commands)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                start_new_session=True
+                )
+            self.thread = threading.Thread(target=self._read_process)
+        else:
+            commands = [shlex.split(t.command) for t in self.members]
+            self.container = head.image.run_command(['sh', '-c', self._script(commands)], host=self.host)
+            self.thread = threading.Thread(target=self._read_container)
+        self.thread.start()
+        self.status = _status_running
+        return
+
+    def _run_python(self):
+        """Call every member target in order from a thread of the pool, stopping at the first error."""
+        with _kill_lock:
+            if self.killed:
+                return
+            self.thread_ident = threading.get_ident()
+        output = _MemberOutput()
+        SysRedirect.register_context(output)
+        try:
+            try:
+                for i, t in enumerate(self.members):
+                    output.outfile = t.outfile
+                    self.events.append(('start', i, None, time.time()))
+                    error = None
+                    try:
+                        t.result = call_target(t.target, t._get_call_kwargs())
+                    except Exception as e:
+                        error = e
+                    self.events.append(('end', i, error, time.time()))
+                    if error is not None:
+                        break
+            finally:
+                with _kill_lock:
+                    self.thread_ident = None
+            # The thread runs other tasks next: let a SystemExit sent by kill be raised here first
+            deadline = time.time() + _kill_grace_period
+            while self.kill_pending and time.time() < deadline:
+                time.sleep(0.001)
+        except SystemExit:
+            self.kill_pending = False
+        return
+
+    def _is_alive(self) -> bool:
+        if self.future is not None:
+            return not self.future.done()
+        return self.thread.is_alive()
+
+    def _read_process(self):
+        """Parse the shell output until it exits."""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        fd = self.process.stdout.fileno()
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            self._feed(decoder.decode(chunk))
+        self._feed(decoder.decode(b'', final=True))
+        self._write(self.buffer)
+        self.process.stdout.close()
+        self.process.wait()
+        return
+
+    def _read_container(self):
+        """Parse the container output until it exits."""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for chunk in self.container.logs(stream=True, follow=True):
+            self._feed(decoder.decode(chunk))
+        self._feed(decoder.decode(b'', final=True))
+        self._write(self.buffer)
+        self.container.wait()
+        return
+
+    def _feed(self, text: str):
+        """Split output into member logs and start/end events."""
+        self.buffer += text
+        while True:
+            pos = self.buffer.find(_marker)
+            if pos < 0:
+                # Keep a possibly incomplete marker for the next chunk
+                cut = self.buffer.rfind(_marker[0])
+                if cut < 0:
+                    cut = len(self.buffer)
+                self._write(self.buffer[:cut])
+                self.buffer = self.buffer[cut:]
+                return
+            end = self.buffer.find('\n', pos)
+            if end < 0:
+                self._write(self.buffer[:pos])
+                self.buffer = self.buffer[pos:]
+                return
+            self._write(self.buffer[:pos])
+            fields = self.buffer[pos + len(_marker):end].split(':')
+            self.buffer = self.buffer[end + 1:]
+            self.current = int(fields[1])
+            if fields[0] == 'start':
+                self.events.append(('start', self.current, None, time.time()))
+            else:
+                self.events.append(('end', self.current, int(fields[2]), time.time()))
+
+    def _write(self, text: str):
+        if text:
+            self.members[self.current].outfile.write(text)
+
+    def try_to_finish(self) -> bool:
+        """Apply the progress of the members and check if the unit is done.
+
+        :return: whether the unit finished
+        :rtype: bool
+        """
+        assert self.status == _status_running
+        while self.applied < len(self.events):
+            kind, i, outcome, timestamp = self.events[self.applied]
+            self.applied += 1
+            t = self.members[i]
+            if kind == 'start':
+                t.status = _status_running
+                t.start_time = timestamp
+                continue
+            t.end_time = timestamp
+            if outcome is None or outcome == 0:
+                t.succeed()
+            else:
+                if isinstance(outcome, Exception):
+                    t.error.append(outcome)
+                t.fail()
+        if self._is_alive():
+            return False
+        if self.thread is not None:
+            self.thread.join()
+        for t in self.members:
+            if t.is_pending():
+                # The unit died without reporting this member
+                t.fail()
+        if self.members[-1].status == _status_succeeded:
+            self.succeed()
+        else:
+            self.fail()
+        return True
+
+    def kill(self):
+        """Stop the unit without updating its status, see the kill method of the members type."""
+        if self.process is not None:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        elif self.container is not None:
+            self.container.kill()
+        elif self.future is not None:
+            with _kill_lock:
+                self.killed = True
+                if not self.future.cancel() and self.thread_ident is not None:
+                    self.kill_pending = True
+                    ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                        ctypes.c_ulong(self.thread_ident), ctypes.py_object(SystemExit))
+                    self.thread_ident = None
+        return
+
+    def fail(self):
+        """Set unit status as failed, along with every member that didn't finish."""
+        for t in self.members:
+            if t.is_pending():
+                t.fail()
+        super(FusedTask, self).fail()
+        return
+
+    def wait(self):
+        """Block until every member finished."""
+        if self.future is not None:
+            concurrent.futures.wait([self.future])
+        else:
+            self.thread.join()
+        return
+
+    def get_logs(self) -> str:
+        """Get the logs of every member.
+
+        :return: members logs, one after the other
+        :rtype: str
+        """
+        return ''.join(t.get_logs() for t in self.members)
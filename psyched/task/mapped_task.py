@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import time
+import traceback
+from typing import Any, Callable, List, Union
+
+from .task import Task, _status_failed, _status_running, _status_scheduled, _status_succeeded
+
+
+class MappedTask(Task):
+    """Task expanding into one task per item once its upstream tasks finished.
+
+    The items come either from the result of an upstream PythonTask (a list)\
+        or from a listing file with one item per line. When the DAG runs a\
+        MappedTask it calls the factory once per item to create the instances,\
+        named ``name[0]``, ``name[1]``... and adds them to the DAG. The\
+        MappedTask itself doesn't take a worker slot: it succeeds once every\
+        instance succeeded, so tasks downstream from it act as a reduce step.
+        It fails without instances if the items can't be read (missing\
+        listing file, result that isn't a list...) or the factory raises,\
+        with the error in its logs.
+    """
+
+    def __init__(self, name: str, factory: Callable[[str, Any], Task], items_from: Union[Task, str]):
+        """Class constructor.
+
+        :param name: task name
+        :type name: str
+        :param factory: callable receiving an instance name and an item and returning the Task to run for it
+        :type factory: Callable[[str, Any], Task]
+        :param items_from: PythonTask whose result lists the items (it is set upstream from this task),\
+            or path of a file listing one item per line
+        :type items_from: Union[Task, str]
+        """
+        self.factory = factory
+        self.items_from = items_from
+        self.instances = []
+        self.result_consumers = 0
+        self.items_released = False
+        self.error = ''
+        super(MappedTask, self).__init__(name)
+        if isinstance(items_from, Task):
+            self.set_upstream(items_from)
+            if hasattr(items_from, 'release_result'):
+                items_from.result_consumers += 1
+
+    def get_items(self) -> List[Any]:
+        """Get the items to map over.
+
+        :return: result of the upstream PythonTask, or non-empty lines of the listing file
+        :rtype: List[Any]
+        """
+        if isinstance(self.items_from, Task):
+            return list(self.items_from.get_result())
+        with open(self.items_from) as f:
+            return [line.rstrip('\n') for line in f if line.strip()]
+
+    def _release_items(self):
+        """Release the result of the upstream PythonTask listing the items."""
+        if self.items_released:
+            return
+        self.items_released = True
+        if hasattr(self.items_from, 'release_result'):
+            self.items_from.release_result()
+        return
+
+    def expand(self) -> List[Task]:
+        """Create one instance per item.
+
+        The task fails instead if the items can't be read or the factory raises.
+
+        :return: newly created instances, already scheduled
+        :rtype: List[Task]
+        """
+        assert self.status == _status_scheduled
+        self.start_time = time.time()
+        try:
+            self.instances = [self.factory(f'{self.name}[{i}]', item) for i, item in enumerate(self.get_items())]
+        except Exception:
+            self.error = traceback.format_exc()
+            self.instances = []
+            self.fail()
+            return []
+        finally:
+            self._release_items()
+        for t in self.instances:
+            t.mapped_from = self
+            t.try_to_schedule()
+            if hasattr(t, 'release_result'):
+                t.result_consumers += 1
+        self.status = _status_running
+        return self.instances
+
+    def reset(self):
+        """Forget the outcome of the last run, see ``Task.reset``.
+
+        The instances are dropped, the next run expands the task again.
+        """
+        if self.items_released and hasattr(self.items_from, 'release_result'):
+            self.items_from.result_consumers += 1
+        self.items_released = False
+        self.error = ''
+        self.instances = []
+        super(MappedTask, self).reset()
+        return
+
+    def run(self):
+        """Expand the task, see expand."""
+        self.expand()
+        return
+
+    def try_to_finish(self) -> bool:
+        """Check if every instance finished and update the status accordingly.
+
+        :return: whether the task finished
+        :rtype: bool
+        """
+        assert self.status == _status_running
+        for t in self.instances:
+            if t.is_pending():
+                return False
+        if all(t.status == _status_succeeded for t in self.instances):
+            self.succeed()
+        else:
+            self.fail()
+        return True
+
+    def fail(self):
+        """Set task status as failed, release the upstream result and does the same recursively downstream."""
+        if self.status != _status_failed:
+            self._release_items()
+        super(MappedTask, self).fail()
+        return
+
+    def get_result(self) -> List[Any]:
+        """Get the results of the instances, for those that have one.
+
+        :return: list of instance results, in item order
+        :rtype: List[Any]
+        """
+        return [t.get_result() for t in self.instances if hasattr(t, 'get_result')]
+
+    def release_result(self):
+        """Signal that one of the tasks receiving this task result finished.
+
+        The instance results are released once every task receiving them finished.
+        """
+        self.result_consumers -= 1
+        if self.result_consumers > 0:
+            return
+        for t in self.instances:
+            if hasattr(t, 'release_result'):
+                t.release_result()
+        return
+
+    def get_logs(self) -> str:
+        """Get task logs.
+
+        :return: expansion error if any, then instance logs, one after the other
+        :rtype: str
+        """
+        return self.error + ''.join(t.get_logs() for t in self.instances)
+
+    def wait(self):
+        """Block until every instance is finished."""
+        for t in self.instances:
+            if t.status == _status_running:
+                t.wait()
+        return
@@ -1,16 +1,180 @@
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures
+import ctypes
+import inspect
+import multiprocessing
+import os
+import pickle
+import resource
 import sys
 import threading
+import time
+import traceback
 from io import StringIO
-from typing import Callable
+from typing import Any, Callable, List
 
-from ..utils import SysRedirect
-from .task import Task, _status_running, _status_scheduled
+from ..profiling import Profiler
+from ..shared import SharedResult, dump_shared, unlink_shared
+from ..utils import SysRedirect, call_target, get_rusage, set_affinity
+from .task import Task, _status_failed, _status_running, _status_scheduled
+
+_executor_thread = 'thread'
+_executor_process = 'process'
+_default_thread_pool_size = 32
+_kill_grace_period = 1.0
+
+_shared_lock = threading.Lock()
+_kill_lock = threading.Lock()
+_thread_pool = None
+_thread_pool_size = _default_thread_pool_size
+_event_loop = None
+_forkserver_ready = False
+
+
+def set_thread_pool_size(size: int):
+    """Set the number of threads shared by PythonTasks with the ``thread`` executor.
+
+    Tasks started afterwards run on a new pool, the running ones finish on the current one.
+
+    :param size: number of threads
+    :type size: int
+    """
+    global _thread_pool, _thread_pool_size
+    with _shared_lock:
+        _thread_pool_size = size
+        if _thread_pool is not None:
+            _thread_pool.shutdown(wait=False)
+            _thread_pool = None
+    return
+
+
+def _reserve_threads(size: int):
+    """Make the thread pool at least size threads big, so that size tasks can run at once."""
+    if size > _thread_pool_size:
+        set_thread_pool_size(size)
+    return
+
+
+def _get_thread_pool() -> concurrent.futures.ThreadPoolExecutor:
+    """Get the thread pool of the ``thread`` executor, creating it on first use."""
+    global _thread_pool
+    with _shared_lock:
+        if _thread_pool is None:
+            _thread_pool = concurrent.futures.ThreadPoolExecutor(_thread_pool_size, thread_name_prefix='psyched')
+        return _thread_pool
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """Get the event loop running the coroutine targets, starting it in its own thread on first use."""
+    global _event_loop
+    with _shared_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            threading.Thread(target=_event_loop.run_forever, name='psyched-event-loop', daemon=True).start()
+        return _event_loop
+
+
+def _process_main(target: Callable, kwargs: dict, conn: multiprocessing.connection.Connection,
+                  profiler: Profiler = None, cpus: List[int] = None):
+    """Call the target in a child process, on the given CPUs if any, and send the outcome back through conn."""
+    if cpus is not None:
+        set_affinity(0, cpus)
+    sys.stdout = StringIO("")
+    error = None
+    data, segments = None, []
+    try:
+        if profiler is not None:
+            data, segments = dump_shared(profiler.call(target, kwargs))
+        else:
+            data, segments = dump_shared(call_target(target, kwargs))
+    except Exception as e:
+        print(traceback.format_exc(), end='')
+        error = repr(e)
+    usage = get_rusage(resource.getrusage(resource.RUSAGE_SELF))
+    profile = None if profiler is None else (profiler.stats, profiler.allocations)
+    conn.send((error, sys.stdout.getvalue(), data, segments, usage, profile))
+    conn.close()
+    return
+
+
+def _discard_outcome(conn: multiprocessing.connection.Connection):
+    """Free the shared memory of an outcome sent by _process_main that won't be collected.
+
+    The child gives up the result segments once sent, so they would stay in\
+        /dev/shm if the message was dropped. Call it once the child is dead.
+    """
+    try:
+        if conn.poll(0):
+            unlink_shared(conn.recv()[3])
+    except (EOFError, OSError):
+        pass
+    return
+
+
+def _start_process(args: tuple) -> multiprocessing.Process:
+    """Start _process_main in a child process, forked from the forkserver if args can be pickled.
+
+    The forkserver is single-threaded, so its children can't inherit a lock\
+        held by another thread of this process. Unpicklable args (lambdas,\
+        local functions...) fall back to forking this process.
+    """
+    global _forkserver_ready
+    context = multiprocessing.get_context('forkserver')
+    with _shared_lock:
+        if not _forkserver_ready:
+            # Spares every child importing psyched again
+            context.set_forkserver_preload([__name__])
+            _forkserver_ready = True
+    child = context.Process(target=_process_main, args=args)
+    try:
+        child.start()
+        return child
+    except (pickle.PicklingError, AttributeError, TypeError):
+        pass
+    child = multiprocessing.get_context('fork').Process(target=_process_main, args=args)
+    child.start()
+    return child
 
 
 class PythonTask(Task):
-    """Task representing a python function."""
+    """Task representing a python function.
+
+    **Results**
+
+    The value returned by the target is kept as the task result. A downstream\
+        PythonTask can receive it as a keyword argument (see set_result_kwarg).\
+        Results are passed by reference with the ``thread`` executor; with the\
+        ``process`` executor they are sent back with pickle protocol 5, large\
+        buffers (NumPy arrays, bytes...) going through shared memory instead of\
+        being copied. A result is released once every task receiving it finished.
+
+    **Threads and coroutines**
+
+    With the ``thread`` executor targets run on a thread pool shared by\
+        every PythonTask (see set_thread_pool_size), instead of a new thread\
+        each. The pool grows to the ``max_parallel_workers`` of the DAG\
+        running the tasks. Coroutine functions (``async def``) don't take a\
+        thread at all: they are awaited on an event loop shared by every\
+        PythonTask, so thousands of I/O-bound tasks can wait at once. A\
+        coroutine target must not block the loop; with the ``process``\
+        executor, on a remote worker or in a fused chain it is run in an\
+        event loop of its own.
+
+    **Child processes**
+
+    With the ``process`` executor the target runs in a child process forked\
+        from a multiprocessing forkserver, as forking the scheduler itself,\
+        whose thread pool, event loop and monitoring threads may hold locks,\
+        could leave the child deadlocked. The target, its arguments and its\
+        result must then be picklable, and like with any multiprocessing\
+        start method but fork, the main module is imported again in the\
+        child: scripts must build and run their DAG under\
+        ``if __name__ == '__main__':``. Targets that can't be pickled\
+        (lambdas, local functions...) fall back to forking this process,\
+        with that deadlock hazard.
+    """
 
     def __init__(self, name: str, target: Callable, **kwargs):
         """Class constructor.
@@ -24,59 +188,334 @@ class PythonTask(Task):
         """
         self.target = target
         self.kwargs = kwargs
-        self.thread = None
+        self.executor = _executor_thread
+        self.future = None
+        self.thread_ident = None
+        self.killed = False
+        self.kill_pending = False
+        self.child = None
+        self.conn = None
+        self.process = None
         self.error = []
         self.outfile = StringIO("")
+        self.result = None
+        self.shared_result = None
+        self.result_kwargs = {}
+        self.result_consumers = 0
+        self.inputs_released = False
+        self.profiler = None
+        self.profile_dir = None
         super(PythonTask, self).__init__(name)
 
-    def run(self):
-        """Run the target in a new thread."""
-        assert self.status == _status_scheduled
+    def set_executor(self, executor: str):
+        """Choose how the target is run.
+
+        :param executor: either ``thread`` (the default) or ``process`` to run\
+            the target in a child process (see PythonTask)
+        :type executor: str
+        :raises ValueError: unknown executor
+        """
+        if executor not in [_executor_thread, _executor_process]:
+            raise ValueError(f"Unknown executor '{executor}'")
+        self.executor = executor
+        return
+
+    def set_profile(self, profile_dir: str = None, memory: bool = True):
+        """Profile the target with cProfile, and tracemalloc if memory is True.
+
+        The reports are available from ``profiler`` once the task finished\
+            (see Profiler), and written to ``<profile_dir>/<task name>.pstats``\
+            and ``<profile_dir>/<task name>.allocations.txt`` if profile_dir is\
+            given. Targets running on a remote worker and coroutine targets\
+            on the shared event loop aren't profiled.
+
+        :param profile_dir: directory to write the reports to, defaults to None (not written)
+        :type profile_dir: str, optional
+        :param memory: whether to report the allocations too, defaults to True
+        :type memory: bool, optional
+        """
+        self.profiler = Profiler(memory=memory)
+        self.profile_dir = profile_dir
+        return
+
+    def set_result_kwarg(self, kwarg: str, t: PythonTask):
+        """Pass the result of another task to this task target.
+
+        Also sets t upstream from this task.
+
+        :param kwarg: name of the keyword argument receiving the result
+        :type kwarg: str
+        :param t: PythonTask whose result to receive
+        :type t: PythonTask
+        """
+        if kwarg in self.result_kwargs:
+            self.result_kwargs[kwarg].result_consumers -= 1
+        t.result_consumers += 1
+        self.result_kwargs[kwarg] = t
+        self.set_upstream(t)
+        return
+
+    def get_result(self) -> Any:
+        """Get the value returned by the target.
+
+        :return: target return value, None if not finished or already released
+        :rtype: Any
+        """
+        return self.result
+
+    def release_result(self):
+        """Signal that one of the tasks receiving this task result finished.
+
+        The result is dropped (and its shared memory freed) once every task receiving it finished.
+        """
+        self.result_consumers -= 1
+        if self.result_consumers > 0:
+            return
+        self.result = None
+        if self.shared_result is not None:
+            self.shared_result.release()
+            self.shared_result = None
+        return
+
+    def reset(self):
+        """Forget the outcome of the last run, see ``Task.reset``.
+
+        The results received from upstream tasks must be available again,\
+            which means they have to run again too if they were released.
+        """
+        if self.inputs_released:
+            for t in self.result_kwargs.values():
+                t.result_consumers += 1
+        self.inputs_released = False
+        self.future = None
+        self.thread_ident = None
+        self.killed = False
+        self.kill_pending = False
+        self.child = None
+        self.conn = None
+        self.process = None
+        self.error = []
+        self.outfile = StringIO("")
+        self.result = None
+        if self.shared_result is not None:
+            self.shared_result.release()
+            self.shared_result = None
+        super(PythonTask, self).reset()
+        return
+
+    def _release_inputs(self):
+        """Release the results of the tasks this one received."""
+        if self.inputs_released:
+            return
+        self.inputs_released = True
+        for t in self.result_kwargs.values():
+            t.release_result()
+        return
 
-        def wrapped_function(__target, __error, __outfile, **kwargs):
-            sys.stdout.register(self.outfile)
+    def _get_call_kwargs(self) -> dict:
+        """Get the keyword arguments for the target, including upstream results."""
+        kwargs = dict(self.kwargs)
+        for kwarg, t in self.result_kwargs.items():
+            kwargs[kwarg] = t.get_result()
+        return kwargs
+
+    def is_coroutine(self) -> bool:
+        """Check if the target is a coroutine function.
+
+        :return: whether the target is an ``async def`` function
+        :rtype: bool
+        """
+        return inspect.iscoroutinefunction(self.target)
+
+    def _call_in_thread(self, kwargs: dict):
+        """Call the target from a thread of the pool."""
+        with _kill_lock:
+            if self.killed:
+                return
+            self.thread_ident = threading.get_ident()
+        SysRedirect.register(self.outfile)
+        cpu_start = time.thread_time()
+        try:
             try:
-                __target(**kwargs)
+                if self.profiler is not None:
+                    self.result = self.profiler.call(self.target, kwargs)
+                else:
+                    self.result = self.target(**kwargs)
+            except SystemExit as e:
+                self.kill_pending = False
+                self.error.append(e)
             except Exception as e:
-                __error.append(e)
-            return
+                self.error.append(e)
+            finally:
+                with _kill_lock:
+                    self.thread_ident = None
+            # The thread runs other tasks next: let a SystemExit sent by kill be raised here first
+            deadline = time.time() + _kill_grace_period
+            while self.kill_pending and time.time() < deadline:
+                time.sleep(0.001)
+        except SystemExit:
+            self.kill_pending = False
+        finally:
+            SysRedirect.unregister()
+        self.resources = {'cpu_time': time.thread_time() - cpu_start}
+        return
 
-        SysRedirect.install()
+    async def _await_target(self, kwargs: dict):
+        """Await the coroutine target on the shared event loop."""
+        SysRedirect.register_context(self.outfile)
+        try:
+            self.result = await self.target(**kwargs)
+        except Exception as e:
+            self.error.append(e)
+        return
 
-        self.thread = threading.Thread(
-            target=wrapped_function,
-            args=(self.target, self.error, self.outfile),
-            kwargs=self.kwargs)
-        self.thread.start()
+    def run(self):
+        """Run the target on the thread pool, or the event loop for coroutine targets, or a child\
+            process with the ``process`` executor.
+
+        If the DAG placed the task on a remote worker the target is sent there\
+            instead, so it must be picklable.
+        """
+        assert self.status == _status_scheduled
+        kwargs = self._get_call_kwargs()
+        if self.host is not None:
+            self.process = self.host.run_python(self.target, kwargs)
+            self.status = _status_running
+            return
+        if self.executor == _executor_process:
+            self.conn, child_conn = multiprocessing.Pipe(duplex=False)
+            self.child = _start_process((self.target, kwargs, child_conn, self.profiler, self.cpuset))
+            child_conn.close()
+            self.status = _status_running
+            return
+        SysRedirect.install()
+        if self.is_coroutine():
+            self.future = asyncio.run_coroutine_threadsafe(self._await_target(kwargs), _get_event_loop())
+        else:
+            self.future = _get_thread_pool().submit(self._call_in_thread, kwargs)
         self.status = _status_running
         return
 
+    def _collect_child(self):
+        """Get the outcome of the child process once it is done."""
+        message = None
+        if self.conn.poll():
+            try:
+                message = self.conn.recv()
+            except EOFError:
+                pass
+        self.conn.close()
+        self.child.join()
+        if message is None:
+            self.error.append(RuntimeError(f"Process exited with code {self.child.exitcode}"))
+            return
+        error, logs, data, segments, self.resources, profile = message
+        if profile is not None:
+            self.profiler.stats, self.profiler.allocations = profile
+        self.outfile.write(logs)
+        if error is not None:
+            self.error.append(RuntimeError(error))
+            return
+        self.shared_result = SharedResult(data, segments)
+        self.result = self.shared_result.value
+        return
+
     def try_to_finish(self) -> bool:
-        """Check if the associated thread is still alive and update the status accordingly.
+        """Check if the target is done and update the status accordingly.
 
         :return: whether the task finished
         :rtype: bool
         """
         assert self.status == _status_running
-        if not self.thread.is_alive():
-            self.thread.join()
-            if self.error == []:
+        if self.process is not None:
+            exit_code = self.process.poll()
+            if exit_code is None:
+                return False
+            self.result = self.process.result
+            if exit_code == 0:
                 self.succeed()
             else:
                 self.fail()
             return True
-        else:
+        if self.child is not None:
+            if not self.conn.poll() and self.child.is_alive():
+                return False
+            self._collect_child()
+        elif not self.future.done():
             return False
+        elif self.future.cancelled():
+            self.error.append(concurrent.futures.CancelledError())
+        elif self.future.exception() is not None:
+            self.error.append(self.future.exception())
+        if self.profiler is not None and self.profile_dir is not None:
+            self.profiler.dump(os.path.join(self.profile_dir, self.name.replace(os.sep, '_')))
+        if self.error == []:
+            self.succeed()
+        else:
+            self.fail()
+        return True
+
+    def succeed(self):
+        """Set task status as succeeded, release upstream results and try to schedule downstream tasks."""
+        self._release_inputs()
+        super(PythonTask, self).succeed()
+        return
+
+    def fail(self):
+        """Set task status as failed, release upstream results and does the same recursively downstream."""
+        if self.status != _status_failed:
+            self._release_inputs()
+        super(PythonTask, self).fail()
+        return
+
+    def kill(self):
+        """Stop the target without updating the task status.
+
+        The child process of the ``process`` executor is killed, and\
+            coroutine targets are cancelled. A thread can't be killed:\
+            SystemExit is raised in it instead, which only happens once it\
+            runs python code again, so targets blocking in C code (sockets,\
+            locks...) should use the ``process`` executor to be stopped\
+            reliably. Targets running on a remote worker are killed by the\
+            worker agent, which runs each of them in a child process.
+        """
+        if self.process is not None:
+            self.process.kill()
+        elif self.child is not None:
+            self.child.kill()
+            self.child.join()
+            # The target may have finished already
+            _discard_outcome(self.conn)
+            self.conn.close()
+        elif self.future is not None:
+            with _kill_lock:
+                self.killed = True
+                if not self.future.cancel() and self.thread_ident is not None:
+                    self.kill_pending = True
+                    ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                        ctypes.c_ulong(self.thread_ident), ctypes.py_object(SystemExit))
+                    self.thread_ident = None
+        return
 
     def wait(self):
         """Block until the task is finished."""
-        self.thread.join()
+        if self.process is not None:
+            self.process.wait()
+            return
+        if self.child is not None:
+            self.conn.poll(None)
+            return
+        concurrent.futures.wait([self.future])
         return
 
     def get_logs(self) -> str:
         """Get task logs.
 
-        :return: contents of the thread stdout
+        With the ``process`` executor logs are only available once the task finished.
+
+        :return: contents of the target stdout
         :rtype: str
         """
+        if self.process is not None:
+            return self.process.get_logs()
         return self.outfile.getvalue()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import glob
+import os
+import select
+import time
+from typing import List, Union
+
+from ..inotify import IN_ATTRIB, IN_CLOSE_WRITE, IN_CREATE, IN_MOVED_TO, Inotify
+from .task import Task, _status_running, _status_scheduled
+
+_watch_mask = IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE | IN_ATTRIB
+
+
+def _get_watched_dirs(pattern: str) -> List[str]:
+    """Get the directories where a file matching pattern would appear.
+
+    Those are the existing directories matching the directory part of the\
+        pattern, and the deepest existing directory without wildcards above\
+        it, where the missing directories would be created.
+    """
+    pattern = os.path.abspath(pattern)
+    dirname = os.path.dirname(pattern)
+    dirs = [d for d in glob.glob(dirname) if os.path.isdir(d)] if glob.has_magic(dirname) else []
+    ancestor = dirname
+    while glob.has_magic(ancestor) or not os.path.isdir(ancestor):
+        ancestor = os.path.dirname(ancestor)
+    dirs.append(ancestor)
+    return dirs
+
+
+class SensorTask(Task):
+    """Task waiting for files to appear.
+
+    It succeeds once every path exists; paths may be glob patterns, which\
+        are satisfied by any match. A sensor doesn't take a worker slot while\
+        waiting, and like any task it can be limited with set_timeout.
+
+    The directories the files would appear in are watched with inotify, so\
+        a waiting sensor only costs a non-blocking read per scheduler tick.\
+        Where inotify isn't available (not Linux, or out of inotify\
+        instances) the paths are checked every poll_interval seconds instead.\
+        Files on network filesystems changed from another machine don't\
+        trigger inotify, so use_inotify should be False for them.
+    """
+
+    def __init__(self, name: str, paths: Union[str, List[str]], poll_interval: float = 5.0,
+                 use_inotify: bool = True):
+        """Class constructor.
+
+        :param name: task name
+        :type name: str
+        :param paths: paths or glob patterns to wait for
+        :type paths: Union[str, List[str]]
+        :param poll_interval: seconds between two checks when polling, defaults to 5.0
+        :type poll_interval: float, optional
+        :param use_inotify: whether to use inotify when available, defaults to True
+        :type use_inotify: bool, optional
+        """
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.inotify = None
+        self.last_check = None
+        self.matches = []
+        self.satisfied = False
+        super(SensorTask, self).__init__(name)
+
+    def duplicate(self, name: str) -> SensorTask:
+        """Create a new sensor waiting for the same paths.
+
+        :param name: name of the new task
+        :type name: str
+        :return: the new task
+        :rtype: SensorTask
+        """
+        return SensorTask(name, self.paths, self.poll_interval, self.use_inotify)
+
+    def reset(self):
+        """Forget the outcome of the last run, see ``Task.reset``."""
+        self._close()
+        self.last_check = None
+        self.matches = []
+        self.satisfied = False
+        super(SensorTask, self).reset()
+        return
+
+    def check(self) -> bool:
+        """Check if every path exists, keeping the matches.
+
+        :return: whether the sensor is satisfied
+        :rtype: bool
+        """
+        self.last_check = time.time()
+        matches = [sorted(glob.glob(p)) for p in self.paths]
+        if not all(matches):
+            return False
+        self.matches = [m for match in matches for m in match]
+        self.satisfied = True
+        return True
+
+    def _watch(self):
+        """Watch the directories the paths would appear in; new ones may have been created since the last call."""
+        for pattern in self.paths:
+            for d in _get_watched_dirs(pattern):
+                try:
+                    self.inotify.add_watch(d, _watch_mask)
+                except OSError:
+                    # Removed in the meantime, its parent is watched from the next call
+                    pass
+        return
+
+    def run(self):
+        """Start waiting: watch the paths, unless they are there already."""
+        assert self.status == _status_scheduled
+        self.status = _status_running
+        if self.check() or not self.use_inotify:
+            return
+        try:
+            self.inotify = Inotify()
+        except OSError:
+            return
+        self._watch()
+        # A file created before the watches were added wouldn't trigger an event
+        if self.check():
+            self._close()
+        return
+
+    def try_to_finish(self) -> bool:
+        """Check if the paths appeared and update the status accordingly.
+
+        :return: whether the task finished
+        :rtype: bool
+        """
+        assert self.status == _status_running
+        if self.satisfied:
+            pass
+        elif self.inotify is not None:
+            if not self.inotify.read():
+                return False
+            self._watch()
+            if not self.check():
+                return False
+        elif time.time() - self.last_check < self.poll_interval or not self.check():
+            return False
+        self._close()
+        self.succeed()
+        return True
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the paths appeared.
+
+        :param timeout: maximum seconds to wait, defaults to None (no limit)
+        :type timeout: float, optional
+        :return: whether the sensor is satisfied
+        :rtype: bool
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while not self.satisfied:
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                return False
+            if self.inotify is not None:
+                select.select([self.inotify], [], [], remaining)
+                if self.inotify.read():
+                    self._watch()
+                    self.check()
+            else:
+                time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+                self.check()
+        return True
+
+    def _close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        return
+
+    def kill(self):
+        """Stop waiting, without updating the task status."""
+        self._close()
+        return
+
+    def get_logs(self) -> str:
+        """Get task logs.
+
+        :return: paths matched, one per line, once satisfied
+        :rtype: str
+        """
+        return ''.join(f'{m}\n' for m in self.matches)
@@ -1,14 +1,34 @@
 from __future__ import annotations
 
+import os
+import signal
 import subprocess
+import time
 from io import StringIO
 from typing import List
 
-from .task import Task, _status_running, _status_scheduled
+from ..launcher import Launcher
+from ..utils import get_rusage, pinned
+from .task import Task, _status_failed, _status_running, _status_scheduled, _status_succeeded, _status_waiting
 
 
 class ShellTask(Task):
-    """Task representing a shell command."""
+    """Task representing a shell command.
+
+    **Streaming**
+
+    Besides regular dependencies, a ShellTask can stream its stdout into the\
+        stdin of a downstream ShellTask (``a | b``, or ``a.stream_to(b)``).\
+        Both commands then run concurrently, like a shell pipeline, and the\
+        producer logs only contain its stderr. A pipeline is started as a\
+        whole once every member's other dependencies succeeded, and its\
+        consumer only succeeds if the producer succeeded as well. It takes a\
+        worker slot per member, so it waits until the DAG has that many\
+        free; a pipeline longer than max_parallel_workers waits until no\
+        other task runs instead, and then runs beyond the limit.
+
+    Note that ``|`` binds weaker than ``>>``: write ``(a | b) >> c``.
+    """
 
     def __init__(self, name: str, command: List[str]):
         """Class contructor.
@@ -20,38 +40,254 @@ class ShellTask(Task):
         """
         self.command = command
         self.process = None
+        self.logs_pipe = None
+        self.stream_upstream = None
+        self.stream_downstream = None
+        self.launcher = None
         self.outfile = StringIO("")
         super(ShellTask, self).__init__(name)
 
+    def set_launcher(self, launcher: Launcher):
+        """Start the command through a Launcher instead of forking this process.
+
+        :param launcher: launcher to use, None to start the command directly
+        :type launcher: Launcher
+        """
+        self.launcher = launcher
+        return
+
+    def reset(self):
+        """Forget the outcome of the last run, see ``Task.reset``."""
+        if self.logs_pipe is not None:
+            self.logs_pipe.close()
+            self.logs_pipe = None
+        self.process = None
+        self.outfile = StringIO("")
+        super(ShellTask, self).reset()
+        return
+
+    def stream_to(self, t: ShellTask):
+        """Set another task downstream from this one, piping this task stdout into its stdin.
+
+        :param t: ShellTask reading this task output
+        :type t: ShellTask
+        :raises TypeError: t is not a ShellTask
+        :raises ValueError: either task is already streaming to or from another task
+        """
+        if not isinstance(t, ShellTask):
+            raise TypeError("Only ShellTasks can be streamed to")
+        if self.stream_downstream is not None or t.stream_upstream is not None:
+            raise ValueError("A task can only stream to and from one task")
+        self.set_downstream(t)
+        self.stream_downstream = t
+        t.stream_upstream = self
+        return
+
+    def is_streaming(self) -> bool:
+        """Check if this task is part of a pipeline.
+
+        :return: whether this task streams to or from another task
+        :rtype: bool
+        """
+        return self.stream_upstream is not None or self.stream_downstream is not None
+
+    def get_fingerprint(self) -> tuple:
+        """Get a key shared by the tasks running the same command, see ``Task.get_fingerprint``.
+
+        :return: task type and command, None if streaming
+        :rtype: tuple
+        """
+        if self.is_streaming():
+            return None
+        return (ShellTask, self.command if isinstance(self.command, str) else tuple(self.command))
+
+    def get_pipeline(self) -> List[ShellTask]:
+        """Get the tasks in the pipeline started by this task.
+
+        :return: this task followed by every task it streams to, directly or not
+        :rtype: List[ShellTask]
+        """
+        pipeline = [self]
+        while pipeline[-1].stream_downstream is not None:
+            pipeline.append(pipeline[-1].stream_downstream)
+        return pipeline
+
+    def update_status(self, runnable: bool = False) -> int:
+        """Update query status.
+
+        Same as Task.update_status, but starting a pipeline counts every task in it.
+
+        :param runnable: indicates whether the task should be run if possible, defaults to False
+        :type runnable: bool, optional
+        :return: number of tasks started, -1 if finished running task, 0 if no changes made
+        :rtype: int
+        """
+        d_run = super(ShellTask, self).update_status(runnable=runnable)
+        if d_run == 1:
+            d_run = len(self.get_pipeline())
+        return d_run
+
+    def try_to_schedule(self) -> bool:
+        """Check if all dependencies finished and if so schedule this task.
+
+        Tasks reading from a stream are never scheduled on their own: the\
+            first task of the pipeline is scheduled once the dependencies of\
+            every task in it succeeded, and starts them all.
+
+        :return: whether the task was scheduled or not
+        :rtype: bool
+        """
+        if self.status != _status_waiting:
+            return False
+        if self.stream_upstream is not None:
+            return self.stream_upstream.try_to_schedule()
+        for t in self.get_pipeline():
+            for dep in t.upstream:
+                if dep is not t.stream_upstream and dep.status != _status_succeeded:
+                    return False
+        self.status = _status_scheduled
+        self.scheduled_time = time.time()
+        return True
+
     def run(self):
-        """Run command on a subprocess."""
+        """Run command on a subprocess.
+
+        The command runs on ``self.host`` if the DAG placed the task on a remote worker,\
+            and is started by ``self.launcher`` if set. It is restricted to\
+            ``self.cpuset`` from its start if the DAG pinned the task.
+        If this task streams to another one, that task is started as well.
+        """
         assert self.status == _status_scheduled
-        self.process = subprocess.Popen(
-            self.command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT
-            )
+        if self.logs_pipe is not None:
+            # Left by a failed attempt
+            self.logs_pipe.close()
+            self.logs_pipe = None
+        if self.host is not None:
+            self.process = self.host.run_shell(self.command)
+        else:
+            stdin = None
+            stderr = subprocess.STDOUT
+            if self.stream_upstream is not None:
+                stdin = self.stream_upstream.process.stdout
+            if self.stream_downstream is not None:
+                stderr = subprocess.PIPE
+            if self.launcher is not None:
+                self.process = self.launcher.spawn(
+                    self.command, stdin=stdin, stderr_pipe=self.stream_downstream is not None, cpus=self.cpuset)
+            else:
+                with pinned(self.cpuset):
+                    self.process = subprocess.Popen(
+                        self.command,
+                        stdin=stdin,
+                        stdout=subprocess.PIPE,
+                        stderr=stderr,
+                        start_new_session=True
+                        )
+            if stdin is not None:
+                # The consumer owns the read end now, so the producer gets SIGPIPE if it exits
+                stdin.close()
+            self.logs_pipe = self.process.stdout if self.stream_downstream is None else self.process.stderr
         self.status = _status_running
+        if self.stream_downstream is not None:
+            self.stream_downstream.status = _status_scheduled
+            self.stream_downstream.scheduled_time = self.scheduled_time
+            self.stream_downstream.start_time = self.start_time
+            self.stream_downstream.run()
         return
 
     def try_to_finish(self) -> bool:
         """Check if the subprocess exited and update the status accordingly.
 
+        A task reading from a stream only finishes once its producer did.
+
         :return: whether the task finished
         :rtype: bool
         """
         assert self.status == _status_running
-        exit_code = self.process.poll()
+        exit_code = self.process.poll() if self.host is not None else self._poll()
         if exit_code is not None:
+            if self.stream_upstream is not None and self.stream_upstream.is_pending():
+                return False
             self.wait()
-            if exit_code == 0:
+            if exit_code == 0 and (self.stream_upstream is None or
+                                   self.stream_upstream.status == _status_succeeded):
                 self.succeed()
-            else:
+            elif self.is_streaming():
                 self.fail()
+            else:
+                self.fail_attempt(exit_code)
             return True
         else:
             return False
 
+    def _poll(self) -> int:
+        """Check if the local subprocess exited, collecting its resource usage if so.
+
+        :return: exit status, or None if still running
+        :rtype: int
+        """
+        if self.launcher is not None:
+            # Reaped by the launcher helper, which reports the usage
+            exit_code = self.process.poll()
+            self.resources = self.process.resources
+            return exit_code
+        if self.process.returncode is not None:
+            return self.process.returncode
+        try:
+            pid, status, rusage = os.wait4(self.process.pid, os.WNOHANG)
+        except ChildProcessError:
+            # Already reaped by Popen
+            return self.process.poll()
+        if pid == 0:
+            return None
+        self.process.returncode = os.waitstatus_to_exitcode(status)
+        self.resources = get_rusage(rusage)
+        return self.process.returncode
+
+    def fail(self):
+        """Set task status as failed and does the same recursively downstream.
+
+        A running task this one streams to is left alone: it fails by itself\
+            once its process exits.
+        """
+        if self.status == _status_failed:
+            return
+        if self.start_time is not None and self.end_time is None:
+            self.end_time = time.time()
+        self.status = _status_failed
+        for t in self.downstream:
+            if t is self.stream_downstream and t.status == _status_running:
+                continue
+            t.fail()
+        return
+
+    def kill(self):
+        """Kill the subprocess, and every process it started, without updating the task status.
+
+        Commands run in their own process group, which is killed as a whole.
+        """
+        if self.host is not None:
+            self.process.kill()
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+        return
+
+    def duplicate(self, name: str) -> ShellTask:
+        """Create a new task running the same command.
+
+        :param name: name of the new task
+        :type name: str
+        :return: new task, without dependencies
+        :rtype: ShellTask
+        """
+        t = ShellTask(name, self.command)
+        t.set_launcher(self.launcher)
+        return t
+
     def wait(self):
         """Block until the task is finished."""
         self.process.wait()
@@ -60,13 +296,27 @@ class ShellTask(Task):
     def get_logs(self) -> str:
         """Get task logs.
 
-        :return: contents of the subprocess stdout and stderr
+        :return: contents of the subprocess stdout and stderr, only stderr if streaming to another task,\
+            preceded by the logs of the retried attempts, those of the task run in its place if merged
         :rtype: str
         """
-        if self.process is None:
-            return ""
-        return self.process.stdout.peek(-1).decode('utf-8')
+        if self.merged_into is not None:
+            return self.merged_into.get_logs()
+        logs = self.get_attempts_logs()
+        if self.process is None or self.status == _status_scheduled:
+            return logs + self.outfile.getvalue()
+        if self.host is not None:
+            return logs + self.process.get_logs()
+        return logs + self.logs_pipe.peek(-1).decode('utf-8')
+
+    def __or__(self, other: ShellTask) -> ShellTask:
+        """Operator |.
+
+        Streams left task stdout into right task stdin.
+        """
+        self.stream_to(other)
+        return other
 
     def __del__(self):
-        if self.process is not None:
-            self.process.stdout.close()
+        if self.logs_pipe is not None:
+            self.logs_pipe.close()
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import List, Union
+import time
+from typing import Dict, List, Union
+
+from ..retry import RetryPolicy
 
 _status_waiting = 'waiting'
 _status_scheduled = 'scheduled'
@@ -39,6 +42,9 @@ class Task(object):
     ``succeeded``: task completed successfully.
 
     ``failed``: either this task or an upstream task completed unsuccessfully.
+
+    Tasks skipped by an incremental run (see ``DAG.run``) are ``succeeded``\
+        with ``skipped`` set.
     """
 
     def __init__(self, name: str):
@@ -51,6 +57,24 @@ class Task(object):
         self.status = _status_waiting
         self.upstream = []
         self.downstream = []
+        self.host = None
+        self.scheduled_time = None
+        self.start_time = None
+        self.end_time = None
+        self.inputs = []
+        self.outputs = []
+        self.skipped = False
+        self.idempotent = False
+        self.mapped_from = None
+        self.merged_into = None
+        self.cpu_request = 1
+        self.cpuset = None
+        self.timeout = None
+        self.timed_out = False
+        self.retry = None
+        self.retry_at = None
+        self.attempts = []
+        self.resources = {}
         return
 
     def update_status(self, runnable: bool = False) -> int:
@@ -65,7 +89,8 @@ class Task(object):
         :rtype: int
         """
         if self.status == _status_scheduled:
-            if runnable:
+            if runnable and not self.is_backing_off(time.time()):
+                self.start_time = time.time()
                 self.run()
                 return 1
             else:
@@ -88,6 +113,7 @@ class Task(object):
             if dep.status != _status_succeeded:
                 return False
         self.status = _status_scheduled
+        self.scheduled_time = time.time()
         return True
 
     def run(self):
@@ -106,8 +132,143 @@ class Task(object):
         """
         raise NotImplementedError
 
+    def kill(self):
+        """Stop the running task without updating its status.
+
+        :raises NotImplementedError: this function is a shell. It should be\
+        overriden by classes inheriting from Task
+        """
+        raise NotImplementedError
+
+    def duplicate(self, name: str) -> Task:
+        """Create a new task doing the same work as this one.
+
+        :param name: name of the new task
+        :type name: str
+        :raises NotImplementedError: this function is a shell. It should be\
+        overriden by classes inheriting from Task
+        """
+        raise NotImplementedError
+
+    def set_idempotent(self, idempotent: bool = True):
+        """Declare whether running this task twice is harmless.
+
+        Only idempotent tasks may get a speculative duplicate (see SpeculationPolicy).
+
+        :param idempotent: whether the task is idempotent, defaults to True
+        :type idempotent: bool, optional
+        """
+        self.idempotent = idempotent
+        return
+
+    def set_cpus(self, count: int):
+        """Set how many dedicated CPUs this task needs when the DAG pins tasks (see CpuAllocator).
+
+        :param count: number of CPUs
+        :type count: int
+        """
+        self.cpu_request = count
+        return
+
+    def set_timeout(self, timeout: float):
+        """Limit how long this task may run.
+
+        A task running for longer is killed by the DAG and fails, with ``timed_out`` set.
+
+        :param timeout: maximum run time in seconds, None for no limit
+        :type timeout: float
+        """
+        self.timeout = timeout
+        return
+
+    def set_retry(self, retry: RetryPolicy):
+        """Run this task again when it fails, following a retry policy.
+
+        Only ShellTasks (other than streaming ones) and DockerTasks are retried.
+
+        :param retry: retry policy, None to never retry
+        :type retry: RetryPolicy
+        """
+        self.retry = retry
+        return
+
+    def is_backing_off(self, now: float) -> bool:
+        """Check if this task is waiting before a retry.
+
+        :param now: current time
+        :type now: float
+        :return: whether the task is scheduled but its retry is not due yet
+        :rtype: bool
+        """
+        return self.status == _status_scheduled and self.retry_at is not None and now < self.retry_at
+
+    def fail_attempt(self, exit_code: int):
+        """Fail the running attempt, scheduling a retry if the retry policy allows it.
+
+        Retried attempts are kept in ``attempts``, along with their logs.
+
+        :param exit_code: exit code of the attempt
+        :type exit_code: int
+        """
+        if self.retry is None or not self.retry.should_retry(len(self.attempts) + 1, exit_code):
+            self.fail()
+            return
+        now = time.time()
+        logs = self.get_logs()[len(self.get_attempts_logs()):]
+        self.attempts.append({'start_time': self.start_time, 'end_time': now, 'exit_code': exit_code, 'logs': logs})
+        self.retry_at = now + self.retry.get_delay(len(self.attempts))
+        self.scheduled_time = self.retry_at
+        self.start_time = None
+        self.status = _status_scheduled
+        return
+
+    def get_attempts_logs(self) -> str:
+        """Get the logs of the retried attempts.
+
+        :return: logs of every retried attempt, each one followed by its outcome
+        :rtype: str
+        """
+        return ''.join(
+            f"{a['logs']}--- attempt {i} failed with exit code {a['exit_code']}, retrying ---\n"
+            for i, a in enumerate(self.attempts, 1)
+            )
+
+    def has_timed_out(self, now: float) -> bool:
+        """Check if this task is running for longer than its timeout.
+
+        :param now: current time
+        :type now: float
+        :return: whether the task is running and exceeded its timeout
+        :rtype: bool
+        """
+        if self.timeout is None or self.status != _status_running:
+            return False
+        return now - self.start_time > self.timeout
+
+    def get_sibling_key(self) -> tuple:
+        """Get a key shared by the tasks comparable to this one.
+
+        :return: the MappedTask this task is an instance of, or this task type and upstream tasks
+        :rtype: tuple
+        """
+        if self.mapped_from is not None:
+            return (self.mapped_from,)
+        return (type(self), frozenset(self.upstream))
+
+    def get_fingerprint(self) -> tuple:
+        """Get a key shared by the tasks doing the exact same work as this one.
+
+        Dependencies aren't part of it: the DAG compares them (see ``DAG.dedup``).
+
+        :return: key, None if the task can't be merged with others
+        :rtype: tuple
+        """
+        return None
+
     def succeed(self):
         """Set task status as succeeded and try to schedule downstream tasks."""
+        if self.end_time is None:
+            self.end_time = time.time()
         self.status = _status_succeeded
         for t in self.downstream:
             t.try_to_schedule()
@@ -117,6 +278,8 @@ class Task(object):
         """Set task status as failed and does the same recursively downstream."""
         if self.status == _status_failed:
             return
+        if self.start_time is not None and self.end_time is None:
+            self.end_time = time.time()
         self.status = _status_failed
         for t in self.downstream:
             t.fail()
@@ -162,6 +325,108 @@ class Task(object):
         """
         raise NotImplementedError
 
+    def set_inputs(self, paths: List[str]):
+        """Declare the files this task reads.
+
+        :param paths: paths of the input files
+        :type paths: List[str]
+        """
+        self.inputs = list(paths)
+        return
+
+    def set_outputs(self, paths: List[str]):
+        """Declare the files this task writes.
+
+        Only tasks with declared outputs can be skipped by an incremental run.
+
+        :param paths: paths of the output files
+        :type paths: List[str]
+        """
+        self.outputs = list(paths)
+        return
+
+    def get_inputs(self) -> List[str]:
+        """Get the files this task reads.
+
+        :return: paths of the input files
+        :rtype: List[str]
+        """
+        return self.inputs
+
+    def get_outputs(self) -> List[str]:
+        """Get the files this task writes.
+
+        :return: paths of the output files
+        :rtype: List[str]
+        """
+        return self.outputs
+
+    def is_up_to_date(self, mtimes: Dict[str, float]) -> bool:
+        """Check if this task outputs are newer than its inputs.
+
+        :param mtimes: modification time of every declared file, None for missing files
+        :type mtimes: Dict[str, float]
+        :return: whether there are outputs, all of them exist and none is older than an input
+        :rtype: bool
+        """
+        if not self.outputs:
+            return False
+        outputs = [mtimes[p] for p in self.outputs]
+        inputs = [mtimes[p] for p in self.inputs]
+        if None in outputs or None in inputs:
+            return False
+        return not inputs or min(outputs) >= max(inputs)
+
+    def reset(self):
+        """Forget the outcome of the last run, so that the task runs again on the next one.
+
+        Only this task is reset: the DAG resets the tasks depending on it\
+            too (see ``DAG.reset``).
+        """
+        self.status = _status_waiting
+        self.host = None
+        self.cpuset = None
+        self.scheduled_time = None
+        self.start_time = None
+        self.end_time = None
+        self.skipped = False
+        self.timed_out = False
+        self.retry_at = None
+        self.attempts = []
+        self.resources = {}
+        return
+
+    def skip(self):
+        """Set task status as succeeded without running it."""
+        self.skipped = True
+        self.status = _status_succeeded
+        return
+
+    def get_resources(self) -> Dict[str, float]:
+        """Get the resources used by this task.
+
+        Filled in by the task types that can measure them, once the task\
+            finished (sampled while running for DockerTasks). Keys depend on\
+            the task type: ``user_time`` and ``system_time`` (CPU seconds),\
+            ``cpu_time`` (CPU seconds, when not split), ``max_rss`` and\
+            ``max_memory`` (peak memory in bytes), ``read_bytes`` and\
+            ``write_bytes`` (block I/O in bytes).
+
+        :return: resource usage, empty if unknown
+        :rtype: Dict[str, float]
+        """
+        return self.resources
+
+    def get_duration(self) -> float:
+        """Get how long this task ran.
+
+        :return: seconds between the task start and end, None if it didn't run or is still running
+        :rtype: float
+        """
+        if self.start_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
     def get_upstream(self) -> List[Task]:
         """Get the list of upstream tasks.
 
@@ -1,5 +1,15 @@
+import asyncio
+import contextlib
+import contextvars
+import inspect
+import os
+import resource
 import sys
 import threading
+from typing import Any, Callable, Dict, Iterable, List
+
+# Redirection of the current asyncio task, which shares its thread with the other tasks of the loop
+_context_redirection = contextvars.ContextVar('redirection', default=None)
 
 
 class SysRedirect(object):
@@ -15,9 +25,23 @@ class SysRedirect(object):
             sys.stdout.redirections[ident].close()
         sys.stdout.redirections[ident] = f
 
+    @classmethod
+    def unregister(cls):
+        """Stop redirecting the current thread, leaving its file open for a thread that gets reused."""
+        sys.stdout.redirections.pop(threading.get_ident(), None)
+
+    @classmethod
+    def register_context(cls, f):
+        """Redirect the current context only, e.g. an asyncio task."""
+        cls.install()
+        _context_redirection.set(f)
+
     def write(self, message):
         ident = threading.currentThread().ident
-        if ident in self.redirections:
+        f = _context_redirection.get()
+        if f is not None:
+            f.write(message)
+        elif ident in self.redirections:
             self.redirections[ident].write(message)
         else:
             self.stdout.write(message)
@@ -29,3 +53,99 @@ class SysRedirect(object):
     def install(cls):
         if type(sys.stdout) != cls:
             sys.stdout = cls()
+
+
+def call_target(target: Callable, kwargs: dict) -> Any:
+    """Call a target, running it to completion in a new event loop if it is a coroutine function.
+
+    :param target: callable or coroutine function
+    :type target: Callable
+    :param kwargs: keyword arguments for the target
+    :type kwargs: dict
+    :return: target return value
+    :rtype: Any
+    """
+    if inspect.iscoroutinefunction(target):
+        return asyncio.run(target(**kwargs))
+    return target(**kwargs)
+
+
+def get_mtimes(paths: Iterable[str]) -> Dict[str, float]:
+    """Get the modification time of many files in a single pass.
+
+    Every distinct path is stat'ed once.
+
+    :param paths: paths of the files
+    :type paths: Iterable[str]
+    :return: modification time of each path, None for missing files
+    :rtype: Dict[str, float]
+    """
+    mtimes = {}
+    for path in paths:
+        if path in mtimes:
+            continue
+        try:
+            mtimes[path] = os.stat(path).st_mtime
+        except FileNotFoundError:
+            mtimes[path] = None
+    return mtimes
+
+
+def set_affinity(pid: int, cpus: List[int]):
+    """Restrict a process to some CPUs.
+
+    Only the main thread of a running process is moved: threads it\
+        started already keep running anywhere.
+
+    :param pid: process ID, 0 for the calling thread
+    :type pid: int
+    :param cpus: CPUs to run on
+    :type cpus: List[int]
+    """
+    try:
+        os.sched_setaffinity(pid, cpus)
+    except ProcessLookupError:
+        # Exited already
+        pass
+    return
+
+
+@contextlib.contextmanager
+def pinned(cpus: List[int]):
+    """Restrict the calling thread to some CPUs for the duration of the block.
+
+    Processes started in the block inherit the restriction from the start,\
+        as the affinity mask goes through fork, vfork and posix_spawn. The\
+        previous mask is restored on exit.
+
+    :param cpus: CPUs to run on, None to leave the affinity alone
+    :type cpus: List[int]
+    """
+    if cpus is None:
+        yield
+        return
+    previous = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, cpus)
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, previous)
+
+
+def get_rusage(rusage: resource.struct_rusage) -> Dict[str, float]:
+    """Convert a resource usage structure, as returned by getrusage or wait4.
+
+    :param rusage: resource usage
+    :type rusage: resource.struct_rusage
+    :return: dictionary with ``user_time`` and ``system_time`` (seconds),\
+        ``max_rss``, ``read_bytes`` and ``write_bytes`` (bytes) keys
+    :rtype: Dict[str, float]
+    """
+    return {
+        'user_time': rusage.ru_utime,
+        'system_time': rusage.ru_stime,
+        # Linux reports kilobytes, and block I/O in 512 byte units
+        'max_rss': rusage.ru_maxrss * 1024,
+        'read_bytes': rusage.ru_inblock * 512,
+        'write_bytes': rusage.ru_oublock * 512,
+    }
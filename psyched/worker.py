@@ -0,0 +1,429 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import pickle
+import selectors
+import signal
+import socket
+import socketserver
+import struct
+import subprocess
+import threading
+from typing import Callable, List, Tuple, Union
+
+from .shared import SharedResult
+from .task.python_task import _discard_outcome, _start_process
+
+Address = Union[str, Tuple[str, int]]
+
+_header = struct.Struct('!I')
+_kill_timeout = 5.0
+
+
+def _send(sock: socket.socket, message: dict):
+    data = pickle.dumps(message)
+    sock.sendall(_header.pack(len(data)) + data)
+    return
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        data += chunk
+    return bytes(data)
+
+
+def _recv(sock: socket.socket) -> dict:
+    size, = _header.unpack(_recv_exactly(sock, _header.size))
+    return pickle.loads(_recv_exactly(sock, size))
+
+
+def _connect(address: Address) -> socket.socket:
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class _AgentHandler(socketserver.BaseRequestHandler):
+    """Serve a single request sent to a WorkerAgent."""
+
+    def handle(self):
+        agent = self.server.agent
+        request = _recv(self.request)
+        op = request['op']
+        if op == 'info':
+            _send(self.request, agent.get_info())
+            return
+        if not agent.acquire():
+            _send(self.request, {'log': b'worker has no free slots\n'})
+            _send(self.request, {'exit': -1})
+            return
+        try:
+            if op == 'shell':
+                exit_code = self.run_shell(request['command'])
+            elif op == 'python':
+                exit_code = self.run_python(request['target'], request['kwargs'])
+            else:
+                _send(self.request, {'log': f"unknown operation '{op}'\n".encode('utf-8')})
+                exit_code = -1
+        finally:
+            agent.release()
+        try:
+            _send(self.request, {'exit': exit_code})
+        except OSError:
+            # The DAG closed the connection, see RemoteProcess.kill
+            pass
+        return
+
+    def run_shell(self, command: List[str]) -> int:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True)
+        fd = process.stdout.fileno()
+        selector = selectors.DefaultSelector()
+        selector.register(fd, selectors.EVENT_READ)
+        selector.register(self.request, selectors.EVENT_READ)
+        try:
+            while True:
+                keys = [key.fileobj for key, _ in selector.select()]
+                if self.request in keys:
+                    # The DAG never sends anything else: the connection was closed to kill the command
+                    self.kill_group(process)
+                    break
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                _send(self.request, {'log': chunk})
+        except OSError:
+            self.kill_group(process)
+        finally:
+            selector.close()
+            process.stdout.close()
+        return process.wait()
+
+    def kill_group(self, process: subprocess.Popen):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        return
+
+    def run_python(self, target: Callable, kwargs: dict) -> int:
+        """Call the target in a child process, so that it runs in parallel with the others and can be killed."""
+        conn, child_conn = multiprocessing.Pipe(duplex=False)
+        child = _start_process((target, kwargs, child_conn))
+        child_conn.close()
+        selector = selectors.DefaultSelector()
+        selector.register(conn, selectors.EVENT_READ)
+        selector.register(self.request, selectors.EVENT_READ)
+        message = None
+        try:
+            keys = [key.fileobj for key, _ in selector.select()]
+            if self.request in keys:
+                # The connection was closed to kill the target
+                child.kill()
+                child.join()
+                _discard_outcome(conn)
+                return -1
+            message = conn.recv()
+        except EOFError:
+            pass
+        finally:
+            selector.close()
+            conn.close()
+        child.join()
+        if message is None:
+            _send(self.request, {'log': f'process exited with code {child.exitcode}\n'.encode('utf-8')})
+            return 1
+        error, logs, data, segments, _, _ = message
+        if logs:
+            _send(self.request, {'log': logs.encode('utf-8')})
+        if error is not None:
+            return 1
+        result = SharedResult(data, segments)
+        try:
+            _send(self.request, {'result': result.value})
+        finally:
+            result.release()
+        return 0
+
+
+class WorkerAgent(object):
+    """Agent process executing commands and python targets for remote DAGs.
+
+    Each python target runs in a child process, like with the ``process``\
+        executor of PythonTask, so that targets run on separate CPUs and can\
+        be killed. Requests are pickled, so agents must only be reachable\
+        from trusted hosts.
+    """
+
+    def __init__(self, address: Address, slots: int = None, resources: dict = None):
+        """Class constructor.
+
+        :param address: either a ``(host, port)`` tuple to listen on TCP or a path to listen on a Unix socket
+        :type address: Union[str, Tuple[str, int]]
+        :param slots: maximum number of tasks to run simultaneously, defaults to the number of CPUs
+        :type slots: int, optional
+        :param resources: free-form description of the resources of this worker\
+            advertised to DAGs, defaults to the number of CPUs
+        :type resources: dict, optional
+        """
+        if slots is None:
+            slots = os.cpu_count()
+        if resources is None:
+            resources = {'cpus': os.cpu_count()}
+        self.address = address
+        self.slots = slots
+        self.resources = resources
+        self.running = 0
+        self.lock = threading.Lock()
+        if isinstance(address, str):
+            self.server = socketserver.ThreadingUnixStreamServer(address, _AgentHandler)
+        else:
+            self.server = socketserver.ThreadingTCPServer(address, _AgentHandler)
+        self.server.daemon_threads = True
+        self.server.agent = self
+        return
+
+    def get_info(self) -> dict:
+        """Get the slots and resources advertised by this agent.
+
+        :return: dictionary with ``slots``, ``running`` and ``resources`` keys
+        :rtype: dict
+        """
+        return {'slots': self.slots, 'running': self.running, 'resources': self.resources}
+
+    def acquire(self) -> bool:
+        """Reserve a slot for a new task.
+
+        :return: whether there was a free slot
+        :rtype: bool
+        """
+        with self.lock:
+            if self.running >= self.slots:
+                return False
+            self.running += 1
+            return True
+
+    def release(self):
+        """Free a slot previously reserved with acquire."""
+        with self.lock:
+            self.running -= 1
+        return
+
+    def serve_forever(self):
+        """Handle requests until shutdown is called."""
+        self.server.serve_forever()
+        return
+
+    def shutdown(self):
+        """Stop serving requests and close the listening socket."""
+        self.server.shutdown()
+        self.server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        return
+
+
+class RemoteProcess(object):
+    """Handle to a command or python target running on a worker agent.
+
+    Mimics the parts of ``subprocess.Popen`` used by tasks.
+    """
+
+    def __init__(self, address: Address, request: dict):
+        """Class constructor.
+
+        Sends the request and starts collecting the streamed logs in the background.
+
+        :param address: address of the worker agent
+        :type address: Union[str, Tuple[str, int]]
+        :param request: request to send to the agent
+        :type request: dict
+        """
+        self.returncode = None
+        self.result = None
+        self.logs = bytearray()
+        self.sock = _connect(address)
+        _send(self.sock, request)
+        self.thread = threading.Thread(target=self._collect, daemon=True)
+        self.thread.start()
+        return
+
+    def _collect(self):
+        exit_code = -1
+        try:
+            while True:
+                message = _recv(self.sock)
+                if 'exit' in message:
+                    exit_code = message['exit']
+                    break
+                if 'result' in message:
+                    self.result = message['result']
+                    continue
+                self.logs += message['log']
+        except (ConnectionError, OSError) as e:
+            self.logs += f'lost connection to worker: {e}\n'.encode('utf-8')
+        finally:
+            self.sock.close()
+        self.returncode = exit_code
+        return
+
+    def poll(self) -> int:
+        """Check if the remote work finished.
+
+        :return: exit status, or None if still running
+        :rtype: int
+        """
+        if self.thread.is_alive():
+            return None
+        return self.returncode
+
+    def wait(self) -> int:
+        """Block until the remote work finished.
+
+        :return: exit status
+        :rtype: int
+        """
+        self.thread.join()
+        return self.returncode
+
+    def kill(self):
+        """Ask the agent to kill the remote work by closing the connection.
+
+        Waits for the agent to confirm, so that its slot is free once this\
+            returns, unless it doesn't within a few seconds.
+        """
+        try:
+            self.sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        self.thread.join(_kill_timeout)
+        if self.thread.is_alive():
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.thread.join()
+        return
+
+    def get_logs(self) -> str:
+        """Get the logs streamed back so far.
+
+        :return: remote stdout and stderr
+        :rtype: str
+        """
+        return bytes(self.logs).decode('utf-8')
+
+
+class RemoteWorker(object):
+    """Class representing a worker agent tasks can be placed on."""
+
+    def __init__(self, address: Address, capacity: int = None):
+        """Class constructor.
+
+        :param address: either a ``(host, port)`` tuple or a Unix socket path the agent listens on
+        :type address: Union[str, Tuple[str, int]]
+        :param capacity: maximum number of tasks to place on this worker, defaults to the slots the agent advertises
+        :type capacity: int, optional
+        """
+        self.address = address
+        self.resources = {}
+        if capacity is None:
+            info = self.get_info()
+            capacity = info['slots']
+            self.resources = info['resources']
+        self.capacity = capacity
+        self.running = 0
+        return
+
+    def get_info(self) -> dict:
+        """Query the agent for its advertised slots and resources.
+
+        :return: dictionary with ``slots``, ``running`` and ``resources`` keys
+        :rtype: dict
+        """
+        sock = _connect(self.address)
+        try:
+            _send(sock, {'op': 'info'})
+            return _recv(sock)
+        finally:
+            sock.close()
+
+    def free_slots(self) -> int:
+        """Get the number of tasks that can still be placed on this worker.
+
+        :return: capacity minus the number of running tasks
+        :rtype: int
+        """
+        return self.capacity - self.running
+
+    def acquire(self):
+        """Reserve a slot on this worker for a new task."""
+        assert self.running < self.capacity
+        self.running += 1
+        return
+
+    def release(self):
+        """Free a slot previously reserved with acquire."""
+        assert self.running > 0
+        self.running -= 1
+        return
+
+    def run_shell(self, command: List[str]) -> RemoteProcess:
+        """Run a command on the worker.
+
+        :param command: command to run
+        :type command: List[str]
+        :return: handle to the remote command
+        :rtype: RemoteProcess
+        """
+        return RemoteProcess(self.address, {'op': 'shell', 'command': command})
+
+    def run_python(self, target: Callable, kwargs: dict) -> RemoteProcess:
+        """Call a picklable python target on the worker.
+
+        :param target: callable to run
+        :type target: Callable
+        :param kwargs: keyword arguments for the target
+        :type kwargs: dict
+        :return: handle to the remote call
+        :rtype: RemoteProcess
+        """
+        return RemoteProcess(self.address, {'op': 'python', 'target': target, 'kwargs': kwargs})
+
+    def __str__(self) -> str:
+        return f'RemoteWorker<{self.address}> ({self.running}/{self.capacity})'
+
+
+def main(argv: List[str] = None):
+    """Start a worker agent from the command line."""
+    parser = argparse.ArgumentParser(description="Run a psyched worker agent.")
+    parser.add_argument('address', help="HOST:PORT to listen on TCP or a path to listen on a Unix socket")
+    parser.add_argument('--slots', type=int, default=None, help="maximum number of simultaneous tasks")
+    args = parser.parse_args(argv)
+    address = args.address
+    if ':' in address and not address.startswith('/'):
+        host, port = address.rsplit(':', 1)
+        address = (host, int(port))
+    agent = WorkerAgent(address, slots=args.slots)
+    try:
+        agent.serve_forever()
+    except KeyboardInterrupt:
+        agent.shutdown()
+    return
+
+
+if __name__ == '__main__':
+    main()
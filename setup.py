@@ -12,6 +12,12 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/joacoib/psyched",
     packages=setuptools.find_packages(),
+    extras_require={
+        'yaml': ['PyYAML'],
+    },
+    entry_points={
+        'console_scripts': ['psyched=psyched.cli:main'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "Development Status :: 2 - Pre-Alpha",
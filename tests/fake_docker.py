@@ -0,0 +1,58 @@
+import docker
+
+
+class FakeContainer(object):
+    """Container stand-in that exits immediately with a fixed status code."""
+
+    def __init__(self, command, status_code=0):
+        self.command = command
+        self.status_code = status_code
+        self.status = 'exited'
+
+    def reload(self):
+        pass
+
+    def wait(self):
+        return {'Error': None, 'StatusCode': self.status_code}
+
+    def logs(self):
+        return b''
+
+    def stats(self, decode=False):
+        return iter([{'memory_stats': {'usage': 1 << 20}, 'cpu_stats': {'cpu_usage': {'total_usage': 5 * 10 ** 8}}}])
+
+
+class FakeContainers(object):
+    def __init__(self):
+        self.started = []
+
+    def run(self, image, command, **kwargs):
+        container = FakeContainer(command, status_code=0 if command == 'true' else 1)
+        self.started.append((image, command))
+        return container
+
+
+class FakeImages(object):
+    def __init__(self):
+        self.available = set()
+        self.pulls = []
+
+    def get(self, reference):
+        if reference not in self.available:
+            raise docker.errors.ImageNotFound(reference)
+        return reference
+
+    def pull(self, name, tag=None):
+        self.pulls.append(f'{name}:{tag}')
+        self.available.add(f'{name}:{tag}')
+
+
+class FakeClient(object):
+    """Minimal docker.DockerClient replacement acting as a local fake daemon."""
+
+    def __init__(self):
+        self.containers = FakeContainers()
+        self.images = FakeImages()
+
+    def close(self):
+        pass
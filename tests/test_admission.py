@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+from psyched.admission import AdmissionController
+from psyched.dag import DAG
+from psyched.task import _status_succeeded
+
+
+def write_proc(proc, cpu_pressure=0.0, memory_pressure=0.0, load=0.0, available=4000000):
+    os.makedirs(os.path.join(proc, 'pressure'), exist_ok=True)
+    for name, pressure in [('cpu', cpu_pressure), ('memory', memory_pressure)]:
+        with open(os.path.join(proc, 'pressure', name), 'w') as f:
+            f.write(f'some avg10={pressure:.2f} avg60=0.00 avg300=0.00 total=0\n')
+            f.write('full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n')
+    with open(os.path.join(proc, 'loadavg'), 'w') as f:
+        f.write(f'{load:.2f} 0.00 0.00 1/100 1000\n')
+    with open(os.path.join(proc, 'meminfo'), 'w') as f:
+        f.write(f'MemTotal:        8000000 kB\nMemFree:         1000000 kB\nMemAvailable:    {available} kB\n')
+
+
+class TestAdmissionController(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.proc = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_read(self):
+        write_proc(self.proc, cpu_pressure=12.5, load=2.0, available=2000000)
+        controller = AdmissionController(proc=self.proc)
+        controller.cpus = 4
+        self.assertEqual(
+            controller.read(),
+            {'cpu_pressure': 12.5, 'memory_pressure': 0.0, 'load': 0.5, 'available_memory': 0.25}
+        )
+
+    def test_missing_files(self):
+        controller = AdmissionController(proc=os.path.join(self.proc, 'missing'))
+        readings = controller.read()
+        self.assertEqual(set(readings.values()), {None})
+        self.assertFalse(controller.is_overloaded(readings))
+
+    def test_is_overloaded(self):
+        controller = AdmissionController(max_load=1.0, proc=self.proc)
+        base = {'cpu_pressure': 0.0, 'memory_pressure': 0.0, 'load': 0.5, 'available_memory': 0.5}
+        self.assertFalse(controller.is_overloaded(base))
+        for key, value in [('cpu_pressure', 60.0), ('memory_pressure', 20.0), ('load', 1.5),
+                           ('available_memory', 0.05)]:
+            self.assertTrue(controller.is_overloaded(dict(base, **{key: value})))
+
+    def test_get_limit(self):
+        write_proc(self.proc, cpu_pressure=80.0)
+        controller = AdmissionController(interval=5.0, proc=self.proc)
+        # Throttled down from what runs, then held for an interval
+        self.assertEqual(controller.get_limit(8, 8, now=0.0), 4)
+        self.assertEqual(controller.get_limit(8, 8, now=1.0), 4)
+        self.assertEqual(controller.get_limit(8, 8, now=5.0), 2)
+        self.assertEqual(controller.get_limit(8, 8, now=10.0), 1)
+        self.assertEqual(controller.get_limit(8, 8, now=15.0), 1)
+
+        # Resumed one task at a time once the pressure is gone
+        write_proc(self.proc, cpu_pressure=5.0)
+        self.assertEqual(controller.get_limit(1, 8, now=20.0), 2)
+        self.assertEqual(controller.get_limit(2, 8, now=25.0), 3)
+        self.assertEqual(controller.get_limit(2, 3, now=30.0), 3)
+
+    def test_dag_run(self):
+        write_proc(self.proc, memory_pressure=50.0)
+        dag = DAG(max_parallel_workers=4, poll_interval=0.05)
+        tasks = [dag.new_task(f"test_task_{i}", task_type='shell', command=["sleep", "0.3"]) for i in range(4)]
+
+        dag.run(admission=AdmissionController(proc=self.proc))
+
+        self.assertEqual([t.status for t in tasks], [_status_succeeded] * 4)
+        spans = sorted((t.start_time, t.end_time) for t in tasks)
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            self.assertGreaterEqual(start, end)
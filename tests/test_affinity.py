@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from psyched.affinity import CpuAllocator, _parse_cpulist
+from psyched.dag import DAG
+from psyched.launcher import Launcher
+from psyched.task import _status_succeeded
+
+
+def get_affinity():
+    return sorted(os.sched_getaffinity(0))
+
+
+def write_sys(sys, nodes):
+    for node, cpulist in nodes.items():
+        os.makedirs(os.path.join(sys, 'devices', 'system', 'node', f'node{node}'))
+        with open(os.path.join(sys, 'devices', 'system', 'node', f'node{node}', 'cpulist'), 'w') as f:
+            f.write(cpulist + '\n')
+
+
+class TestCpuAllocator(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.sys = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_parse_cpulist(self):
+        self.assertEqual(_parse_cpulist('0-3,8,10-11\n'), [0, 1, 2, 3, 8, 10, 11])
+        self.assertEqual(_parse_cpulist('\n'), [])
+
+    def test_nodes(self):
+        write_sys(self.sys, {0: '0-3', 1: '4-7'})
+        allocator = CpuAllocator(cpus=[1, 2, 4, 9], sys=self.sys)
+        self.assertEqual(allocator.nodes, {0: [1, 2], 1: [4], 2: [9]})
+        self.assertEqual(allocator.get_cpu_count(), 4)
+        self.assertEqual(allocator.get_nodes([2, 4]), [0, 1])
+
+        # Without a topology every CPU is on the same node
+        allocator = CpuAllocator(cpus=[0, 1], sys=os.path.join(self.sys, 'missing'))
+        self.assertEqual(allocator.nodes, {0: [0, 1]})
+
+    def test_acquire(self):
+        write_sys(self.sys, {0: '0-3', 1: '4-7'})
+        allocator = CpuAllocator(cpus=range(8), sys=self.sys)
+        self.assertEqual(allocator.acquire(2), [0, 1])
+        # Packed on the fullest node that fits
+        self.assertEqual(allocator.acquire(3), [4, 5, 6])
+        self.assertEqual(allocator.acquire(2), [2, 3])
+        self.assertIsNone(allocator.acquire(2))
+        self.assertEqual(allocator.get_free_count(), 1)
+
+        # Spread over as few nodes as possible when no node fits
+        allocator.release([0, 1])
+        self.assertEqual(allocator.acquire(3), [0, 1, 7])
+        allocator.release(list(range(8)))
+        self.assertEqual(allocator.acquire(16), list(range(8)))
+
+    def test_dag_run(self):
+        cpu = get_affinity()[0]
+        dag = DAG(max_parallel_workers=2, poll_interval=0.05)
+        t1 = dag.new_task("test_task_1", task_type='shell',
+                          command=['grep', 'Cpus_allowed_list', '/proc/self/status'])
+        t2 = dag.new_task("test_task_2", task_type='python', target=get_affinity)
+        t2.set_executor('process')
+        allocator = CpuAllocator(cpus=[cpu], sys=self.sys)
+
+        dag.run(affinity=allocator)
+
+        self.assertEqual([t1.status, t2.status], [_status_succeeded] * 2)
+        self.assertEqual(t1.get_logs().split(), ['Cpus_allowed_list:', str(cpu)])
+        self.assertEqual(t2.get_result(), [cpu])
+        # Both needed the only CPU
+        self.assertGreaterEqual(max(t1.start_time, t2.start_time), min(t1.end_time, t2.end_time))
+        self.assertEqual(allocator.get_free_count(), 1)
+        self.assertIsNone(t1.cpuset)
+
+    def test_launcher_spawn(self):
+        cpu = get_affinity()[-1]
+        launcher = Launcher()
+        self.addCleanup(launcher.close)
+        process = launcher.spawn(['grep', 'Cpus_allowed_list', '/proc/self/status'], cpus=[cpu])
+        self.assertEqual(process.wait(), 0)
+        with process.stdout:
+            self.assertEqual(process.stdout.read().split(), [b'Cpus_allowed_list:', str(cpu).encode()])
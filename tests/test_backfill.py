@@ -0,0 +1,68 @@
+import unittest
+
+from psyched.backfill import Backfill
+from psyched.dag import DAG
+from psyched.task import _status_failed, _status_succeeded, _status_waiting
+
+
+def max_overlap(tasks):
+    events = sorted([(t.start_time, 1) for t in tasks] + [(t.end_time, -1) for t in tasks])
+    current = peak = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+class TestBackfill(unittest.TestCase):
+    def test_run(self):
+        def template(day):
+            dag = DAG()
+            extract = dag.new_task('extract', task_type='shell', command=['echo', str(day)])
+            load = dag.new_task('load', task_type='shell', command='true' if day != 2 else 'false')
+            extract >> load
+            return dag
+
+        backfill = Backfill(template, [3, 1, 2], max_parallel_workers=2, poll_interval=0.05)
+        self.assertEqual(backfill.get_params(), [1, 2, 3])
+        self.assertEqual(list(backfill.tasks)[:2], ['1/extract', '1/load'])
+        self.assertEqual(backfill.get_run_status(1), _status_waiting)
+
+        backfill.run()
+
+        self.assertEqual(backfill.get_statuses(), {1: _status_succeeded, 2: _status_failed, 3: _status_succeeded})
+        self.assertEqual(backfill.tasks['3/extract'].get_logs(), '3\n')
+        self.assertEqual([t.get_name() for t in backfill.get_run(2)], ['2/extract', '2/load'])
+
+    def test_priority(self):
+        def template(day):
+            dag = DAG()
+            dag.new_task('sleep', task_type='shell', command=['sleep', '0.1'])
+            return dag
+
+        for newest_first in [False, True]:
+            backfill = Backfill(template, ['2024-01-02', '2024-01-03', '2024-01-01'], poll_interval=0.05,
+                                newest_first=newest_first)
+            backfill.run()
+            order = sorted(backfill.runs, key=lambda d: backfill.get_run(d)[0].start_time)
+            self.assertEqual(order, sorted(order, reverse=newest_first))
+
+    def test_max_parallel_per_run(self):
+        def template(day):
+            dag = DAG()
+            for i in range(3):
+                dag.new_task(f'sleep_{i}', task_type='shell', command=['sleep', '0.3'])
+            return dag
+
+        backfill = Backfill(template, [1, 2], max_parallel_workers=4, max_parallel_per_run=2, poll_interval=0.05)
+        backfill.run()
+
+        self.assertEqual(set(backfill.get_statuses().values()), {_status_succeeded})
+        for day in [1, 2]:
+            self.assertEqual(max_overlap(backfill.get_run(day)), 2)
+        # Both runs share the slots
+        self.assertEqual(max_overlap(list(backfill.tasks.values())), 4)
+
+    def test_duplicate_params(self):
+        with self.assertRaises(ValueError):
+            Backfill(lambda day: DAG(), [1, 1])
@@ -0,0 +1,48 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from psyched.cli import main
+from psyched.spec import dump_spec
+
+
+class TestCLI(unittest.TestCase):
+    def run_spec(self, spec, *args):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'spec.json')
+            dump_spec(spec, path)
+            output = io.StringIO()
+            with redirect_stdout(output):
+                code = main(['run', path, '--poll-interval', '0.1'] + list(args))
+        return code, output.getvalue()
+
+    def test_run(self):
+        spec = {'tasks': [
+            {'name': 'a', 'type': 'shell', 'command': 'true'},
+            {'name': 'b', 'type': 'shell', 'command': 'true', 'upstream': ['a']},
+        ]}
+        code, output = self.run_spec(spec, '--workers', '2')
+        self.assertEqual(code, 0)
+        self.assertEqual(output, "Task<a> (succeeded)\nTask<b> (succeeded)\n")
+
+    def test_run_failure(self):
+        spec = {'tasks': [
+            {'name': 'a', 'type': 'shell', 'command': 'false'},
+            {'name': 'b', 'type': 'shell', 'command': 'true', 'upstream': ['a']},
+        ]}
+        code, output = self.run_spec(spec, '--fail-fast')
+        self.assertEqual(code, 1)
+        self.assertEqual(output, "Task<a> (failed)\nTask<b> (failed)\n")
+
+    def test_run_store(self):
+        spec = {'tasks': [
+            {'name': 'a', 'type': 'shell', 'command': 'false'},
+            {'name': 'b', 'type': 'shell', 'command': 'true', 'upstream': ['a']},
+            {'name': 'c', 'type': 'shell', 'command': 'true'},
+        ]}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            code, output = self.run_spec(spec, '--store', os.path.join(tmpdir, 'store.db'))
+        self.assertEqual(code, 1)
+        self.assertEqual(output, "Task<a> (failed)\nTask<b> (failed)\nfailed: 2, succeeded: 1\n")
@@ -1,10 +1,17 @@
+import os
+import tempfile
+import threading
+import time
 import unittest
 
 from psyched.dag import DAG
+from psyched.host import DockerHost
 from psyched.image import Image
-from psyched.task import (DockerTask, PythonTask, _status_failed,
+from psyched.task import (DockerTask, PythonTask, ShellTask, _status_failed,
                           _status_succeeded)
 
+from .fake_docker import FakeClient
+
 
 class TestDAGMethods(unittest.TestCase):
     def setUp(self):
@@ -74,3 +81,268 @@ class TestDAGMethods(unittest.TestCase):
 
         for t in [t3, t4]:
             self.assertEqual(t.status, _status_failed)
+
+    def test_run_docker_hosts(self):
+        h1 = DockerHost(capacity=2, client=FakeClient())
+        h2 = DockerHost(capacity=1, client=FakeClient())
+        self.dag.add_docker_host(h1)
+        self.dag.add_docker_host(h2)
+
+        tasks = [
+            self.dag.new_task(f"test_task_{i}",  task_type='docker',  image=self.image, command="true")
+            for i in range(3)
+        ]
+
+        self.dag.run()
+
+        for t in tasks:
+            self.assertEqual(t.status, _status_succeeded)
+        self.assertEqual([t.host for t in tasks], [h1, h1, h2])
+        self.assertEqual(len(h1.client.containers.started), 2)
+        self.assertEqual(len(h2.client.containers.started), 1)
+        self.assertEqual(h1.client.images.pulls, ['amd64/ubuntu:20.04'])
+        self.assertEqual(h2.client.images.pulls, ['amd64/ubuntu:20.04'])
+        self.assertEqual(h1.running + h2.running, 0)
+        self.assertEqual(tasks[0].get_resources(), {'max_memory': 1 << 20, 'cpu_time': 0.5})
+
+    def test_run_stream(self):
+        t1 = self.dag.new_task("test_task_1",  task_type='shell', command=["seq", "100000"])
+        t2 = self.dag.new_task("test_task_2",  task_type='shell', command=["grep", "-c", "7"])
+        t3 = self.dag.new_task("test_task_3",  task_type='shell', command="true")
+
+        (t1 | t2) >> t3
+
+        self.dag.run()
+
+        for t in [t1, t2, t3]:
+            self.assertEqual(t.status, _status_succeeded)
+        self.assertEqual(t2.get_logs(), "40951\n")
+        self.assertEqual(self.dag.running, 0)
+
+    def test_run_stream_slots(self):
+        self.dag = DAG(max_parallel_workers=2, poll_interval=0.05)
+        t1 = self.dag.new_task("test_task_1",  task_type='shell', command=["sleep", "0.5"])
+        t2 = self.dag.new_task("test_task_2",  task_type='shell', command=["seq", "10"])
+        t3 = self.dag.new_task("test_task_3",  task_type='shell', command=["wc", "-l"])
+
+        t2 | t3
+
+        self.dag.run()
+
+        # The pipeline needs both slots
+        self.assertGreaterEqual(t2.start_time, t1.end_time)
+        self.assertEqual(t3.get_logs().strip(), "10")
+        self.assertEqual(self.dag.running, 0)
+
+    def test_topological_order(self):
+        t1 = self.dag.new_task("test_task_1",  task_type='shell', command="true")
+        t2 = self.dag.new_task("test_task_2",  task_type='shell', command="true")
+        t3 = self.dag.new_task("test_task_3",  task_type='shell', command="true")
+
+        t3 >> t1 >> t2
+
+        self.assertEqual(self.dag.get_topological_order(), [t3, t1, t2])
+
+    def test_run_incremental(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            src, mid, out = (os.path.join(tmpdir, f) for f in ["src", "mid", "out"])
+            for path, mtime in [(src, 100), (mid, 200), (out, 50)]:
+                open(path, "w").close()
+                os.utime(path, (mtime, mtime))
+
+            t1 = self.dag.new_task("test_task_1",  task_type='shell', command=["cp", src, mid])
+            t2 = self.dag.new_task("test_task_2",  task_type='shell', command=["cp", mid, out])
+            t3 = self.dag.new_task("test_task_3",  task_type='shell', command="true")
+            t1.set_inputs([src])
+            t1.set_outputs([mid])
+            t2.set_inputs([mid])
+            t2.set_outputs([out])
+
+            t1 >> [t2, t3]
+
+            self.dag.run(incremental=True)
+
+            self.assertTrue(t1.skipped)
+            self.assertFalse(t2.skipped)
+            self.assertFalse(t3.skipped)
+            for t in [t1, t2, t3]:
+                self.assertEqual(t.status, _status_succeeded)
+            self.assertEqual(t1.get_duration(), None)
+            self.assertGreater(os.stat(out).st_mtime, 200)
+
+    def test_run_incremental_stream(self):
+        self.dag = DAG(poll_interval=0.05)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            src, mid, out = (os.path.join(tmpdir, f) for f in ["src", "mid", "out"])
+            for path, mtime in [(src, 100), (mid, 200), (out, 300)]:
+                open(path, "w").close()
+                os.utime(path, (mtime, mtime))
+
+            t1 = self.dag.new_task("test_task_1",  task_type='shell', command=["cat", src])
+            t2 = self.dag.new_task("test_task_2",  task_type='shell', command=["cat"])
+            t3 = self.dag.new_task("test_task_3",  task_type='shell', command="true")
+            t1.set_inputs([src])
+            t1.set_outputs([mid])
+            t2.set_inputs([mid])
+            t2.set_outputs([out])
+
+            t1 | t2
+            t3 >> t2
+
+            self.dag.run(incremental=True)
+
+            # t3 runs, so the pipeline can't be skipped in part
+            self.assertEqual([t.skipped for t in [t1, t2, t3]], [False] * 3)
+            for t in [t1, t2, t3]:
+                self.assertEqual(t.status, _status_succeeded)
+
+    def test_run_task_timeout(self):
+        self.dag = DAG(max_parallel_workers=1)
+        t1 = self.dag.new_task("test_task_1",  task_type='shell', command=["sh", "-c", "sleep 60 & wait"])
+        t2 = self.dag.new_task("test_task_2",  task_type='shell', command="true")
+        t3 = self.dag.new_task("test_task_3",  task_type='shell', command="true")
+        t1.set_timeout(1)
+
+        t1 >> t2
+
+        start = time.time()
+        self.dag.run()
+
+        self.assertLess(time.time() - start, 30)
+        self.assertEqual(t1.status, _status_failed)
+        self.assertTrue(t1.timed_out)
+        self.assertEqual(t2.status, _status_failed)
+        self.assertEqual(t3.status, _status_succeeded)
+        self.assertEqual(self.dag.running, 0)
+
+    def test_run_timeout(self):
+        t1 = self.dag.new_task("test_task_1",  task_type='python', target=time.sleep, secs=60)
+        t1.set_executor('process')
+        t2 = self.dag.new_task("test_task_2",  task_type='shell', command="true")
+
+        t1 >> t2
+
+        start = time.time()
+        self.dag.run(timeout=3)
+
+        self.assertLess(time.time() - start, 30)
+        self.assertFalse(t1.child.is_alive())
+        for t in [t1, t2]:
+            self.assertEqual(t.status, _status_failed)
+        self.assertEqual(self.dag.running, 0)
+
+    def test_cancel(self):
+        # Ticks well apart from the cancellation, so that t1 has surely started
+        self.dag = DAG(poll_interval=0.05)
+        t1 = self.dag.new_task("test_task_1",  task_type='shell', command=["sleep", "60"])
+        t2 = self.dag.new_task("test_task_2",  task_type='shell', command="true")
+
+        threading.Timer(1, self.dag.cancel).start()
+        start = time.time()
+        self.dag.run()
+
+        # Returns within a second of the cancellation
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(t1.process.returncode, -9)
+        for t in [t1, t2]:
+            self.assertEqual(t.status, _status_failed)
+        self.assertEqual(self.dag.running, 0)
+
+    def test_set_group(self):
+        self.dag = DAG(max_parallel_workers=4, poll_interval=0.05)
+        t1 = self.dag.new_task("test_task_1", task_type='python', target=lambda: [0.3] * 3)
+        t2 = self.dag.new_task("test_task_2", task_type='mapped', items_from=t1,
+                               factory=lambda name, item: ShellTask(name, ['sleep', str(item)]))
+        self.dag.set_group([t2], 'sleepers', 1)
+        self.dag.run()
+
+        instances = sorted(t2.instances, key=lambda t: t.start_time)
+        self.assertEqual(t2.status, _status_succeeded)
+        for a, b in zip(instances, instances[1:]):
+            self.assertGreaterEqual(b.start_time, a.end_time)
+
+    def test_dedup(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            runs = os.path.join(tmpdir, 'runs')
+            self.dag.poll_interval = 0.05
+            t1 = self.dag.new_task("test_task_1", task_type='shell', command=['sh', '-c', f'echo 1 >> {runs}'])
+            t2 = self.dag.new_task("test_task_2", task_type='shell', command=['sh', '-c', f'echo 1 >> {runs}'])
+            t3 = self.dag.new_task("test_task_3", task_type='shell', command=["echo", "done"])
+            t4 = self.dag.new_task("test_task_4", task_type='shell', command=["echo", "done"])
+            t5 = self.dag.new_task("test_task_5", task_type='shell', command=["echo", "other"])
+            t1 >> t3
+            t2 >> [t4, t5]
+
+            self.assertEqual(self.dag.dedup(), {t2: t1, t4: t3})
+            self.assertEqual(t5.upstream, [t1])
+            self.dag.run()
+
+            with open(runs) as f:
+                self.assertEqual(f.read(), '1\n')
+            for t in [t2, t4, t5]:
+                self.assertEqual(t.status, _status_succeeded)
+            self.assertEqual(t4.get_logs(), 'done\n')
+            self.assertEqual(t4.get_duration(), t3.get_duration())
+
+    def test_reset(self):
+        self.dag.poll_interval = 0.05
+        t1 = self.dag.new_task("test_task_1", task_type='shell', command="true")
+        t2 = self.dag.new_task("test_task_2", task_type='python', target=lambda: 2)
+        t3 = self.dag.new_task("test_task_3", task_type='python', target=lambda value: value * 3)
+        t4 = self.dag.new_task("test_task_4", task_type='shell', command="false")
+        t5 = self.dag.new_task("test_task_5", task_type='shell', command="true")
+        t3.set_result_kwarg("value", t2)
+        t1 >> t3
+        t4 >> t5
+        self.dag.run()
+        self.assertEqual(t3.get_result(), 6)
+        self.assertIsNone(t2.get_result())
+        first_start = t1.start_time
+
+        # The released result of t2 is needed again
+        self.assertEqual(self.dag.reset([t3, t5]), [t2, t3, t5])
+        self.assertEqual(t5.status, _status_failed)
+        self.dag.run()
+        self.assertEqual(t3.get_result(), 6)
+        self.assertEqual(t1.start_time, first_start)
+
+    def test_watch(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for use_inotify in [True, False]:
+                self.dag = DAG(poll_interval=0.05)
+                watched = os.path.join(tmpdir, f'watched_{use_inotify}')
+                counts = os.path.join(tmpdir, f'counts_{use_inotify}')
+                with open(watched, 'w') as f:
+                    f.write('0')
+                t1 = self.dag.new_task("test_task_1", task_type='shell', command=['sh', '-c', f'echo 1 >> {counts}'])
+                t1.set_inputs([watched])
+                t2 = self.dag.new_task("test_task_2", task_type='shell', command=['sh', '-c', f'echo 2 >> {counts}'])
+                t3 = self.dag.new_task("test_task_3", task_type='shell', command=['sh', '-c', f'echo 3 >> {counts}'])
+                t1 >> t2
+
+                def read_counts():
+                    with open(counts) as f:
+                        return sorted(f.read().split())
+
+                def edit():
+                    while not os.path.exists(counts) or len(read_counts()) < 3:
+                        time.sleep(0.05)
+                    # A burst of writes, coalesced into a single run
+                    for i in range(5):
+                        with open(watched, 'w') as f:
+                            f.write(str(i))
+                        os.utime(watched, (i, i))
+                        time.sleep(0.01)
+                    while len(read_counts()) < 5:
+                        time.sleep(0.05)
+                    time.sleep(1)
+                    self.dag.cancel()
+
+                thread = threading.Thread(target=edit)
+                thread.start()
+                self.dag.watch(debounce=0.2, use_inotify=use_inotify)
+                thread.join()
+
+                self.assertEqual(read_counts(), ['1', '1', '2', '2', '3'])
+                for t in [t1, t2, t3]:
+                    self.assertEqual(t.status, _status_succeeded)
@@ -0,0 +1,69 @@
+import time
+import unittest
+
+from psyched.dag import DAG
+from psyched.failure import FailurePolicy
+from psyched.task import MappedTask, ShellTask, _status_failed, _status_succeeded
+
+
+class TestFailurePolicy(unittest.TestCase):
+    def test_failures(self):
+        policy = FailurePolicy()
+        t1 = ShellTask("test_task_1", "false")
+        t2 = ShellTask("test_task_2", "true")
+        t1 >> t2
+        t1.start_time = 0
+        t1.fail()
+        self.assertEqual(policy.get_failures([t1, t2]), [t1])
+        self.assertFalse(policy.should_stop([t1, t2]))
+
+    def test_max_failures(self):
+        policy = FailurePolicy(max_failures=2)
+        tasks = [ShellTask(f"test_task_{i}", "false") for i in range(3)]
+        for t in tasks:
+            t.start_time = 0
+        tasks[0].fail()
+        self.assertFalse(policy.should_stop(tasks))
+        tasks[1].fail()
+        self.assertTrue(policy.should_stop(tasks))
+        self.assertEqual(FailurePolicy.fail_fast().max_failures, 1)
+
+    def test_max_mapped_failure_ratio(self):
+        policy = FailurePolicy(max_mapped_failure_ratio=0.5)
+        mapped = MappedTask("test_task", lambda name, item: ShellTask(name, item), ["unused"])
+        mapped.instances = [ShellTask(f"test_task[{i}]", "false") for i in range(4)]
+        for t in mapped.instances:
+            t.mapped_from = mapped
+            t.start_time = 0
+        mapped.instances[0].fail()
+        self.assertFalse(policy.should_stop(mapped.instances))
+        mapped.instances[1].fail()
+        self.assertTrue(policy.should_stop(mapped.instances))
+
+    def test_dag_fail_fast(self):
+        dag = DAG(max_parallel_workers=2)
+        t1 = dag.new_task("test_task_1", task_type='shell', command="false")
+        t2 = dag.new_task("test_task_2", task_type='shell', command=["sleep", "60"])
+        t3 = dag.new_task("test_task_3", task_type='shell', command="true")
+
+        t2 >> t3
+
+        start = time.time()
+        dag.run(failure_policy=FailurePolicy.fail_fast())
+
+        self.assertLess(time.time() - start, 30)
+        self.assertTrue(dag.cancelled)
+        for t in [t1, t2, t3]:
+            self.assertEqual(t.status, _status_failed)
+        self.assertEqual(dag.running, 0)
+
+    def test_dag_continue(self):
+        dag = DAG(max_parallel_workers=2)
+        t1 = dag.new_task("test_task_1", task_type='shell', command="false")
+        t2 = dag.new_task("test_task_2", task_type='shell', command="true")
+
+        dag.run(failure_policy=FailurePolicy(max_failures=2))
+
+        self.assertFalse(dag.cancelled)
+        self.assertEqual(t1.status, _status_failed)
+        self.assertEqual(t2.status, _status_succeeded)
@@ -0,0 +1,149 @@
+import sys
+import threading
+import time
+import unittest
+
+from psyched.dag import DAG
+from psyched.task import (FusedTask, PythonTask, ShellTask, _status_failed,
+                          _status_running, _status_succeeded)
+
+
+class TestFusedTaskMethods(unittest.TestCase):
+    def test_can_fuse(self):
+        t1 = ShellTask("test_task_1", "true")
+        t2 = ShellTask("test_task_2", "true")
+        t3 = PythonTask("test_task_3", target=print)
+        t1 >> t2 >> t3
+        self.assertTrue(FusedTask.can_fuse(t1, t2))
+        self.assertFalse(FusedTask.can_fuse(t2, t3))
+
+    def test_can_fuse_branch(self):
+        t1 = ShellTask("test_task_1", "true")
+        t2 = ShellTask("test_task_2", "true")
+        t3 = ShellTask("test_task_3", "true")
+        t1 >> [t2, t3]
+        self.assertFalse(FusedTask.can_fuse(t1, t2))
+
+    def test_python_chain(self):
+        def produce():
+            print("producing")
+            return 20
+
+        t1 = PythonTask("test_task_1", target=produce)
+        t2 = PythonTask("test_task_2", target=lambda x: x + 1)
+        t3 = PythonTask("test_task_3", target=lambda x: x * 2)
+        t2.set_result_kwarg("x", t1)
+        t3.set_result_kwarg("x", t2)
+        unit = FusedTask([t1, t2, t3])
+
+        t1.try_to_schedule()
+        self.assertEqual(unit.update_status(runnable=True), 1)
+        unit.wait()
+        self.assertEqual(unit.update_status(), -1)
+
+        for t in [t1, t2, t3]:
+            self.assertEqual(t.status, _status_succeeded)
+            self.assertIsNotNone(t.get_duration())
+        self.assertEqual(t3.get_result(), 42)
+        self.assertEqual(t1.get_logs(), "producing\n")
+        self.assertEqual(t2.get_logs(), "")
+
+    def test_python_chain_fail(self):
+        def explode():
+            raise RuntimeError("boom")
+
+        t1 = PythonTask("test_task_1", target=lambda: None)
+        t2 = PythonTask("test_task_2", target=explode)
+        t3 = PythonTask("test_task_3", target=lambda: None)
+        t1 >> t2 >> t3
+        unit = FusedTask([t1, t2, t3])
+
+        t1.try_to_schedule()
+        unit.update_status(runnable=True)
+        unit.wait()
+        unit.update_status()
+
+        self.assertEqual(t1.status, _status_succeeded)
+        self.assertEqual(t2.status, _status_failed)
+        self.assertEqual(t3.status, _status_failed)
+        self.assertEqual(t3.get_duration(), None)
+        self.assertEqual(unit.status, _status_failed)
+
+    def test_python_chain_pool(self):
+        t1 = PythonTask("test_task_1", target=lambda: print("first") or threading.current_thread().name)
+        t2 = PythonTask("test_task_2", target=lambda: threading.get_ident())
+        t1 >> t2
+        unit = FusedTask([t1, t2])
+
+        t1.try_to_schedule()
+        unit.update_status(runnable=True)
+        unit.wait()
+        unit.update_status()
+
+        self.assertTrue(t1.get_result().startswith('psyched'))
+        self.assertEqual(t1.get_logs(), "first\n")
+        # Nothing is left redirected for the next task on that thread
+        self.assertNotIn(t2.get_result(), sys.stdout.redirections)
+
+    def test_kill_python_chain(self):
+        def spin():
+            while True:
+                time.sleep(0.01)
+
+        t1 = PythonTask("test_task_1", target=spin)
+        t2 = PythonTask("test_task_2", target=lambda: None)
+        t1 >> t2
+        unit = FusedTask([t1, t2])
+
+        t1.try_to_schedule()
+        unit.update_status(runnable=True)
+        time.sleep(0.2)
+        unit.kill()
+        unit.wait()
+        unit.update_status()
+        self.assertEqual(unit.status, _status_failed)
+        self.assertEqual(t2.status, _status_failed)
+
+    def test_shell_chain(self):
+        t1 = ShellTask("test_task_1", ["echo", "first"])
+        t2 = ShellTask("test_task_2", ["sh", "-c", "echo second; echo oops >&2"])
+        t3 = ShellTask("test_task_3", "false")
+        t4 = ShellTask("test_task_4", ["echo", "never"])
+        t1 >> t2 >> t3 >> t4
+        unit = FusedTask([t1, t2, t3, t4])
+
+        t1.try_to_schedule()
+        unit.update_status(runnable=True)
+        self.assertEqual(unit.status, _status_running)
+        unit.wait()
+        unit.update_status()
+
+        self.assertEqual(t1.status, _status_succeeded)
+        self.assertEqual(t2.status, _status_succeeded)
+        self.assertEqual(t3.status, _status_failed)
+        self.assertEqual(t4.status, _status_failed)
+        self.assertEqual(t1.get_logs(), "first\n")
+        self.assertEqual(t2.get_logs(), "second\noops\n")
+        self.assertEqual(t4.get_logs(), "")
+
+    def test_dag_run_fuse(self):
+        dag = DAG()
+        t1 = dag.new_task("test_task_1", task_type='shell', command=["echo", "a"])
+        t2 = dag.new_task("test_task_2", task_type='shell', command=["echo", "b"])
+        t3 = dag.new_task("test_task_3", task_type='shell', command=["echo", "c"])
+        t4 = dag.new_task("test_task_4", task_type='shell', command=["echo", "d"])
+        t5 = dag.new_task("test_task_5", task_type='shell', command=["echo", "e"])
+
+        t1 >> t2 >> [t3, t4]
+        t4 >> t5
+
+        units = dag._get_units(fuse=True)
+        self.assertEqual([u.get_name() for u in units],
+                         ["test_task_1+test_task_2", "test_task_3", "test_task_4+test_task_5"])
+
+        dag.run(fuse=True)
+
+        for t in [t1, t2, t3, t4, t5]:
+            self.assertEqual(t.status, _status_succeeded)
+        self.assertEqual(t5.get_logs(), "e\n")
+        self.assertEqual(dag.running, 0)
@@ -0,0 +1,35 @@
+import unittest
+
+from psyched.host import DockerHost
+from psyched.image import Image
+
+from .fake_docker import FakeClient
+
+
+class TestDockerHostMethods(unittest.TestCase):
+    def setUp(self):
+        self.host = DockerHost(capacity=2, client=FakeClient())
+        self.image = Image('amd64/ubuntu', '20.04')
+
+    def test_slots(self):
+        self.assertEqual(self.host.free_slots(), 2)
+        self.host.acquire()
+        self.assertEqual(self.host.free_slots(), 1)
+        self.host.release()
+        self.assertEqual(self.host.free_slots(), 2)
+
+    def test_ensure_image_pulls_once(self):
+        self.host.ensure_image('amd64/ubuntu', '20.04')
+        self.host.ensure_image('amd64/ubuntu', '20.04')
+        self.assertEqual(self.host.client.images.pulls, ['amd64/ubuntu:20.04'])
+
+    def test_ensure_image_already_present(self):
+        self.host.client.images.available.add('amd64/ubuntu:20.04')
+        self.host.ensure_image('amd64/ubuntu', '20.04')
+        self.assertEqual(self.host.client.images.pulls, [])
+
+    def test_run_command_on_host(self):
+        container = self.image.run_command("true", host=self.host)
+        self.assertEqual(container.wait()['StatusCode'], 0)
+        self.assertEqual(self.host.client.containers.started, [('amd64/ubuntu:20.04', 'true')])
+        self.assertEqual(self.host.client.images.pulls, ['amd64/ubuntu:20.04'])
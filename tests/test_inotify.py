@@ -0,0 +1,20 @@
+import os
+import tempfile
+import unittest
+
+from psyched.inotify import IN_CLOSE_WRITE, IN_CREATE, Inotify
+
+
+class TestInotify(unittest.TestCase):
+    def test_read(self):
+        with tempfile.TemporaryDirectory() as tmpdir, Inotify() as inotify:
+            inotify.add_watch(tmpdir, IN_CREATE | IN_CLOSE_WRITE)
+            self.assertEqual(inotify.read(), [])
+            with open(os.path.join(tmpdir, 'file'), 'w') as f:
+                f.write('data')
+            self.assertEqual(inotify.read(), [(tmpdir, IN_CREATE, 'file'), (tmpdir, IN_CLOSE_WRITE, 'file')])
+
+    def test_missing_path(self):
+        with tempfile.TemporaryDirectory() as tmpdir, Inotify() as inotify:
+            with self.assertRaises(FileNotFoundError):
+                inotify.add_watch(os.path.join(tmpdir, 'missing'), IN_CREATE)
@@ -0,0 +1,75 @@
+import time
+import unittest
+
+from psyched.dag import DAG
+from psyched.launcher import Launcher
+from psyched.task import ShellTask, _status_failed, _status_succeeded
+
+
+class TestLauncher(unittest.TestCase):
+    def setUp(self):
+        self.launcher = Launcher()
+
+    def tearDown(self):
+        self.launcher.close()
+
+    def test_spawn(self):
+        process = self.launcher.spawn(["sh", "-c", "echo out; echo err >&2; exit 3"])
+        self.assertIsNotNone(process.pid)
+        self.assertEqual(process.wait(), 3)
+        with process.stdout:
+            self.assertEqual(process.stdout.read(), b"out\nerr\n")
+        self.assertIn('user_time', process.resources)
+
+    def test_spawn_missing(self):
+        process = self.launcher.spawn("psyched-missing-command")
+        self.assertEqual(process.wait(), 127)
+        with process.stdout:
+            self.assertIn(b"psyched launcher:", process.stdout.read())
+
+    def test_task(self):
+        t1 = ShellTask("test_task_1", ["echo", "Hello World!"])
+        t1.set_launcher(self.launcher)
+        t1.try_to_schedule()
+        t1.run()
+        t1.wait()
+        t1.try_to_finish()
+        self.assertEqual(t1.status, _status_succeeded)
+        self.assertEqual(t1.get_logs(), "Hello World!\n")
+        self.assertIn('max_rss', t1.get_resources())
+
+    def test_task_kill(self):
+        t1 = ShellTask("test_task_1", ["sleep", "60"])
+        t1.set_launcher(self.launcher)
+        t1.try_to_schedule()
+        t1.run()
+        t1.kill()
+        self.assertEqual(t1.process.returncode, -9)
+
+    def test_stream(self):
+        t1 = ShellTask("test_task_1", ["sh", "-c", "printf 'b\\na\\n'; echo log >&2"])
+        t2 = ShellTask("test_task_2", ["sort"])
+        t1 | t2
+        for t in [t1, t2]:
+            t.set_launcher(self.launcher)
+        t1.try_to_schedule()
+        t1.run()
+        for t in [t1, t2]:
+            while not t.try_to_finish():
+                time.sleep(0.01)
+            self.assertEqual(t.status, _status_succeeded)
+        self.assertEqual(t1.get_logs(), "log\n")
+        self.assertEqual(t2.get_logs(), "a\nb\n")
+
+    def test_dag_run(self):
+        dag = DAG(max_parallel_workers=8, poll_interval=0.05)
+        tasks = [dag.new_task(f"test_task_{i}", task_type='shell', command=["echo", str(i)]) for i in range(50)]
+        failing = dag.new_task("test_task_fail", task_type='shell', command="false")
+
+        dag.run(launcher=self.launcher)
+
+        for i, t in enumerate(tasks):
+            self.assertEqual(t.status, _status_succeeded)
+            self.assertEqual(t.get_logs(), f"{i}\n")
+        self.assertEqual(failing.status, _status_failed)
+        self.assertEqual(dag.running, 0)
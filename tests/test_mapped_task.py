@@ -0,0 +1,128 @@
+import os
+import time
+import tempfile
+import unittest
+
+from psyched.dag import DAG
+from psyched.task import (MappedTask, PythonTask, ShellTask, _status_failed,
+                          _status_running, _status_succeeded)
+
+
+class TestMappedTaskMethods(unittest.TestCase):
+    def test_expand(self):
+        t1 = PythonTask("test_task_1", target=lambda: ["a", "b"])
+        t2 = MappedTask("test_task_2", lambda name, item: ShellTask(name, ["echo", item]), t1)
+        self.assertEqual(t2.get_upstream(), [t1])
+
+        t1.try_to_schedule()
+        t1.run()
+        t1.wait()
+        t1.try_to_finish()
+
+        instances = t2.expand()
+        self.assertEqual(t2.status, _status_running)
+        self.assertEqual([t.get_name() for t in instances], ["test_task_2[0]", "test_task_2[1]"])
+        self.assertEqual([t.command for t in instances], [["echo", "a"], ["echo", "b"]])
+        self.assertFalse(t2.try_to_finish())
+
+    def test_items_from_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            listing = os.path.join(tmpdir, "listing.txt")
+            with open(listing, "w") as f:
+                f.write("x\n\ny\n")
+            t1 = MappedTask("test_task", lambda name, item: ShellTask(name, "true"), listing)
+            self.assertEqual(t1.get_items(), ["x", "y"])
+
+    def test_dag_run(self):
+        dag = DAG(max_parallel_workers=4)
+        t1 = dag.new_task("list", task_type='python', target=lambda: [1, 2, 3])
+        t2 = dag.new_task("square", task_type='mapped', items_from=t1,
+                          factory=lambda name, item: PythonTask(name, target=lambda: item * item))
+        t3 = dag.new_task("reduce", task_type='python', target=lambda parts: sum(parts))
+        t3.set_result_kwarg("parts", t2)
+
+        dag.run()
+
+        self.assertEqual(t2.status, _status_succeeded)
+        self.assertEqual(dag.tasks["square[2]"].status, _status_succeeded)
+        self.assertEqual(t3.status, _status_succeeded)
+        self.assertEqual(t3.get_result(), 14)
+        self.assertEqual(dag.running, 0)
+
+    def test_dag_run_fail(self):
+        dag = DAG(max_parallel_workers=2)
+        t1 = dag.new_task("list", task_type='python', target=lambda: ["true", "false"])
+        t2 = dag.new_task("check", task_type='mapped', items_from=t1,
+                          factory=lambda name, item: ShellTask(name, item))
+        t3 = dag.new_task("reduce", task_type='shell', command="true")
+        t2 >> t3
+
+        dag.run()
+
+        self.assertEqual(dag.tasks["check[0]"].status, _status_succeeded)
+        self.assertEqual(dag.tasks["check[1]"].status, _status_failed)
+        self.assertEqual(t2.status, _status_failed)
+        self.assertEqual(t3.status, _status_failed)
+
+    def test_dag_run_empty(self):
+        dag = DAG()
+        t1 = dag.new_task("list", task_type='python', target=lambda: [])
+        t2 = dag.new_task("nothing", task_type='mapped', items_from=t1,
+                          factory=lambda name, item: ShellTask(name, "false"))
+
+        dag.run()
+
+        self.assertEqual(t2.status, _status_succeeded)
+
+    def test_dag_run_shared_items(self):
+        dag = DAG(max_parallel_workers=2, poll_interval=0.05)
+        t1 = dag.new_task("list", task_type='python', target=lambda: [1, 2])
+        t2 = dag.new_task("count", task_type='python', target=lambda items: len(items))
+        t2.set_result_kwarg("items", t1)
+        t3 = dag.new_task("slow", task_type='shell', command=["sleep", "0.5"])
+        t4 = dag.new_task("echo", task_type='mapped', items_from=t1,
+                          factory=lambda name, item: ShellTask(name, ["echo", str(item)]))
+        # The MappedTask is expanded well after the other consumer finished
+        t3 >> t4
+
+        dag.run()
+
+        self.assertEqual(t2.get_result(), 2)
+        self.assertEqual(t4.status, _status_succeeded)
+        self.assertEqual(t4.get_logs(), "1\n2\n")
+        self.assertIsNone(t1.get_result())
+
+    def test_dag_run_bad_items(self):
+        dag = DAG(poll_interval=0.05)
+        t1 = dag.new_task("list", task_type='python', target=lambda: 3)
+        t2 = dag.new_task("from_result", task_type='mapped', items_from=t1,
+                          factory=lambda name, item: ShellTask(name, "true"))
+        t3 = dag.new_task("from_file", task_type='mapped', items_from="/nonexistent/listing.txt",
+                          factory=lambda name, item: ShellTask(name, "true"))
+        t4 = dag.new_task("reduce", task_type='shell', command="true")
+        t3 >> t4
+
+        dag.run()
+
+        self.assertEqual([t.status for t in [t1, t2, t3, t4]],
+                         [_status_succeeded, _status_failed, _status_failed, _status_failed])
+        self.assertIn("TypeError", t2.get_logs())
+        self.assertIn("FileNotFoundError", t3.get_logs())
+        self.assertEqual(dag.running, 0)
+
+    def test_dag_run_timeout(self):
+        dag = DAG(max_parallel_workers=2, poll_interval=0.05)
+        t1 = dag.new_task("list", task_type='python', target=lambda: ["60", "60"])
+        t2 = dag.new_task("sleep", task_type='mapped', items_from=t1,
+                          factory=lambda name, item: ShellTask(name, ["sleep", item]))
+        t2.set_timeout(1)
+
+        start = time.time()
+        dag.run()
+
+        self.assertLess(time.time() - start, 30)
+        self.assertTrue(t2.timed_out)
+        self.assertEqual(t2.status, _status_failed)
+        self.assertEqual([t.process.returncode for t in t2.instances], [-9, -9])
+        self.assertGreaterEqual(t2.get_duration(), 1)
+        self.assertEqual(dag.running, 0)
@@ -0,0 +1,75 @@
+import unittest
+import urllib.error
+import urllib.request
+
+from psyched.dag import DAG
+from psyched.metrics import MetricsRegistry
+from psyched.task import ShellTask, _status_succeeded
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def tearDown(self):
+        self.registry.shutdown()
+
+    def test_observe(self):
+        t1 = ShellTask("test_task_1", "true")
+        t2 = ShellTask("test_task_2", "true")
+        t1.scheduled_time = 10
+        t1.start_time = 12
+        t1.end_time = 15
+        t1.status = _status_succeeded
+
+        for _ in range(2):
+            self.registry.observe([t1, t2], running_slots=0, tick=0.02)
+
+        snapshot = self.registry.snapshot()
+        self.assertEqual(snapshot['tasks']['succeeded'], 1)
+        self.assertEqual(snapshot['tasks']['waiting'], 1)
+        self.assertEqual(snapshot['finished'], {('ShellTask', 'succeeded'): 1})
+        self.assertEqual(snapshot['scheduling_latency']['ShellTask']['sum'], 2)
+        self.assertEqual(snapshot['scheduling_latency']['ShellTask']['count'], 1)
+        self.assertEqual(snapshot['duration']['ShellTask']['buckets'][2.5], 0)
+        self.assertEqual(snapshot['duration']['ShellTask']['buckets'][5], 1)
+        self.assertEqual(snapshot['tick']['count'], 2)
+
+    def test_render(self):
+        t1 = ShellTask("test_task_1", "true")
+        t1.scheduled_time = 10
+        t1.start_time = 11
+        t1.end_time = 12
+        t1.status = _status_succeeded
+        self.registry.observe([t1], tick=0.5)
+
+        text = self.registry.render()
+        self.assertIn('psyched_tasks{status="succeeded"} 1\n', text)
+        self.assertIn('psyched_tasks_finished_total{type="ShellTask",status="succeeded"} 1\n', text)
+        self.assertIn('psyched_task_duration_seconds_bucket{type="ShellTask",le="1"} 1\n', text)
+        self.assertIn('psyched_task_duration_seconds_bucket{type="ShellTask",le="+Inf"} 1\n', text)
+        self.assertIn('psyched_task_duration_seconds_count{type="ShellTask"} 1\n', text)
+        self.assertIn('psyched_scheduler_tick_seconds_bucket{le="0.5"} 1\n', text)
+        self.assertIn('psyched_scheduler_tick_seconds_sum 0.5\n', text)
+
+    def test_serve(self):
+        host, port = self.registry.serve()
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            self.assertEqual(response.read().decode('utf-8'), self.registry.render())
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://{host}:{port}/other")
+
+    def test_dag_run(self):
+        dag = DAG(max_parallel_workers=2)
+        t1 = dag.new_task("test_task_1", task_type='shell', command="true")
+        t2 = dag.new_task("test_task_2", task_type='python', target=print)
+        t1 >> t2
+
+        dag.run(metrics=self.registry)
+
+        snapshot = self.registry.snapshot()
+        self.assertEqual(snapshot['tasks']['succeeded'], 2)
+        self.assertEqual(snapshot['finished'], {('ShellTask', 'succeeded'): 1, ('PythonTask', 'succeeded'): 1})
+        self.assertEqual(snapshot['scheduling_latency']['PythonTask']['count'], 1)
+        self.assertGreater(snapshot['tick']['count'], 0)
+        self.assertEqual(snapshot['running_slots'], 0)
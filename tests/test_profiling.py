@@ -0,0 +1,60 @@
+import os
+import pstats
+import tempfile
+import unittest
+
+from psyched.dag import DAG
+from psyched.profiling import Profiler
+from psyched.task import PythonTask, _status_succeeded
+
+
+def allocate(n):
+    return [bytearray(1024) for _ in range(n)]
+
+
+class TestProfiler(unittest.TestCase):
+    def test_call(self):
+        profiler = Profiler()
+        result = profiler.call(allocate, {'n': 1000})
+        self.assertEqual(len(result), 1000)
+        functions = [func for _, _, func in profiler.get_stats().stats]
+        self.assertIn('allocate', functions)
+        self.assertTrue(profiler.allocations.startswith('peak traced memory: '))
+        self.assertIn('test_profiling.py', profiler.allocations)
+
+    def test_dump(self):
+        profiler = Profiler()
+        profiler.call(allocate, {'n': 10})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            profiler.dump(os.path.join(tmpdir, 'reports', 'task'))
+            stats = pstats.Stats(os.path.join(tmpdir, 'reports', 'task.pstats'))
+            self.assertIn('allocate', [func for _, _, func in stats.stats])
+            with open(os.path.join(tmpdir, 'reports', 'task.allocations.txt')) as f:
+                self.assertEqual(f.read(), profiler.allocations)
+
+    def test_process_executor(self):
+        t1 = PythonTask("test_task", target=allocate, n=10)
+        t1.set_executor('process')
+        t1.set_profile(memory=False)
+        t1.try_to_schedule()
+        t1.run()
+        t1.wait()
+        t1.try_to_finish()
+        self.assertEqual(t1.status, _status_succeeded)
+        self.assertIn('allocate', [func for _, _, func in t1.profiler.get_stats().stats])
+        self.assertEqual(t1.profiler.allocations, '')
+
+    def test_dag_run(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dag = DAG()
+            t1 = dag.new_task("test_task_1", task_type='python', target=allocate, n=10)
+            t2 = dag.new_task("test_task_2", task_type='shell', command="true")
+            t1 >> t2
+
+            dag.run(profile_dir=tmpdir)
+
+            self.assertEqual(t2.status, _status_succeeded)
+            self.assertEqual(
+                sorted(os.listdir(tmpdir)),
+                ['test_task_1.allocations.txt', 'test_task_1.pstats']
+            )
@@ -1,9 +1,17 @@
+import asyncio
+import os
+import threading
 import unittest
-from time import sleep
+from time import sleep, time
 
 from psyched.task import (PythonTask, _status_failed, _status_running,
                           _status_scheduled, _status_succeeded,
-                          _status_waiting)
+                          _status_waiting, python_task, set_thread_pool_size)
+
+
+def make_payload(size):
+    print("in child")
+    return {'payload': bytes(range(256)) * (size // 256)}
 
 
 class TestPythonTaskMethods(unittest.TestCase):
@@ -90,6 +98,110 @@ class TestPythonTaskMethods(unittest.TestCase):
             _status_succeeded
         )
 
+    def test_kill_thread(self):
+        def spin():
+            while True:
+                sleep(0.01)
+
+        t1 = PythonTask("test_task", target=spin)
+        t1.try_to_schedule()
+        t1.run()
+        sleep(0.1)
+        t1.kill()
+        t1.wait()
+        t1.try_to_finish()
+        self.assertEqual(t1.status, _status_failed)
+
+    def test_thread_pool(self):
+        # Other tests may have grown the shared pool: start from a single thread
+        self.addCleanup(set_thread_pool_size, python_task._thread_pool_size)
+        set_thread_pool_size(1)
+        idents = []
+
+        def log_ident(i):
+            print(i)
+            idents.append(threading.get_ident())
+
+        tasks = [PythonTask(f"test_task_{i}", target=log_ident, i=i) for i in range(10)]
+        for t in tasks:
+            t.try_to_schedule()
+            t.run()
+            t.wait()
+            t.try_to_finish()
+        self.assertEqual(len(set(idents)), 1)
+        # A reused thread keeps the logs of each task apart
+        self.assertEqual([t.get_logs() for t in tasks], [f"{i}\n" for i in range(10)])
+
+    def test_coroutine(self):
+        async def fetch(i):
+            print(f"fetching {i}")
+            await asyncio.sleep(0.5)
+            return i * 2
+
+        tasks = [PythonTask(f"test_task_{i}", target=fetch, i=i) for i in range(1000)]
+        start = time()
+        for t in tasks:
+            t.try_to_schedule()
+            t.run()
+        for t in tasks:
+            t.wait()
+            t.try_to_finish()
+        self.assertLess(time() - start, 5)
+        self.assertEqual([t.status for t in tasks], [_status_succeeded] * 1000)
+        self.assertEqual(tasks[3].get_result(), 6)
+        self.assertEqual(tasks[3].get_logs(), "fetching 3\n")
+
+    def test_coroutine_fail(self):
+        async def fail():
+            raise ValueError()
+
+        t1 = PythonTask("test_task", target=fail)
+        t1.try_to_schedule()
+        t1.run()
+        t1.wait()
+        t1.try_to_finish()
+        self.assertEqual(t1.status, _status_failed)
+
+    def test_kill_coroutine(self):
+        t1 = PythonTask("test_task", target=asyncio.sleep, delay=60)
+        t1.try_to_schedule()
+        t1.run()
+        t1.kill()
+        t1.wait()
+        t1.try_to_finish()
+        self.assertEqual(t1.status, _status_failed)
+
+    def test_coroutine_process_executor(self):
+        async def answer():
+            return 42
+
+        t1 = PythonTask("test_task", target=answer)
+        t1.set_executor('process')
+        t1.try_to_schedule()
+        t1.run()
+        t1.wait()
+        t1.try_to_finish()
+        self.assertEqual(t1.get_result(), 42)
+
+    def test_kill_process(self):
+        t1 = PythonTask("test_task", target=sleep, secs=60)
+        t1.set_executor('process')
+        t1.try_to_schedule()
+        t1.run()
+        t1.kill()
+        self.assertFalse(t1.child.is_alive())
+
+    def test_kill_process_finished(self):
+        # Killed after the child sent its result, e.g. a timeout racing completion
+        t1 = PythonTask("test_task", target=make_payload, size=1 << 22)
+        t1.set_executor('process')
+        t1.try_to_schedule()
+        before = set(os.listdir('/dev/shm'))
+        t1.run()
+        t1.wait()
+        t1.kill()
+        self.assertEqual(set(os.listdir('/dev/shm')) - before, set())
+
     def test_get_logs(self):
         hw = "Hello World!"
 
@@ -104,3 +216,116 @@ class TestPythonTaskMethods(unittest.TestCase):
             t1.get_logs(),
             hw + '\n'
         )
+
+    def test_result(self):
+        t1 = PythonTask("test_task", target=lambda: 42)
+        t1.try_to_schedule()
+        t1.run()
+        t1.wait()
+        t1.try_to_finish()
+        self.assertEqual(t1.get_result(), 42)
+
+    def test_result_kwarg(self):
+        t1 = PythonTask("test_task_1", target=lambda: [1, 2, 3])
+        t2 = PythonTask("test_task_2", target=lambda values, offset: sum(values) + offset, offset=10)
+        t2.set_result_kwarg("values", t1)
+        self.assertEqual(t2.get_upstream(), [t1])
+
+        t1.try_to_schedule()
+        for t in [t1, t2]:
+            t.run()
+            t.wait()
+            t.try_to_finish()
+        self.assertEqual(t2.get_result(), 16)
+        # Released once its only consumer finished
+        self.assertEqual(t1.get_result(), None)
+
+    def test_process_executor(self):
+        def log_and_return():
+            print("in child")
+            return 7
+
+        t1 = PythonTask("test_task", target=log_and_return)
+        t1.set_executor('process')
+        t1.try_to_schedule()
+        t1.run()
+        t1.wait()
+        t1.try_to_finish()
+        self.assertEqual(t1.status, _status_succeeded)
+        self.assertEqual(t1.get_result(), 7)
+        self.assertEqual(t1.get_logs(), "in child\n")
+
+    def test_process_executor_forkserver(self):
+        # Picklable targets run in children of the forkserver, not of this multithreaded process
+        t1 = PythonTask("test_task_1", target=make_payload, size=1 << 21)
+        t2 = PythonTask("test_task_2", target=lambda: threading.active_count())
+        for t in [t1, t2]:
+            t.set_executor('process')
+            t.try_to_schedule()
+            t.run()
+            t.wait()
+            t.try_to_finish()
+            self.assertEqual(t.status, _status_succeeded)
+        self.assertEqual(t1.child._start_method, 'forkserver')
+        self.assertEqual(len(t1.get_result()['payload']), 1 << 21)
+        t1.shared_result.release()
+        self.assertEqual(t1.get_logs(), "in child\n")
+        self.assertEqual(t2.child._start_method, 'fork')
+        self.assertEqual(t2.get_result(), 1)
+
+    def test_resources(self):
+        t1 = PythonTask("test_task", target=self.func, n=10 ** 6)
+        t1.try_to_schedule()
+        t1.run()
+        t1.wait()
+        t1.try_to_finish()
+        self.assertGreater(t1.get_resources()['cpu_time'], 0)
+
+        t2 = PythonTask("test_task", target=self.func, n=10 ** 6)
+        t2.set_executor('process')
+        t2.try_to_schedule()
+        t2.run()
+        t2.wait()
+        t2.try_to_finish()
+        self.assertGreater(t2.get_resources()['user_time'], 0)
+        self.assertGreater(t2.get_resources()['max_rss'], 0)
+
+    def test_process_executor_fail(self):
+        t1 = PythonTask("test_task", target=self.func, n="bad_value")
+        t1.set_executor('process')
+        t1.try_to_schedule()
+        t1.run()
+        t1.wait()
+        t1.try_to_finish()
+        self.assertEqual(t1.status, _status_failed)
+        self.assertIn("TypeError", t1.get_logs())
+
+    def test_process_executor_shared_result(self):
+        payload = bytes(range(256)) * 8192
+        t1 = PythonTask("test_task_1", target=lambda: {'payload': payload})
+        t2 = PythonTask("test_task_2", target=lambda data: len(data['payload']))
+        t3 = PythonTask("test_task_3", target=lambda data: data['payload'][:4])
+        t2.set_result_kwarg("data", t1)
+        t3.set_result_kwarg("data", t1)
+
+        t1.try_to_schedule()
+        for t in [t1, t2, t3]:
+            t.set_executor('process')
+            t.run()
+            t.wait()
+            t.try_to_finish()
+            self.assertEqual(t.status, _status_succeeded)
+            if t is t1:
+                self.assertEqual(t1.get_result(), {'payload': payload})
+                self.assertEqual(len(t1.shared_result.segments), 1)
+                segment = t1.shared_result.segments[0].name
+
+        self.assertEqual(t2.get_result(), len(payload))
+        self.assertEqual(t3.get_result(), payload[:4])
+        self.assertEqual(t1.get_result(), None)
+        self.assertFalse(os.path.exists(os.path.join('/dev/shm', segment.lstrip('/'))))
+
+    def test_wrong_executor(self):
+        t1 = PythonTask("test_task", target=self.func, n=1)
+        with self.assertRaises(ValueError):
+            t1.set_executor('asdf')
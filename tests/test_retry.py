@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from psyched.dag import DAG
+from psyched.retry import RetryPolicy
+from psyched.task import ShellTask, _status_failed, _status_scheduled, _status_succeeded
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_should_retry(self):
+        policy = RetryPolicy(max_attempts=3, retry_on=[75])
+        self.assertTrue(policy.should_retry(1, 75))
+        self.assertFalse(policy.should_retry(1, 1))
+        self.assertFalse(policy.should_retry(3, 75))
+        self.assertTrue(RetryPolicy().should_retry(2, 1))
+
+    def test_get_delay(self):
+        policy = RetryPolicy(delay=1, backoff=2, max_delay=5, jitter=0)
+        self.assertEqual([policy.get_delay(n) for n in [1, 2, 3, 4]], [1, 2, 4, 5])
+        policy = RetryPolicy(delay=1, backoff=2, jitter=0.5)
+        for _ in range(20):
+            self.assertTrue(2 <= policy.get_delay(2) <= 3)
+
+    def test_fail_attempt(self):
+        t1 = ShellTask("test_task_1", ["sh", "-c", "echo oops; exit 3"])
+        t2 = ShellTask("test_task_2", "true")
+        t1 >> t2
+        t1.set_retry(RetryPolicy(max_attempts=2, delay=60))
+        t1.try_to_schedule()
+        t1.update_status(runnable=True)
+        t1.wait()
+        self.assertEqual(t1.update_status(), -1)
+        self.assertEqual(t1.status, _status_scheduled)
+        self.assertTrue(t1.is_backing_off(t1.attempts[0]['end_time']))
+        self.assertEqual(t1.update_status(runnable=True), 0)
+        self.assertEqual(t1.get_logs(), "oops\n--- attempt 1 failed with exit code 3, retrying ---\n")
+
+        t1.retry_at = None
+        t1.update_status(runnable=True)
+        t1.wait()
+        t1.update_status()
+        self.assertEqual(t1.status, _status_failed)
+        self.assertEqual(t2.status, _status_failed)
+        self.assertEqual(len(t1.attempts), 1)
+        self.assertEqual(t1.get_logs(), "oops\n--- attempt 1 failed with exit code 3, retrying ---\noops\n")
+
+    def test_dag_retry(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            counter = os.path.join(tmpdir, "counter")
+            dag = DAG(max_parallel_workers=1)
+            t1 = dag.new_task(
+                "test_task_1", task_type='shell',
+                command=["sh", "-c", f"echo x >> {counter}; [ $(wc -l < {counter}) -ge 2 ]"])
+            t2 = dag.new_task("test_task_2", task_type='shell', command="true")
+            t3 = dag.new_task("test_task_3", task_type='shell', command="true")
+            t1.set_retry(RetryPolicy(max_attempts=3, delay=2, jitter=0))
+
+            t1 >> t3
+
+            dag.run()
+
+            for t in [t1, t2, t3]:
+                self.assertEqual(t.status, _status_succeeded)
+            self.assertEqual(len(t1.attempts), 1)
+            # t2 ran while t1 was waiting for its retry
+            self.assertLess(t2.start_time, t1.start_time)
+            self.assertGreater(t2.start_time, t1.attempts[0]['end_time'])
+            self.assertEqual(dag.running, 0)
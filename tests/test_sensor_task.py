@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from psyched.dag import DAG
+from psyched.task import SensorTask, _status_failed, _status_running, _status_succeeded
+
+
+class TestSensorTaskMethods(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def touch(self, *parts):
+        path = os.path.join(self.dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'w').close()
+        return path
+
+    def start(self, t):
+        t.try_to_schedule()
+        self.assertEqual(t.update_status(runnable=True), 1)
+        return t
+
+    def test_existing(self):
+        path = self.touch('ready')
+        t1 = self.start(SensorTask("test_task", path))
+        self.assertEqual(t1.update_status(), -1)
+        self.assertEqual(t1.status, _status_succeeded)
+        self.assertEqual(t1.get_logs(), path + '\n')
+
+    def test_inotify(self):
+        t1 = self.start(SensorTask("test_task", [os.path.join(self.dir, 'a'), os.path.join(self.dir, 'b')]))
+        self.assertIsNotNone(t1.inotify)
+        self.assertEqual(t1.update_status(), 0)
+        self.touch('a')
+        self.assertEqual(t1.update_status(), 0)
+        self.touch('b')
+        self.assertEqual(t1.update_status(), -1)
+        self.assertIsNone(t1.inotify)
+
+    def test_glob_in_new_directory(self):
+        t1 = self.start(SensorTask("test_task", os.path.join(self.dir, 'out', '*', '_SUCCESS')))
+        self.touch('out', 'part-0', 'data')
+        self.assertEqual(t1.update_status(), 0)
+        path = self.touch('out', 'part-0', '_SUCCESS')
+        self.assertEqual(t1.update_status(), -1)
+        self.assertEqual(t1.matches, [path])
+
+    def test_polling(self):
+        t1 = self.start(SensorTask("test_task", os.path.join(self.dir, 'a'), poll_interval=0.1, use_inotify=False))
+        self.assertIsNone(t1.inotify)
+        self.touch('a')
+        self.assertEqual(t1.update_status(), 0)
+        time.sleep(0.1)
+        self.assertEqual(t1.update_status(), -1)
+
+    def test_wait(self):
+        t1 = self.start(SensorTask("test_task", os.path.join(self.dir, 'a')))
+        self.assertFalse(t1.wait(0.1))
+        threading.Timer(0.2, self.touch, args=['a']).start()
+        self.assertTrue(t1.wait(5))
+        self.assertEqual(t1.update_status(), -1)
+
+    def test_kill(self):
+        t1 = self.start(SensorTask("test_task", os.path.join(self.dir, 'a')))
+        t1.kill()
+        self.assertIsNone(t1.inotify)
+        self.assertEqual(t1.status, _status_running)
+
+    def test_dag_run(self):
+        dag = DAG(max_parallel_workers=1, poll_interval=0.05)
+        path = os.path.join(self.dir, 'a')
+        sensor = dag.new_task("test_sensor", task_type='sensor', paths=path)
+        sensor.set_timeout(10)
+        consumer = dag.new_task("test_consumer", task_type='shell', command=['cat', path])
+        # Only runs if the waiting sensor leaves the single slot free
+        producer = dag.new_task("test_producer", task_type='shell',
+                                command=['sh', '-c', f'sleep 0.2; echo hi > {path}'])
+        sensor >> consumer
+
+        dag.run()
+
+        for t in [sensor, producer, consumer]:
+            self.assertEqual(t.status, _status_succeeded)
+        self.assertEqual(dag.running, 0)
+
+    def test_dag_run_polling(self):
+        dag = DAG(poll_interval=0.05)
+        path = os.path.join(self.dir, 'a')
+        sensor = dag.new_task("test_sensor", task_type='sensor', paths=path, poll_interval=0.1, use_inotify=False)
+        dag.new_task("test_producer", task_type='shell', command=['sh', '-c', f'sleep 0.2; echo hi > {path}'])
+
+        dag.run()
+
+        self.assertEqual((sensor.poll_interval, sensor.use_inotify), (0.1, False))
+        self.assertIsNone(sensor.inotify)
+        self.assertEqual(sensor.status, _status_succeeded)
+
+    def test_timeout(self):
+        dag = DAG(poll_interval=0.05)
+        sensor = dag.new_task("test_sensor", task_type='sensor', paths=os.path.join(self.dir, 'never'))
+        sensor.set_timeout(0.2)
+        dag.run()
+        self.assertEqual(sensor.status, _status_failed)
+        self.assertTrue(sensor.timed_out)
+        self.assertEqual(dag.running, 0)
@@ -1,3 +1,4 @@
+import time
 import unittest
 
 from psyched.task import (ShellTask, _status_failed, _status_running,
@@ -83,6 +84,36 @@ class TestShellTaskMethods(unittest.TestCase):
             _status_succeeded
         )
 
+    def test_resources(self):
+        t1 = ShellTask("test_task", ["sh", "-c", "i=0; while [ $i -lt 100000 ]; do i=$((i+1)); done"])
+        t1.try_to_schedule()
+        t1.run()
+        while not t1.try_to_finish():
+            time.sleep(0.1)
+        self.assertEqual(t1.status, _status_succeeded)
+        resources = t1.get_resources()
+        self.assertGreater(resources['user_time'] + resources['system_time'], 0)
+        self.assertGreater(resources['max_rss'], 0)
+
+    def test_kill(self):
+        t1 = ShellTask("test_task", ["sh", "-c", "sleep 60 & echo $!; wait"])
+        t1.try_to_schedule()
+        t1.run()
+        child = int(t1.process.stdout.readline())
+        t1.kill()
+        self.assertEqual(t1.process.returncode, -9)
+        # The whole process group is gone, not only the shell
+        for _ in range(50):
+            try:
+                with open(f"/proc/{child}/stat") as f:
+                    if f.read().split(") ")[1].startswith("Z"):
+                        break
+            except FileNotFoundError:
+                break
+            time.sleep(0.1)
+        else:
+            self.fail("child process still alive")
+
     def test_get_logs(self):
         hw = "Hello World!"
 
@@ -94,3 +125,63 @@ class TestShellTaskMethods(unittest.TestCase):
             t1.get_logs(),
             hw + '\n'
         )
+
+    def test_stream(self):
+        t1 = ShellTask("test_task_1", ["printf", "b\\na\\nc\\n"])
+        t2 = ShellTask("test_task_2", ["sort"])
+        t1 | t2
+
+        self.assertEqual(t1.get_downstream(), [t2])
+        t2.try_to_schedule()
+        self.assertEqual(t1.status, _status_scheduled)
+        self.assertEqual(t2.status, _status_waiting)
+
+        self.assertEqual(t1.update_status(runnable=True), 2)
+        self.assertEqual(t2.status, _status_running)
+
+        t2.wait()
+        self.assertFalse(t2.try_to_finish())
+        t1.wait()
+        self.assertTrue(t1.try_to_finish())
+        self.assertTrue(t2.try_to_finish())
+        self.assertEqual(t1.status, _status_succeeded)
+        self.assertEqual(t2.status, _status_succeeded)
+        self.assertEqual(t1.get_logs(), "")
+        self.assertEqual(t2.get_logs(), "a\nb\nc\n")
+
+    def test_stream_producer_fail(self):
+        t1 = ShellTask("test_task_1", ["sh", "-c", "echo data; echo oops >&2; exit 1"])
+        t2 = ShellTask("test_task_2", ["cat"])
+        t3 = ShellTask("test_task_3", "true")
+        (t1 | t2) >> t3
+
+        t1.try_to_schedule()
+        t1.update_status(runnable=True)
+        t1.wait()
+        t1.try_to_finish()
+        self.assertEqual(t1.status, _status_failed)
+        self.assertEqual(t1.get_logs(), "oops\n")
+        self.assertEqual(t2.status, _status_running)
+        self.assertEqual(t3.status, _status_waiting)
+
+        t2.wait()
+        t2.try_to_finish()
+        self.assertEqual(t2.status, _status_failed)
+        self.assertEqual(t3.status, _status_failed)
+
+    def test_stream_twice(self):
+        t1 = ShellTask("test_task_1", "true")
+        t2 = ShellTask("test_task_2", "true")
+        t3 = ShellTask("test_task_3", "true")
+        t1 | t2
+        with self.assertRaises(ValueError):
+            t1 | t3
+
+    def test_get_fingerprint(self):
+        t1 = ShellTask("test_task_1", ["echo", "a"])
+        t2 = ShellTask("test_task_2", ["echo", "a"])
+        t3 = ShellTask("test_task_3", "echo a")
+        self.assertEqual(t1.get_fingerprint(), t2.get_fingerprint())
+        self.assertNotEqual(t1.get_fingerprint(), t3.get_fingerprint())
+        t1 | t3
+        self.assertIsNone(t1.get_fingerprint())
@@ -0,0 +1,75 @@
+import unittest
+
+from psyched.dag import DAG
+from psyched.host import DockerHost
+from psyched.image import Image
+from psyched.simulation import simulate
+from psyched.task import _status_waiting
+
+from .fake_docker import FakeClient
+
+
+class TestSimulate(unittest.TestCase):
+    def setUp(self):
+        self.dag = DAG(max_parallel_workers=2)
+        self.a = self.dag.new_task("a", task_type='shell', command="true")
+        self.b = self.dag.new_task("b", task_type='shell', command="true")
+        self.c = self.dag.new_task("c", task_type='shell', command="true")
+        self.d = self.dag.new_task("d", task_type='shell', command="true")
+        self.a >> [self.b, self.c] >> self.d
+        self.durations = {"a": 2, "b": 10, "c": 3, "d": 1}
+
+    def test_makespan(self):
+        report = simulate(self.dag, self.durations)
+        self.assertEqual(report.makespan, 13)
+        self.assertEqual(report.start_times, {"a": 0, "b": 2, "c": 2, "d": 12})
+        self.assertEqual(report.utilization, {'local': 16 / 26})
+        self.assertEqual(report.critical_path, [self.a, self.b, self.d])
+        self.assertEqual(report.critical_path_length, 13)
+        for t in [self.a, self.b, self.c, self.d]:
+            self.assertEqual(t.status, _status_waiting)
+
+    def test_capacity(self):
+        report = self.dag.simulate(self.durations, max_parallel_workers=1)
+        self.assertEqual(report.makespan, 16)
+        self.assertEqual(report.utilization, {'local': 1.0})
+        self.assertEqual(report.critical_path_length, 13)
+
+    def test_default_duration(self):
+        report = simulate(self.dag, {"b": 10}, default_duration=0.5)
+        self.assertEqual(report.makespan, 11)
+
+    def test_stream(self):
+        dag = DAG(max_parallel_workers=1)
+        p = dag.new_task("p", task_type='shell', command="true")
+        q = dag.new_task("q", task_type='shell', command="true")
+        r = dag.new_task("r", task_type='shell', command="true")
+        (p | q) >> r
+        report = simulate(dag, {"p": 5, "q": 1, "r": 1})
+        self.assertEqual(report.start_times, {"p": 0, "q": 0, "r": 5})
+        self.assertEqual(report.end_times["q"], 5)
+        self.assertEqual(report.critical_path, [p, q, r])
+
+    def test_stream_slots(self):
+        dag = DAG(max_parallel_workers=2)
+        dag.new_task("a", task_type='shell', command="true")
+        p = dag.new_task("p", task_type='shell', command="true")
+        q = dag.new_task("q", task_type='shell', command="true")
+        p | q
+        report = simulate(dag, {"a": 5, "p": 1, "q": 1})
+        self.assertEqual(report.start_times, {"a": 0, "p": 5, "q": 5})
+
+    def test_docker_hosts(self):
+        dag = DAG()
+        h1 = DockerHost(capacity=1, client=FakeClient())
+        h2 = DockerHost(capacity=1, client=FakeClient())
+        dag.add_docker_host(h1)
+        dag.add_docker_host(h2)
+        image = Image('amd64/ubuntu', '20.04')
+        for i in range(4):
+            dag.new_task(f"t{i}", task_type='docker', image=image, command="true")
+        report = simulate(dag, default_duration=5)
+        self.assertEqual(report.makespan, 10)
+        self.assertEqual(report.utilization, {'local': 0.0, h1: 1.0, h2: 1.0})
+        report = simulate(dag, default_duration=5, capacities={h1: 3})
+        self.assertEqual(report.makespan, 5)
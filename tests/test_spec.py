@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from psyched.spec import build_dag, dump_spec, load_dag, load_spec
+from psyched.task import DockerTask, PythonTask, SensorTask, ShellTask
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+def add(a, b):
+    return a + b
+
+
+class TestSpec(unittest.TestCase):
+    def setUp(self):
+        self.spec = {
+            'max_parallel_workers': 3,
+            'tasks': [
+                {'name': 'a', 'type': 'shell', 'command': ['echo', 'a'], 'timeout': 5},
+                {'name': 'b', 'type': 'python', 'target': 'tests.test_spec:add', 'kwargs': {'a': 1, 'b': 2},
+                 'upstream': ['a'], 'executor': 'process'},
+                {'name': 'c', 'type': 'docker', 'image': 'amd64/ubuntu:20.04', 'command': 'true',
+                 'retry': {'max_attempts': 2}},
+                {'name': 'd', 'type': 'docker', 'image': 'amd64/ubuntu:20.04', 'command': 'true',
+                 'upstream': ['c', 'c'], 'inputs': ['in'], 'outputs': ['out']},
+                {'name': 'e', 'type': 'shell', 'command': 'true', 'stream_to': 'f'},
+                {'name': 'f', 'type': 'shell', 'command': 'true'},
+            ],
+            'edges': [['a', 'd'], ['c', 'd']],
+        }
+
+    def test_build_dag(self):
+        dag = build_dag(self.spec)
+        a, b, c, d, e, f = (dag.tasks[name] for name in 'abcdef')
+        self.assertEqual(dag.max_parallel_tasks, 3)
+        self.assertIsInstance(a, ShellTask)
+        self.assertEqual(a.timeout, 5)
+        self.assertIsInstance(b, PythonTask)
+        self.assertEqual(b.target(**b.kwargs), 3)
+        self.assertEqual(b.executor, 'process')
+        self.assertIsInstance(c, DockerTask)
+        self.assertEqual(c.retry.max_attempts, 2)
+        self.assertIs(c.image, d.image)
+        self.assertEqual(d.image.name, 'amd64/ubuntu')
+        self.assertEqual(a.get_downstream(), [b, d])
+        self.assertEqual(d.get_upstream(), [c, a])
+        self.assertEqual(d.get_inputs(), ['in'])
+        self.assertIs(e.stream_downstream, f)
+        self.assertEqual(build_dag(self.spec, max_parallel_workers=7).max_parallel_tasks, 7)
+
+    def test_sensor(self):
+        dag = build_dag({'tasks': [{'name': 'a', 'type': 'sensor', 'paths': ['in/*'], 'poll_interval': 2}]})
+        self.assertIsInstance(dag.tasks['a'], SensorTask)
+        self.assertEqual(dag.tasks['a'].paths, ['in/*'])
+        self.assertEqual(dag.tasks['a'].poll_interval, 2)
+
+    def test_build_dag_errors(self):
+        with self.assertRaises(ValueError):
+            build_dag({'tasks': [{'name': 'a', 'type': 'shell', 'command': 'true', 'upstream': ['z']}]})
+        with self.assertRaises(ValueError):
+            build_dag({'tasks': [{'name': 'a', 'type': 'shell', 'command': 'true'}] * 2})
+        with self.assertRaises(ValueError):
+            build_dag({'tasks': [{'name': 'a', 'type': 'unknown'}]})
+        with self.assertRaises(ValueError):
+            build_dag({'tasks': [{'name': 'a', 'type': 'python', 'target': 'tests.test_spec'}]})
+
+    def check_format(self, extension):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'spec' + extension)
+            dump_spec(self.spec, path)
+            self.assertEqual(load_spec(path), self.spec)
+            self.assertEqual(list(load_dag(path).tasks), list('abcdef'))
+
+    def test_formats(self):
+        for extension in ['.json', '.bin']:
+            self.check_format(extension)
+        with self.assertRaises(ValueError):
+            load_spec('spec.txt')
+
+    @unittest.skipUnless(yaml, "PyYAML is not installed")
+    def test_yaml(self):
+        self.check_format('.yaml')
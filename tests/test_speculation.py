@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from psyched.dag import DAG
+from psyched.speculation import SpeculationPolicy
+from psyched.task import ShellTask, _status_failed, _status_succeeded
+
+
+class TestSpeculationPolicy(unittest.TestCase):
+    def test_expected_duration_siblings(self):
+        policy = SpeculationPolicy()
+        tasks = [ShellTask(f"test_task_{i}", "true") for i in range(4)]
+        for t, duration in zip(tasks, [1, 3, 100]):
+            t.start_time = 0
+            t.end_time = duration
+            t.status = _status_succeeded
+        self.assertEqual(policy.get_expected_duration(tasks[3], tasks), 3)
+
+    def test_expected_duration_history(self):
+        policy = SpeculationPolicy(history={"test_task": 5})
+        t1 = ShellTask("test_task", "true")
+        self.assertEqual(policy.get_expected_duration(t1, [t1]), 5)
+        self.assertEqual(policy.get_expected_duration(ShellTask("other", "true"), []), None)
+
+    def test_should_speculate(self):
+        policy = SpeculationPolicy(multiplier=2, min_runtime=10, history={"test_task": 6})
+        t1 = ShellTask("test_task", "true")
+        t1.start_time = 0
+        self.assertFalse(policy.should_speculate(t1, [], 20))
+        t1.set_idempotent()
+        self.assertFalse(policy.should_speculate(t1, [], 11))
+        self.assertTrue(policy.should_speculate(t1, [], 13))
+
+    def test_record(self):
+        policy = SpeculationPolicy()
+        t1 = ShellTask("test_task", "true")
+        t1.start_time = 1
+        t1.end_time = 3
+        t1.status = _status_succeeded
+        policy.record(t1)
+        self.assertEqual(policy.history, {"test_task": 2})
+
+    def test_dag_run(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # Slow the first time only, so the duplicate wins the race
+            lock = os.path.join(tmpdir, "lock")
+            dag = DAG(max_parallel_workers=4)
+            t1 = dag.new_task("test_task_1", task_type='shell', command="true")
+            t2 = dag.new_task("test_task_2", task_type='shell', command="true")
+            t3 = dag.new_task("test_task_3", task_type='shell',
+                              command=["sh", "-c", f"mkdir {lock} 2>/dev/null && sleep 60; true"])
+            t4 = dag.new_task("test_task_4", task_type='shell', command="true")
+            t1 >> [t2, t3] >> t4
+            t3.set_idempotent()
+
+            policy = SpeculationPolicy(min_runtime=1)
+            dag.run(speculation=policy)
+
+            for t in [t1, t2, t3, t4]:
+                self.assertEqual(t.status, _status_succeeded)
+            self.assertEqual(t3.process.returncode, -9)
+            duplicate = dag.duplicates[t3]
+            self.assertEqual(duplicate.get_name(), "test_task_3~speculative")
+            self.assertEqual(duplicate.status, _status_succeeded)
+            self.assertNotIn(duplicate, dag.tasks.values())
+            self.assertEqual(dag.running, 0)
+            self.assertIn("test_task_3", policy.history)
+            self.assertNotIn("test_task_3~speculative", policy.history)
+
+    def test_dag_run_original_wins(self):
+        dag = DAG(max_parallel_workers=4)
+        t1 = dag.new_task("test_task_1", task_type='shell', command=["sleep", "3"])
+        t1.set_idempotent()
+        policy = SpeculationPolicy(min_runtime=0, history={"test_task_1": 0.5})
+
+        dag.run(speculation=policy)
+
+        self.assertEqual(t1.status, _status_succeeded)
+        duplicate = dag.duplicates[t1]
+        self.assertEqual(duplicate.status, _status_failed)
+        self.assertEqual(dag.running, 0)
+        self.assertEqual(list(dag.tasks), ["test_task_1"])
+
+        # Duplicates only last until the next run
+        t1.reset()
+        dag.run(speculation=SpeculationPolicy())
+        self.assertEqual(dag.duplicates, {})
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+from psyched.store import TaskStore
+from psyched.task import _status_failed, _status_scheduled, _status_succeeded, _status_waiting
+
+
+def add(a, b):
+    print(a + b)
+    return a + b
+
+
+class TestTaskStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'store.db')
+        self.spec = {
+            'tasks': [
+                {'name': 'a', 'type': 'shell', 'command': ['echo', 'a']},
+                {'name': 'b', 'type': 'python', 'target': 'tests.test_store:add', 'kwargs': {'a': 1, 'b': 2},
+                 'upstream': ['a']},
+                {'name': 'c', 'type': 'shell', 'command': 'false'},
+                {'name': 'd', 'type': 'shell', 'command': 'true', 'upstream': ['b', 'c']},
+                {'name': 'e', 'type': 'shell', 'command': 'true', 'upstream': ['d']},
+            ],
+            'edges': [['a', 'd'], ['a', 'b']],
+        }
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_add_spec(self):
+        with TaskStore(self.path) as store:
+            store.add_spec(self.spec)
+            self.assertEqual(store.get_counts(), {_status_scheduled: 2, _status_waiting: 3})
+            self.assertEqual(store.get_status('a'), _status_scheduled)
+            self.assertEqual(store.get_status('d'), _status_waiting)
+            self.assertEqual(store.db.execute('SELECT count(*) FROM edges').fetchone()[0], 5)
+            with self.assertRaises(KeyError):
+                store.get_status('missing')
+
+    def test_add_spec_errors(self):
+        with TaskStore(':memory:') as store:
+            with self.assertRaises(ValueError):
+                store.add_spec({'tasks': [{'name': 'a', 'type': 'shell', 'command': 'true'}] * 2})
+            with self.assertRaises(ValueError):
+                store.add_spec({'tasks': [{'name': 'a', 'type': 'shell', 'command': 'true', 'upstream': ['b']}]})
+            with self.assertRaises(ValueError):
+                store.add_spec({'tasks': [{'name': 'a', 'type': 'shell', 'command': 'true', 'stream_to': 'b'}]})
+            with self.assertRaises(ValueError):
+                store.add_spec({'tasks': [{'name': 'a', 'type': 'pyhton', 'target': 'tests.test_store:add'}]})
+            with self.assertRaises(KeyError):
+                store.add_spec({'tasks': [{'name': 'a', 'type': 'shell'}]})
+            with self.assertRaises(ImportError):
+                store.add_spec({'tasks': [{'name': 'a', 'type': 'python', 'target': 'tests.missing:add'}]})
+            # Nothing is left from a rejected spec
+            self.assertEqual(store.get_counts(), {})
+
+    def test_run(self):
+        with TaskStore(self.path) as store:
+            store.add_spec(self.spec)
+            store.run(max_parallel_workers=2, poll_interval=0.05)
+            self.assertEqual(store.get_status('a'), _status_succeeded)
+            self.assertEqual(store.get_status('b'), _status_succeeded)
+            self.assertEqual(store.get_failed(), ['c', 'd', 'e'])
+            self.assertEqual(store.get_logs('a'), 'a\n')
+            self.assertEqual(store.get_logs('b'), '3\n')
+            self.assertIsNone(store.get_logs('e'))
+            self.assertGreater(store.get_duration('a'), 0)
+            self.assertIsNone(store.get_duration('e'))
+            self.assertIn('user_time', store.get_resources('a'))
+
+    def test_resume(self):
+        spec = {'tasks': [{'name': f'task_{i}', 'type': 'shell', 'command': 'true',
+                           'upstream': [f'task_{i - 1}'] if i else []} for i in range(3)]}
+        with TaskStore(self.path) as store:
+            store.add_spec(spec)
+            # An interrupted run left task_0 running
+            store.db.execute("UPDATE tasks SET status = 'running' WHERE name = 'task_0'")
+            store.db.commit()
+        with TaskStore(self.path) as store:
+            store.run(poll_interval=0.05)
+            self.assertEqual(store.get_counts(), {_status_succeeded: 3})
+
+    def test_timeout(self):
+        with TaskStore(':memory:') as store:
+            store.add_spec({'tasks': [{'name': 'a', 'type': 'shell', 'command': ['sleep', '60'], 'timeout': 0.2}]})
+            store.run(poll_interval=0.05)
+            self.assertEqual(store.get_status('a'), _status_failed)
@@ -4,6 +4,17 @@ from psyched.task import Task, _status_failed
 
 
 class TestDockerTaskMethods(unittest.TestCase):
+    def test_up_to_date(self):
+        t1 = Task('test_task')
+        self.assertFalse(t1.is_up_to_date({}))
+
+        t1.set_inputs(['a', 'b'])
+        t1.set_outputs(['c'])
+        self.assertTrue(t1.is_up_to_date({'a': 1, 'b': 2, 'c': 2}))
+        self.assertFalse(t1.is_up_to_date({'a': 1, 'b': 3, 'c': 2}))
+        self.assertFalse(t1.is_up_to_date({'a': 1, 'b': 2, 'c': None}))
+        self.assertFalse(t1.is_up_to_date({'a': None, 'b': 2, 'c': 2}))
+
     def test_double_fail(self):
         t1 = Task('test_task')
         t1.fail()
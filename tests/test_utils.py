@@ -1,6 +1,10 @@
-from psyched.utils import SysRedirect
-import unittest
+from psyched.utils import SysRedirect, call_target, get_mtimes, get_rusage
+import asyncio
+import resource
+import os
 import sys
+import tempfile
+import unittest
 
 
 class TestSysRedirect(unittest.TestCase):
@@ -14,3 +18,30 @@ class TestSysRedirect(unittest.TestCase):
             type(sys.stdout),
             SysRedirect
         )
+
+
+class TestCallTarget(unittest.TestCase):
+    def test_call_target(self):
+        async def add(a, b):
+            await asyncio.sleep(0)
+            return a + b
+
+        self.assertEqual(call_target(add, {'a': 1, 'b': 2}), 3)
+        self.assertEqual(call_target(lambda a, b: a - b, {'a': 1, 'b': 2}), -1)
+
+
+class TestGetMtimes(unittest.TestCase):
+    def test_get_mtimes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "file")
+            open(path, "w").close()
+            os.utime(path, (10, 10))
+            missing = os.path.join(tmpdir, "missing")
+            self.assertEqual(get_mtimes([path, missing, path]), {path: 10, missing: None})
+
+
+class TestGetRusage(unittest.TestCase):
+    def test_get_rusage(self):
+        usage = get_rusage(resource.getrusage(resource.RUSAGE_SELF))
+        self.assertEqual(set(usage), {'user_time', 'system_time', 'max_rss', 'read_bytes', 'write_bytes'})
+        self.assertGreater(usage['max_rss'], 1024)
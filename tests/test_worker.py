@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from psyched.dag import DAG
+from psyched.task import _status_failed, _status_succeeded
+from psyched.worker import RemoteWorker, WorkerAgent
+
+
+def greet(who):
+    print(f"Hello {who}!")
+
+
+def nap(secs):
+    time.sleep(secs)
+
+
+def explode():
+    raise RuntimeError("boom")
+
+
+class TestWorkerMethods(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.address = os.path.join(self.tmpdir, 'worker.sock')
+        self.agent = WorkerAgent(self.address, slots=2, resources={'cpus': 2})
+        self.thread = threading.Thread(target=self.agent.serve_forever, daemon=True)
+        self.thread.start()
+        self.worker = RemoteWorker(self.address)
+
+    def tearDown(self):
+        self.agent.shutdown()
+        shutil.rmtree(self.tmpdir)
+
+    def test_info(self):
+        self.assertEqual(self.worker.capacity, 2)
+        self.assertEqual(self.worker.resources, {'cpus': 2})
+
+    def test_run_shell(self):
+        process = self.worker.run_shell(["echo", "Hello World!"])
+        self.assertEqual(process.wait(), 0)
+        self.assertEqual(process.get_logs(), "Hello World!\n")
+
+    def test_run_shell_fail(self):
+        process = self.worker.run_shell("false")
+        self.assertEqual(process.wait(), 1)
+
+    def test_kill_shell(self):
+        process = self.worker.run_shell(["sleep", "60"])
+        time.sleep(0.5)
+        process.kill()
+        self.assertIsNotNone(process.poll())
+        for _ in range(50):
+            if self.agent.running == 0:
+                break
+            time.sleep(0.1)
+        self.assertEqual(self.agent.running, 0)
+
+    def test_run_python(self):
+        process = self.worker.run_python(greet, {"who": "World"})
+        self.assertEqual(process.wait(), 0)
+        self.assertEqual(process.get_logs(), "Hello World!\n")
+
+    def test_run_python_fail(self):
+        process = self.worker.run_python(explode, {})
+        self.assertEqual(process.wait(), 1)
+        self.assertIn("RuntimeError: boom", process.get_logs())
+
+    def test_kill_python(self):
+        process = self.worker.run_python(nap, {"secs": 60})
+        time.sleep(0.5)
+        process.kill()
+        self.assertIsNotNone(process.poll())
+        # The slot is free once killed
+        self.assertEqual(self.agent.running, 0)
+
+    def test_python_timeout(self):
+        self.agent.slots = 1
+        worker = RemoteWorker(self.address)
+        dag = DAG(poll_interval=0.05)
+        dag.add_worker(worker)
+        t1 = dag.new_task("test_task_1", task_type='python', target=nap, secs=5)
+        t1.set_timeout(1)
+        t2 = dag.new_task("test_task_2", task_type='python', target=greet, who="second")
+
+        start = time.time()
+        dag.run()
+
+        self.assertLess(time.time() - start, 4)
+        self.assertEqual(t1.status, _status_failed)
+        self.assertEqual(t2.status, _status_succeeded)
+        self.assertEqual(t2.get_logs(), "Hello second!\n")
+
+    def test_dag_run(self):
+        dag = DAG()
+        dag.add_worker(self.worker)
+        t1 = dag.new_task("test_task_1", task_type='shell', command=["echo", "first"])
+        t2 = dag.new_task("test_task_2", task_type='python', target=greet, who="second")
+        t3 = dag.new_task("test_task_3", task_type='shell', command="false")
+        t4 = dag.new_task("test_task_4", task_type='shell', command="true")
+
+        t1 >> [t2, t3] >> t4
+
+        dag.run()
+
+        for t in [t1, t2]:
+            self.assertEqual(t.status, _status_succeeded)
+            self.assertEqual(t.host, self.worker)
+        for t in [t3, t4]:
+            self.assertEqual(t.status, _status_failed)
+        self.assertEqual(t1.get_logs(), "first\n")
+        self.assertEqual(t2.get_logs(), "Hello second!\n")
+        self.assertEqual(self.worker.running, 0)
+
+    def test_unreachable_worker(self):
+        worker = RemoteWorker(os.path.join(self.tmpdir, 'missing.sock'), capacity=1)
+        dag = DAG(poll_interval=0.05)
+        dag.add_worker(worker)
+        dag.new_task("test_task_1", task_type='shell', command="true")
+
+        with self.assertRaises(OSError):
+            dag.run()
+        self.assertEqual(worker.running, 0)